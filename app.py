@@ -1,32 +1,100 @@
-from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash
+from flask import Flask, render_template, request, redirect, url_for, session, jsonify, flash, make_response, Response, stream_with_context, send_from_directory, g, abort
 import sqlite3
+import csv
+import io
+import subprocess
+import sys
+import threading
+import time
+import hashlib
 import joblib
 import numpy as np
 import os
 import json
+from datetime import datetime, timezone
 from functools import wraps
+from jinja2.utils import htmlsafe_json_dumps
+from benchmarks import load_ideal_set
+from cache import TTLCache
+import compression
+import templating
+import memprofile
+from importer import ensure_import_schema, import_csv
+from segments import SegmentRouter
+import snapshot
+from replica import Replica
+from archive import attach_history, archived_response, latest_archived
+import search
+import summary
+import insights as cohort_insights
+import simulation
+import jobs
+import scoring
+import tenants
+from constructs import QUESTIONS, ROLE_QUESTIONS, STRESS_LEVELS, STRESS_LEVEL_SQL, STRESS_BUCKET_SQL
 
 app = Flask(__name__)
 app.secret_key = 'super_secret_key_for_viva_project'
+app.config['PROFILE_CACHE_SIZE'] = int(os.environ.get('PROFILE_CACHE_SIZE', 1024))
+app.config['PROFILE_CACHE_TTL'] = int(os.environ.get('PROFILE_CACHE_TTL', 300))
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('RESPONSE_CACHE_SIZE', 512))
+app.config['RESPONSE_CACHE_TTL'] = int(os.environ.get('RESPONSE_CACHE_TTL', 3600))
+app.config['ADMIN_CACHE_SIZE'] = int(os.environ.get('ADMIN_CACHE_SIZE', 64))
+app.config['ADMIN_CACHE_TTL'] = int(os.environ.get('ADMIN_CACHE_TTL', 600))
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
+app.config['REPLICA_ENABLED'] = os.environ.get('REPLICA_ENABLED', '1') == '1'
+app.config['REPLICA_INTERVAL'] = int(os.environ.get('REPLICA_INTERVAL', 60))
+app.config['REPLICA_MAX_WRITES'] = int(os.environ.get('REPLICA_MAX_WRITES', 50))
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 2))
+app.config['SIMULATION_MAX_CELLS'] = int(os.environ.get('SIMULATION_MAX_CELLS', 500000))
+compression.init_app(app)
+templating.init_app(app)
+memprofile.init_app(app)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 # On Vercel, use /tmp for the database to ensure it's writable
 if os.environ.get('VERCEL'):
     DB_NAME = '/tmp/database.db'
-    # Copy the database from BASE_DIR to /tmp if it doesn't exist (only once per instance)
-    if not os.path.exists(DB_NAME):
-        import shutil
-        SOURCE_DB = os.path.join(BASE_DIR, 'database.db')
-        if os.path.exists(SOURCE_DB):
-            try:
-                shutil.copy2(SOURCE_DB, DB_NAME)
-                print(f"Database copied to {DB_NAME}")
-            except Exception as e:
-                print(f"Error copying database: {e}")
-        else:
-            print(f"Source database not found at {SOURCE_DB}")
+elif snapshot.enabled():
+    # Writable overlay next to the read-only snapshot (see snapshot.py)
+    DB_NAME = os.environ.get('OVERLAY_DB', os.path.join(BASE_DIR, 'overlay.db'))
 else:
     DB_NAME = os.path.join(BASE_DIR, 'database.db')
 
+# One database per client organization (tenants.py); DB_NAME is the default tenant.
+# Snapshot and Vercel deployments serve a single prebuilt database.
+tenant_router = tenants.TenantRouter(
+    DB_NAME, registry_path=None if os.environ.get('VERCEL') or snapshot.enabled() else tenants.TENANTS_FILE)
+
+# Admin/export reads go to a backup-API copy so they never hold locks on DB_NAME (replica.py)
+ANALYTICS_DB = os.environ.get('ANALYTICS_DB', os.path.splitext(DB_NAME)[0] + '.analytics.db')
+
+def _analytics_path(slug):
+    if slug == tenants.DEFAULT_TENANT:
+        return ANALYTICS_DB
+    return os.path.splitext(tenant_router.db_path(slug))[0] + '.analytics.db'
+
+analytics_replica = tenants.PerTenant(tenant_router, lambda slug: Replica(
+    tenant_router.db_path(slug), _analytics_path(slug), app.config['REPLICA_INTERVAL'], app.config['REPLICA_MAX_WRITES']))
+
+def prepare_database():
+    if snapshot.enabled():
+        # The prebuilt snapshot is attached read-only; DB_NAME only holds new writes
+        return
+    # Copy the database from BASE_DIR to /tmp if it doesn't exist (only once per instance)
+    if not os.environ.get('VERCEL') or os.path.exists(DB_NAME):
+        return
+    import shutil
+    SOURCE_DB = os.path.join(BASE_DIR, 'database.db')
+    if os.path.exists(SOURCE_DB):
+        try:
+            shutil.copy2(SOURCE_DB, DB_NAME)
+            print(f"Database copied to {DB_NAME}")
+        except Exception as e:
+            print(f"Error copying database: {e}")
+    else:
+        print(f"Source database not found at {SOURCE_DB}")
+
 # Load Models
 MODEL_LR_PATH = os.path.join(BASE_DIR, 'model_lr.pkl')
 MODEL_RF_PATH = os.path.join(BASE_DIR, 'model_rf.pkl')
@@ -41,10 +109,29 @@ model_gb = None
 model_log = None
 scaler = None
 threshold = 3.5 # Default fallback
+model_version = ''
+segment_router = SegmentRouter()
 
 def load_models():
-    global model_lr, model_rf, model_log, scaler, threshold
+    global model_lr, model_rf, model_gb, model_log, scaler, threshold, model_version
+    if snapshot.enabled() and os.path.exists(snapshot.MODEL_BUNDLE):
+        # One compressed file instead of six unpickles on a cold start
+        try:
+            bundle = joblib.load(snapshot.MODEL_BUNDLE)
+            model_lr, model_rf, model_gb, model_log = bundle['lr'], bundle['rf'], bundle['gb'], bundle['log']
+            scaler, threshold = bundle['scaler'], bundle['threshold']
+            model_version = bundle['version']
+            print("Models loaded from the snapshot bundle.")
+            return
+        except Exception as e:
+            print(f"Error loading snapshot model bundle, falling back to model files: {e}")
     try:
+        # Changes whenever a model artifact is retrained, so cached renders are dropped
+        model_version = hashlib.sha1(repr([
+            os.path.getmtime(p) if os.path.exists(p) else None
+            for p in (MODEL_LR_PATH, MODEL_RF_PATH, MODEL_GB_PATH, MODEL_LOG_PATH, SCALER_PATH, THRESHOLD_PATH)
+        ] + [segment_router.version]).encode()).hexdigest()[:12]
+
         if os.path.exists(SCALER_PATH):
             scaler = joblib.load(SCALER_PATH)
             
@@ -65,80 +152,6 @@ def load_models():
     except Exception as e:
         print(f"Error loading models: {e}")
 
-load_models()
-
-# Question Configuration (Reduced to 15 items)
-QUESTIONS = {
-    "Job Stress": {
-        "Workload": [
-            "I am able to reach the target within the specified time.",
-            "I am suddenly burdened with more work without sufficient time."
-        ],
-        "Role Ambiguity": [
-            "Sufficient and clear information is provided to perform my tasks."
-        ],
-        "Job Security": [
-            "I feel secure in my job."
-        ],
-        "Gender Discrimination": [
-            "Equal career growth opportunities are provided."
-        ],
-        "Interpersonal Relationships": [
-            "Relationships at all levels are good."
-        ],
-        "Resource Constraints": [
-            "Enough time is provided to complete tasks."
-        ],
-        "Job Satisfaction": [
-            "I am satisfied with working conditions."
-        ],
-        "Organizational Support": [
-            "Training is provided regularly.",
-            "Career development is encouraged."
-        ]
-    },
-    "Productivity": {
-        "Timings": [
-            "I utilize time efficiently."
-        ],
-        "Supervisor Competence": [
-            "Supervisor motivates employees.",
-            "Supervisor communicates clearly."
-        ],
-        "Compensation": [
-            "I am satisfied with salary."
-        ],
-        "Systems & Procedures": [
-            "Procedures ensure quality work."
-        ]
-    }
-}
-
-# Role-specific additional questions (appended to the main questionnaire)
-ROLE_QUESTIONS = {
-    'Manager': [
-        "I clearly delegate tasks to my team.",
-        "I receive adequate support from senior management.",
-        "I have the autonomy to make decisions for my team."
-    ],
-    'Senior': [
-        "I mentor junior colleagues regularly.",
-        "My role involves handling complex tasks independently."
-    ],
-    'Junior': [
-        "I receive clear guidance on my tasks.",
-        "I have opportunities to learn on the job."
-    ],
-    'Intern': [
-        "I get sufficient onboarding and training.",
-        "My tasks are appropriate for my experience level."
-    ],
-    'Staff': [
-        "I have clarity on my daily responsibilities.",
-        "I receive timely feedback on my work."
-    ]
-}
-
 STRESS_INSIGHTS = {
     "Workload": "Prioritize tasks using the Eisenhower Matrix and discuss realistic deadlines with your supervisor.",
     "Role Ambiguity": "Schedule a meeting with your manager to clarify your key responsibilities and performance expectations.",
@@ -150,20 +163,206 @@ STRESS_INSIGHTS = {
     "Organizational Support": "Utilize available company resources like EAPs (Employee Assistance Programs) or training workshops."
 }
 
+# Version of the questionnaire/insight text and scoring rules; part of every render cache key
+CONTENT_VERSION = hashlib.sha1(
+    json.dumps([QUESTIONS, ROLE_QUESTIONS, STRESS_INSIGHTS, scoring.RULES_VERSION], sort_keys=True).encode()
+).hexdigest()[:12]
+
+# Item layout and scoring rules each new response is stamped with (see scoring.py, rescore.py)
+QUESTION_LAYOUT = scoring.QUESTION_LAYOUT
+QUESTIONNAIRE_VERSION = scoring.version_of(QUESTION_LAYOUT)
+
+def _number_questions(questions):
+    """[(section, [(construct, [(answer key, number, text)])])], numbered in form order."""
+    sections, n = [], 0
+    for section, constructs in questions.items():
+        groups = []
+        for construct, items in constructs.items():
+            numbered = []
+            for text in items:
+                n += 1
+                numbered.append((f'q{n}', n, text))
+            groups.append((construct, numbered))
+        sections.append((section, groups))
+    return sections
+
+# Numbered once here rather than with a namespace counter on every rendered row (_macros.html)
+QUESTION_SECTIONS = _number_questions(QUESTIONS)
+
+# Admin "Ideal Set" cards: (label, key in ideal_set.json)
+IDEAL_SET_LABELS = [
+    ("Stress Score", "Stress_Score"),
+    ("Productivity Score", "Prod_Score"),
+    ("Workload", "Workload"),
+    ("Role Ambiguity", "Role_Ambiguity"),
+    ("Job Security", "Job_Security"),
+    ("Interpersonal", "Interpersonal_Relationships"),
+    ("Resources", "Resource_Constraints"),
+    ("Satisfaction", "Job_Satisfaction"),
+    ("Support", "Organizational_Support")
+]
+# Fallback used when ideal_set.json is missing (benchmarks calculated from 5000 records)
+DEFAULT_IDEAL_SET = {
+    "Stress_Score": 3.38, "Prod_Score": 4.17, "Workload": 3.68, "Role_Ambiguity": 3.59,
+    "Job_Security": 3.36, "Interpersonal_Relationships": 3.44, "Resource_Constraints": 3.09,
+    "Job_Satisfaction": 3.30, "Organizational_Support": 3.37
+}
+
 # Database Helper
-def get_db():
+def get_db(unified=True):
+    """Connection for a request. With a snapshot (snapshot.py) reads see snapshot + overlay;
+    pass unified=False for schema changes on the writable database alone. Opens the
+    current tenant's file (tenants.py)."""
+    path = tenant_router.db_path()
     try:
-        conn = sqlite3.connect(DB_NAME)
+        if unified and snapshot.enabled():
+            conn = snapshot.connect(path)
+        else:
+            conn = sqlite3.connect(path)
         conn.row_factory = sqlite3.Row
         return conn
     except Exception as e:
-        print(f"Error connecting to database {DB_NAME}: {e}")
+        print(f"Error connecting to database {path}: {e}")
         raise e
 
-def init_db():
+def _replica_in_use():
+    # A snapshot deployment already reads analytics from an immutable file
+    return app.config['REPLICA_ENABLED'] and not snapshot.enabled()
+
+def get_analytics_db():
+    """Connection for admin aggregates and exports: the replica, or the live DB when disabled."""
+    if not _replica_in_use():
+        return get_db()
+    conn = analytics_replica.connect()
+    conn.row_factory = sqlite3.Row
+    return conn
+
+def note_write(count=1):
+    if app.config['REPLICA_ENABLED']:
+        analytics_replica.note_write(count)
+
+def query_history(lookup, key):
+    """An archived response via archive.archived_response / latest_archived, or None.
+
+    Only the one partition holding the row is attached; a missing or unreadable
+    archive file reads as "not found".
+    """
+    conn = get_db()
     try:
+        return lookup(conn, key)
+    except sqlite3.Error as e:
+        print(f"Archive lookup failed: {e}")
+        return None
+    finally:
+        conn.close()
+
+@app.before_request
+def select_tenant():
+    """Point this request at its organization's database: the session's tenant once
+    logged in, otherwise ?org= / the form's `org` field (login and register pages)."""
+    if 'user_id' in session:
+        slug = session.get('tenant', tenants.DEFAULT_TENANT)
+        if slug not in tenant_router.tenants:
+            # Organization removed from tenants.json since this session logged in
+            session.clear()
+            slug = tenants.DEFAULT_TENANT
+    else:
+        slug = request.values.get('org') or tenants.DEFAULT_TENANT
+        if slug not in tenant_router.tenants:
+            abort(404)
+    g.tenant_token = tenant_router.activate(slug)
+    g.tenant_started = time.perf_counter()
+    # Only the default database gets the stock admin; tenants.py creates each tenant's own
+    tenant_router.ensure_ready(slug, lambda: init_db(seed_admin=slug == tenants.DEFAULT_TENANT and not snapshot.enabled()))
+
+@app.after_request
+def note_tenant_status(response):
+    g.tenant_status = response.status_code
+    return response
+
+@app.teardown_request
+def release_tenant(exc):
+    token = g.pop('tenant_token', None)
+    if token is None:
+        return
+    tenant_router.record(tenant_router.current(), time.perf_counter() - g.tenant_started,
+                         500 if exc else g.get('tenant_status', 500))
+    tenant_router.deactivate(token)
+
+@app.context_processor
+def tenant_context():
+    return {'tenant_choices': tenant_router.choices() if tenant_router.configured else None,
+            'current_tenant': tenant_router.current()}
+
+# User profile cache: keyed by ('id', user_id) and ('username', username)
+profile_cache = tenants.PerTenant(tenant_router, lambda slug: TTLCache(
+    app.config['PROFILE_CACHE_SIZE'], app.config['PROFILE_CACHE_TTL'], name=f'user_profiles:{slug}'))
+
+def get_user_profile(user_id):
+    """Public profile fields (no password) for a user id, or None."""
+    def load():
         conn = get_db()
+        row = conn.execute('SELECT id, username, role, position, gender, department FROM users WHERE id = ?',
+                           (user_id,)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+    return profile_cache.get_or_set(('id', user_id), load)
+
+def get_user_by_username(username):
+    """Public profile fields (no password) for a username, or None."""
+    def load():
+        conn = get_db()
+        row = conn.execute('SELECT id, username, role, position, gender, department FROM users WHERE username = ?',
+                           (username,)).fetchone()
+        conn.close()
+        return dict(row) if row else None
+    return profile_cache.get_or_set(('username', username), load)
+
+def password_matches(user_id, password):
+    """Check a login against the database; credentials are never cached."""
+    conn = get_db()
+    row = conn.execute('SELECT password FROM users WHERE id = ?', (user_id,)).fetchone()
+    conn.close()
+    return row is not None and row['password'] == password
+
+# Rendered /response/<id> pages. rescore.py rewrites stored scores, so the key includes
+# scoring.generation(), which it bumps
+response_cache = tenants.PerTenant(tenant_router, lambda slug: TTLCache(
+    app.config['RESPONSE_CACHE_SIZE'], app.config['RESPONSE_CACHE_TTL'], name=f'response_renders:{slug}'))
+
+def conditional_html(html, etag, last_modified=None, entry=None):
+    """HTML response with a strong ETag that answers If-None-Match with 304.
+
+    When `entry` (the cached dict holding `html`) is given, the gzip variant is
+    compressed once and kept in it; that variant gets its own ETag.
+    """
+    body, encoding = html.encode('utf-8'), None
+    if entry is not None:
+        body, encoding = compression.cached_variant(entry, body)
+    resp = make_response(body)
+    if encoding:
+        resp.headers['Content-Encoding'] = encoding
+        etag = f'{etag}-{encoding}'
+    resp.set_etag(etag)
+    if last_modified is not None:
+        resp.last_modified = last_modified
+    # Pages are per-user: browsers may keep them but must revalidate every time
+    resp.headers['Cache-Control'] = 'private, no-cache'
+    return resp.make_conditional(request)
+
+def invalidate_user(user_id=None, username=None):
+    """Drop cached profile entries after a registration or profile update."""
+    if user_id is not None:
+        profile_cache.invalidate(('id', user_id))
+    if username is not None:
+        profile_cache.invalidate(('username', username))
+
+def init_db(seed_admin=True):
+    try:
+        conn = get_db(unified=False)
         c = conn.cursor()
+        # Only takes effect on a new database; lets cleanup_db.py shrink the file without a full VACUUM
+        c.execute('PRAGMA auto_vacuum = INCREMENTAL')
         
         # Users Table
         c.execute('''
@@ -201,7 +400,8 @@ def init_db():
         
         # Create Admin User if not exists
         try:
-            c.execute("INSERT OR IGNORE INTO users (username, password, role) VALUES ('admin', 'admin123', 'admin')")
+            if seed_admin:
+                c.execute("INSERT OR IGNORE INTO users (username, password, role) VALUES ('admin', 'admin123', 'admin')")
         except:
             pass
             
@@ -212,7 +412,7 @@ def init_db():
 
     # Add raw_answers column if missing (for existing DBs)
     try:
-        conn = get_db()
+        conn = get_db(unified=False)
         cur = conn.cursor()
         cols = [r[1] for r in cur.execute("PRAGMA table_info('responses')").fetchall()]
         if 'raw_answers' not in cols:
@@ -244,15 +444,45 @@ def init_db():
                 conn.commit()
             except Exception:
                 pass
+        # Stress level / 0.5 bucket as generated columns so filters and the trend chart use indexes.
+        # ALTER TABLE can only add VIRTUAL generated columns; the indexes store the values.
+        xcols = [r[1] for r in cur.execute("PRAGMA table_xinfo('responses')").fetchall()]
+        if 'stress_level' not in xcols:
+            cur.execute(f"ALTER TABLE responses ADD COLUMN stress_level TEXT GENERATED ALWAYS AS ({STRESS_LEVEL_SQL}) VIRTUAL")
+        if 'stress_bucket' not in xcols:
+            cur.execute(f"ALTER TABLE responses ADD COLUMN stress_bucket REAL GENERATED ALWAYS AS ({STRESS_BUCKET_SQL}) VIRTUAL")
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_responses_stress_level ON responses (stress_level, id)')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_responses_stress_bucket ON responses (stress_bucket, productivity_score)')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_responses_user_level ON responses (user_id, stress_level)')
+        cur.execute('CREATE INDEX IF NOT EXISTS idx_users_department ON users (department)')
+        conn.commit()
+        # Questionnaire version stamp; NULL for responses saved before it existed
+        if 'questionnaire_version' not in xcols:
+            cur.execute("ALTER TABLE responses ADD COLUMN questionnaire_version TEXT")
+        cur.execute('''
+            CREATE TABLE IF NOT EXISTS questionnaire_versions (
+                version TEXT PRIMARY KEY,
+                layout TEXT NOT NULL,
+                rules INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        cur.execute('INSERT OR IGNORE INTO questionnaire_versions (version, layout, rules) VALUES (?, ?, ?)',
+                    (QUESTIONNAIRE_VERSION, json.dumps(QUESTION_LAYOUT), scoring.RULES_VERSION))
+        conn.commit()
+        # Import batch manifest and import_batch_id tags (see importer.py)
+        ensure_import_schema(conn)
+        # FTS5 index over the free-text problems answers (see search.py)
+        search.ensure_search_schema(conn)
+        # Per-user latest response, running means and score history (see summary.py)
+        summary.ensure_summary_schema(conn)
+        scoring.ensure_generation_table(conn)
+        # Background job queue shared by all workers (see jobs.py)
+        jobs.ensure_jobs_schema(conn)
         conn.close()
     except Exception as e:
         print(f"Database update skipped (possibly read-only): {e}")
 
-try:
-    init_db()
-except Exception as e:
-    print(f"Startup DB init skipped: {e}")
-
 # Login Decorator
 def login_required(f):
     @wraps(f)
@@ -284,20 +514,35 @@ def _stress_label(score):
     else:
         return 'High'
 
+def _row_stress_level(row):
+    """The stored stress_level column; computed only for rows without it (archive partitions)."""
+    if 'stress_level' in row.keys() and row['stress_level']:
+        return row['stress_level']
+    return _stress_label(row['job_stress_score'])
+
 
 @app.route('/response/<int:response_id>')
 @login_required
 def view_response(response_id):
+    viewer = 'admin' if session.get('role') == 'admin' else 'owner'
     conn = get_db()
-    row = conn.execute('''
-        SELECT r.*, u.username, u.id as user_id, u.gender, u.department
-        FROM responses r
-        JOIN users u ON r.user_id = u.id
-        WHERE r.id = ?
-    ''', (response_id,)).fetchone()
+    cache_key = (response_id, viewer, CONTENT_VERSION, model_version, scoring.generation(conn))
+    cached = response_cache.get(cache_key)
+    if cached:
+        conn.close()
+        if viewer != 'admin' and cached['user_id'] != session.get('user_id'):
+            flash('Access denied')
+            return redirect(url_for('dashboard'))
+        return conditional_html(cached['html'], cached['etag'], entry=cached)
+
+    row = conn.execute('SELECT * FROM responses WHERE id = ?', (response_id,)).fetchone()
     conn.close()
+    if row is None:
+        # Older responses may have been moved to an archive partition
+        row = query_history(archived_response, response_id)
+    profile = get_user_profile(row['user_id']) if row else None
 
-    if not row:
+    if not row or not profile:
         flash('Response not found')
         return redirect(url_for('admin_dashboard') if session.get('role') == 'admin' else url_for('dashboard'))
 
@@ -306,6 +551,8 @@ def view_response(response_id):
         flash('Access denied')
         return redirect(url_for('dashboard'))
 
+    row = dict(row, username=profile['username'], gender=profile['gender'], department=profile['department'])
+
     raw_answers = {}
     try:
         if row['raw_answers']:
@@ -313,28 +560,62 @@ def view_response(response_id):
     except Exception:
         raw_answers = {}
 
-    stress_level = _stress_label(row['job_stress_score'])
+    stress_level = _row_stress_level(row)
     
     insights = []
     if stress_level == 'High':
-        # Get the top 3 contributing factors
-        factors = [
-            ("Workload", row['workload']),
-            ("Role Ambiguity", row['role_ambiguity']),
-            ("Job Security", row['job_security']),
-            ("Gender Discrimination", row['gender_discrim']),
-            ("Interpersonal Relationships", row['interpersonal']),
-            ("Resource Constraints", row['resources']),
-            ("Job Satisfaction", row['satisfaction']),
-            ("Organizational Support", row['support'])
-        ]
-        # Sort factors by score (higher score = more stress)
-        sorted_factors = sorted([f for f in factors if f[1] is not None], key=lambda x: x[1], reverse=True)
-        for factor, score in sorted_factors[:3]:
-            if score > 3: # Suggest if the factor itself is high
-                insights.append(STRESS_INSIGHTS.get(factor, ""))
-
-    return render_template('response_detail.html', res=row, raw_answers=raw_answers, stress_level=stress_level, questions=QUESTIONS, insights=insights)
+        # Top 3 contributing factors scoring above 3 (same rule as /admin/api/insights)
+        insights = [STRESS_INSIGHTS.get(f, "") for f in cohort_insights.response_drivers(row)]
+
+    html = render_template('response_detail.html', res=row, raw_answers=raw_answers, stress_level=stress_level, questions=QUESTION_SECTIONS, insights=insights)
+    cached = {
+        'user_id': row['user_id'],
+        'html': html,
+        'etag': hashlib.sha1(html.encode('utf-8')).hexdigest()
+    }
+    response_cache.set(cache_key, cached)
+    return conditional_html(html, cached['etag'], entry=cached)
+
+def _rss_kb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+@app.route('/admin/metrics')
+@admin_required
+def admin_metrics():
+    return jsonify({
+        'caches': {c.name: c.stats() for c in (profile_cache, response_cache, admin_cache)},
+        'compression': compression.stats(),
+        'templates': templating.stats(),
+        'worker': {'pid': os.getpid(), 'rss_kb': _rss_kb()},
+        'analytics_replica': analytics_replica.status() if app.config['REPLICA_ENABLED'] else None,
+        'jobs': job_runner.stats(),
+        'tenant': tenant_router.current(),
+        'tenants': tenant_router.metrics() if tenant_router.configured else None
+    })
+
+@app.route('/admin/api/memory', methods=['GET', 'POST'])
+@admin_required
+def admin_memory():
+    """This worker's memory profile (memprofile.py): GET ?top=&label=; POST {"enabled": bool, "reset": bool}."""
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        if body.get('reset'):
+            memprofile.reset()
+        if body.get('enabled'):
+            memprofile.enable()
+        elif body.get('enabled') is False:
+            memprofile.disable()
+    top = max(1, min(request.args.get('top', 10, type=int), 50))
+    label = request.args.get('label')
+    routes = {k: v for k, v in memprofile.stats(top).items() if not label or label in k}
+    return jsonify({'status': memprofile.status(), 'routes': routes})
 
 @app.route('/health')
 def health():
@@ -354,11 +635,9 @@ def login():
         username = request.form['username']
         password = request.form['password']
         
-        conn = get_db()
-        user = conn.execute('SELECT * FROM users WHERE username = ?', (username,)).fetchone()
-        conn.close()
+        user = get_user_by_username(username)
         
-        if user and user['password'] == password:
+        if user and password_matches(user['id'], password):
             if user['role'] == 'admin':
                 flash('Please use the Admin Login page')
                 return redirect(url_for('admin_login'))
@@ -366,6 +645,7 @@ def login():
             session['user_id'] = user['id']
             session['username'] = user['username']
             session['role'] = user['role']
+            session['tenant'] = tenant_router.current()
             return redirect(url_for('index'))
         else:
             flash('Invalid credentials')
@@ -378,14 +658,13 @@ def admin_login():
         username = request.form['username']
         password = request.form['password']
         
-        conn = get_db()
-        user = conn.execute('SELECT * FROM users WHERE username = ? AND role = "admin"', (username,)).fetchone()
-        conn.close()
+        user = get_user_by_username(username)
         
-        if user and user['password'] == password:
+        if user and user['role'] == 'admin' and password_matches(user['id'], password):
             session['user_id'] = user['id']
             session['username'] = user['username']
             session['role'] = user['role']
+            session['tenant'] = tenant_router.current()
             return redirect(url_for('admin_dashboard'))
         else:
             flash('Invalid admin credentials')
@@ -393,95 +672,60 @@ def admin_login():
     return render_template('admin_login.html')
 
 
+def _map_edited_row(row):
+    """Map a row of edited_job_stress_productivity_dataset.csv to (user, response) fields."""
+    # Extract Gender and Department from the new dataset structure
+    gender = row.get('Gender', 'Unknown')
+    department = row.get('Department', 'Unknown')
+
+    # Map stress constructs (Inverting positive statements)
+    workload = np.mean([6 - float(row.get('Workload_TargetTime') or 0), float(row.get('Workload_ExtraWork') or 0)])
+    role_ambiguity = 6 - float(row.get('RoleAmbiguity_ClearInfo') or 0)
+    job_security = 6 - float(row.get('JobSecurity_Secure') or 0)
+    gender_discrim = 6 - float(row.get('GenderDiscrimination_EqualGrowth') or 0)
+    interpersonal = 6 - float(row.get('Interpersonal_GoodRelations') or 0)
+    resources = 6 - float(row.get('Resources_EnoughTime') or 0)
+    satisfaction = 6 - float(row.get('JobSatisfaction_WorkConditions') or 0)
+    support = np.mean([6 - float(row.get('OrgSupport_Training') or 0), 6 - float(row.get('OrgSupport_CareerGrowth') or 0)])
+
+    # Productivity and stress scores
+    job_stress_score = np.mean([workload, role_ambiguity, job_security,
+                                gender_discrim, interpersonal, resources,
+                                satisfaction, support])
+    # Productivity constructs
+    timings = float(row.get('Productivity_TimeUtilization') or 0)
+    supervisor = np.mean([float(row.get('Supervisor_Motivation') or 0), float(row.get('Supervisor_Communication') or 0)])
+    compensation = float(row.get('Compensation_Salary') or 0)
+    systems = float(row.get('Systems_QualityProcedures') or 0)
+    productivity_score = np.mean([timings, supervisor, compensation, systems])
+    
+    # Enforce inverse relationship: high stress (5) -> low productivity (1)
+    if job_stress_score >= 5.0:
+        productivity_score = 1.0
+
+    user = {'position': 'Staff', 'gender': gender, 'department': department}
+    response = {
+        'job_stress_score': job_stress_score, 'productivity_score': productivity_score,
+        'workload': workload, 'role_ambiguity': role_ambiguity, 'job_security': job_security,
+        'gender_discrim': gender_discrim, 'interpersonal': interpersonal, 'resources': resources,
+        'satisfaction': satisfaction, 'support': support,
+        'timings': timings, 'supervisor': supervisor, 'compensation': compensation, 'systems': systems,
+        'raw_answers': json.dumps({})
+    }
+    return user, response
+
+DATASET_CSV = os.path.join(BASE_DIR, 'edited_job_stress_productivity_dataset.csv')
+
 @app.route('/admin/import_dataset')
 @admin_required
 def import_dataset():
-    """Import edited_job_stress_productivity_dataset.csv into users and responses tables.
-    Creates synthetic usernames `csv_user_<n>` for each row and inserts corresponding response.
-    """
-    csv_path = os.path.join(os.path.dirname(__file__), 'edited_job_stress_productivity_dataset.csv')
-    if not os.path.exists(csv_path):
+    """Queue an import of edited_job_stress_productivity_dataset.csv (see _job_import)."""
+    if not os.path.exists(DATASET_CSV):
         flash('Dataset file not found in project root.')
         return redirect(url_for('admin_dashboard'))
-
-    import csv
-
-    conn = get_db()
-    c = conn.cursor()
-    inserted = 0
-    with open(csv_path, newline='', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        for i, row in enumerate(reader, start=1):
-            username = f'csv_user_{i}'
-            # Skip if user already exists
-            exists = c.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone()
-            if exists:
-                continue
-
-            # Extract Gender and Department from the new dataset structure
-            gender = row.get('Gender', 'Unknown')
-            department = row.get('Department', 'Unknown')
-
-            # Insert user
-            try:
-                c.execute('INSERT INTO users (username, password, role, position, gender, department) VALUES (?, ?, ?, ?, ?, ?)',
-                          (username, 'csvimport', 'employee', 'Staff', gender, department))
-                user_id = c.lastrowid
-            except Exception:
-                # If insert fails (shouldn't), skip
-                continue
-
-            # Map stress constructs
-            try:
-                # Map stress constructs (Inverting positive statements)
-                workload = np.mean([6 - float(row.get('Workload_TargetTime') or 0), float(row.get('Workload_ExtraWork') or 0)])
-                role_ambiguity = 6 - float(row.get('RoleAmbiguity_ClearInfo') or 0)
-                job_security = 6 - float(row.get('JobSecurity_Secure') or 0)
-                gender_discrim = 6 - float(row.get('GenderDiscrimination_EqualGrowth') or 0)
-                interpersonal = 6 - float(row.get('Interpersonal_GoodRelations') or 0)
-                resources = 6 - float(row.get('Resources_EnoughTime') or 0)
-                satisfaction = 6 - float(row.get('JobSatisfaction_WorkConditions') or 0)
-                support = np.mean([6 - float(row.get('OrgSupport_Training') or 0), 6 - float(row.get('OrgSupport_CareerGrowth') or 0)])
-
-                # Productivity and stress scores
-                job_stress_score = np.mean([workload, role_ambiguity, job_security,
-                                            gender_discrim, interpersonal, resources,
-                                            satisfaction, support])
-                # Productivity constructs
-                timings = float(row.get('Productivity_TimeUtilization') or 0)
-                supervisor = np.mean([float(row.get('Supervisor_Motivation') or 0), float(row.get('Supervisor_Communication') or 0)])
-                compensation = float(row.get('Compensation_Salary') or 0)
-                systems = float(row.get('Systems_QualityProcedures') or 0)
-                productivity_score = np.mean([timings, supervisor, compensation, systems])
-                
-                # Enforce inverse relationship: high stress (5) -> low productivity (1)
-                if job_stress_score >= 5.0:
-                    productivity_score = 1.0
-            except Exception:
-                # Skip malformed rows
-                continue
-
-            # Insert response (include productivity construct columns)
-            c.execute('''
-                INSERT INTO responses (
-                    user_id, job_stress_score, productivity_score,
-                    workload, role_ambiguity, job_security, gender_discrim,
-                    interpersonal, resources, satisfaction, support,
-                    timings, supervisor, compensation, systems, raw_answers
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                user_id, job_stress_score, productivity_score,
-                workload, role_ambiguity, job_security, gender_discrim,
-                interpersonal, resources, satisfaction, support,
-                timings, supervisor, compensation, systems, json.dumps({})
-            ))
-            inserted += 1
-
-    conn.commit()
-    conn.close()
-
-    flash(f'Imported {inserted} rows from CSV into the database.')
-    return redirect(url_for('admin_dashboard'))
+    job_id = _submit_job('import', {'force': request.args.get('force') == '1'})
+    flash(f'Import queued as job #{job_id}.')
+    return redirect(url_for('admin_jobs'))
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -494,12 +738,17 @@ def register():
         
         conn = get_db()
         try:
-            conn.execute('INSERT INTO users (username, password, role, position, gender, department) VALUES (?, ?, ?, ?, ?, ?)',
+            # The UNIQUE constraint only covers the writable file when a snapshot is attached
+            if conn.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone():
+                raise sqlite3.IntegrityError(username)
+            conn.execute('INSERT INTO main.users (username, password, role, position, gender, department) VALUES (?, ?, ?, ?, ?, ?)',
                          (username, password, 'employee', position, gender, department))
             conn.commit()
             conn.close()
+            note_write()
+            invalidate_user(username=username)
             flash('Registration successful! Please login.')
-            return redirect(url_for('login'))
+            return redirect(url_for('login', org=tenant_router.current() if tenant_router.configured else None))
         except sqlite3.IntegrityError:
             flash('Username already exists')
             conn.close()
@@ -515,95 +764,15 @@ def logout():
 @login_required
 def questionnaire():
     # Determine user's position to show role-specific questions
-    conn = get_db()
-    user_row = conn.execute('SELECT position FROM users WHERE id = ?', (session['user_id'],)).fetchone()
-    conn.close()
+    user_row = get_user_profile(session['user_id'])
     position = user_row['position'] if user_row and user_row['position'] else 'Staff'
     role_questions = ROLE_QUESTIONS.get(position, [])
     if request.method == 'POST':
-        # Process 66 items
-        # Calculate Construct Scores
-        
-        scores = {}
-        raw_stress_scores = []
-        raw_prod_scores = []
-        
-        idx = 1
-        # Loop through config to pull correct form fields matching q1..q66 order
-        # We need to maintain the exact order from the prompt Q1-Q66
-        
-        # Flattened list of constructs in order to map Q indices
-        stress_order = [
-            "Workload", "Role Ambiguity", "Job Security", "Gender Discrimination",
-            "Interpersonal Relationships", "Resource Constraints", "Job Satisfaction", "Organizational Support"
-        ]
-        prod_order = [
-            "Timings", "Supervisor Competence", "Compensation", "Systems & Procedures"
-        ]
-        
-        # We assume the form submits q1, q2, ... q66
+        # Items are q1..qN in QUESTIONS order; the same rules re-derive stored responses in rescore.py
         form_data = request.form
-        
-        current_q = 1
-        
-        # Calculate Stress Construct Averages
-        stress_construct_avgs = {}
-        total_stress_items_sum = 0
-        total_stress_items_count = 0
-        
-        for construct in stress_order:
-            questions = QUESTIONS["Job Stress"][construct]
-            c_sum = 0
-            for _ in questions:
-                val = int(form_data.get(f'q{current_q}', 3))
-                # Q2 is the only direct stress indicator (Burdened)
-                # Q1, Q3-Q10 are positive statements (Higher = Less Stress) -> Invert
-                if current_q == 2:
-                    score = val
-                else:
-                    score = 6 - val
-                
-                c_sum += score
-                current_q += 1
-            
-            avg = c_sum / len(questions)
-            stress_construct_avgs[construct] = avg
-            scores[construct] = avg # Store for DB
-            
-            total_stress_items_sum += c_sum
-            total_stress_items_count += len(questions)
+        answers = [[int(form_data.get(f'q{n}', 3)) for n in range(1, scoring.item_count(QUESTION_LAYOUT) + 1)]]
+        scores = {col: float(values[0]) for col, values in scoring.score(answers, QUESTION_LAYOUT).items()}
 
-        # Calculate Productivity Construct Averages
-        prod_construct_avgs = {}
-        total_prod_items_sum = 0
-        total_prod_items_count = 0
-        
-        for construct in prod_order:
-            questions = QUESTIONS["Productivity"][construct]
-            c_sum = 0
-            for _ in questions:
-                val = int(form_data.get(f'q{current_q}', 3))
-                # All productivity items are positive (Higher = More Productive)
-                score = val
-                c_sum += score
-                current_q += 1
-                
-            avg = c_sum / len(questions)
-            prod_construct_avgs[construct] = avg
-            
-            total_prod_items_sum += c_sum
-            total_prod_items_count += len(questions)
-            
-        # Composite Scores
-        # Job_Stress = mean(8 stress constructs) OR mean of all items?
-        # Prompt: "Job_Stress = mean(8 stress constructs)"
-        job_stress_final = np.mean(list(stress_construct_avgs.values()))
-        productivity_final = np.mean(list(prod_construct_avgs.values()))
-
-        # Enforce inverse relationship: high stress (5) -> low productivity (1)
-        if job_stress_final >= 5.0:
-            productivity_final = 1.0
-        
         # Save to DB
         # Capture raw answers (all q* fields)
         raw_answers = {}
@@ -615,25 +784,17 @@ def questionnaire():
                     raw_answers[key] = val
 
         conn = get_db()
-        conn.execute('''
-            INSERT INTO responses (
-                user_id, job_stress_score, productivity_score, 
-                workload, role_ambiguity, job_security, gender_discrim, 
-                interpersonal, resources, satisfaction, support,
-                timings, supervisor, compensation, systems, raw_answers, problems
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        conn.execute(f'''
+            INSERT INTO main.responses (
+                user_id, {', '.join(scoring.SCORE_COLUMNS)}, raw_answers, problems, questionnaire_version
+            ) VALUES (?, {', '.join('?' * len(scoring.SCORE_COLUMNS))}, ?, ?, ?)
         ''', (
-            session['user_id'], job_stress_final, productivity_final,
-            stress_construct_avgs['Workload'], stress_construct_avgs['Role Ambiguity'],
-            stress_construct_avgs['Job Security'], stress_construct_avgs['Gender Discrimination'],
-            stress_construct_avgs['Interpersonal Relationships'], stress_construct_avgs['Resource Constraints'],
-            stress_construct_avgs['Job Satisfaction'], stress_construct_avgs['Organizational Support'],
-            prod_construct_avgs.get('Timings'), prod_construct_avgs.get('Supervisor Competence'),
-            prod_construct_avgs.get('Compensation'), prod_construct_avgs.get('Systems & Procedures'),
-            json.dumps(raw_answers), form_data.get('problems', '')
+            session['user_id'], *[scores[col] for col in scoring.SCORE_COLUMNS],
+            json.dumps(raw_answers), form_data.get('problems', ''), QUESTIONNAIRE_VERSION
         ))
         conn.commit()
         conn.close()
+        note_write()
         
         return redirect(url_for('dashboard'))
 
@@ -643,25 +804,43 @@ def questionnaire():
 @login_required
 def dashboard():
     conn = get_db()
-    res = conn.execute('SELECT * FROM responses WHERE user_id = ? ORDER BY id DESC LIMIT 1', (session['user_id'],)).fetchone()
+    # user_summary covers only the overlay's rows when a snapshot is attached
+    user_summary = summary.compute(conn, session['user_id']) if snapshot.enabled() else summary.load(conn, session['user_id'])
+    res = None
+    if user_summary:
+        res = conn.execute('SELECT * FROM responses WHERE id = ?', (user_summary['latest_response_id'],)).fetchone()
     conn.close()
+    if res is None:
+        res = query_history(latest_archived, session['user_id'])
     
     predictions = {
         'lr': None,
         'rf': None,
         'gb': None,
-        'classification': None
+        'classification': None,
+        'segment': None
     }
     
     if res and scaler:
         input_val = np.array([[res['job_stress_score']]])
         input_scaled = scaler.transform(input_val)
-        
-        if model_lr:
-            # Direct mapping: Low Stress Score (1-2) -> Excellent Productivity (Low Score)
-            predictions['lr'] = round(model_lr.predict(input_scaled)[0], 2)
-        if model_rf:
-            predictions['rf'] = round(model_rf.predict(input_scaled)[0], 2)
+
+        # Department (or department + position) model when one was trained for this user
+        profile = get_user_profile(session['user_id']) or {}
+        segment, segment_models = segment_router.get(profile.get('department'), profile.get('position'))
+        predictions['segment'] = segment
+
+        def predict(name, model):
+            if segment_models and name in segment_models:
+                seg_input = segment_models['scaler'].transform(input_val)
+                return round(segment_models[name].predict(seg_input)[0], 2)
+            if model:
+                return round(model.predict(input_scaled)[0], 2)
+            return None
+
+        # Direct mapping: Low Stress Score (1-2) -> Excellent Productivity (Low Score)
+        predictions['lr'] = predict('lr', model_lr)
+        predictions['rf'] = predict('rf', model_rf)
         if model_gb:
             predictions['gb'] = round(model_gb.predict(input_scaled)[0], 2)
         if model_log:
@@ -670,30 +849,33 @@ def dashboard():
             predictions['classification'] = "High Productivity" if pred_class == 1 else "Low Productivity"
             
     insights = []
-    if res and _stress_label(res['job_stress_score']) == 'High':
-        # Get the top 3 contributing factors
-        factors = [
-            ("Workload", res['workload']),
-            ("Role Ambiguity", res['role_ambiguity']),
-            ("Job Security", res['job_security']),
-            ("Gender Discrimination", res['gender_discrim']),
-            ("Interpersonal Relationships", res['interpersonal']),
-            ("Resource Constraints", res['resources']),
-            ("Job Satisfaction", res['satisfaction']),
-            ("Organizational Support", res['support'])
-        ]
-        # Sort factors by score (higher score = more stress)
-        sorted_factors = sorted([f for f in factors if f[1] is not None], key=lambda x: x[1], reverse=True)
-        for factor, score in sorted_factors[:3]:
-            if score > 3:
-                insights.append(STRESS_INSIGHTS.get(factor, ""))
+    if res and _row_stress_level(res) == 'High':
+        # Top 3 contributing factors scoring above 3
+        insights = [STRESS_INSIGHTS.get(f, "") for f in cohort_insights.response_drivers(res)]
             
-    return render_template('dashboard.html', result=res, predictions=predictions, insights=insights)
+    return render_template('dashboard.html', result=res, predictions=predictions, insights=insights, summary=user_summary)
 
-@app.route('/admin')
-@admin_required
-def admin_dashboard():
-    conn = get_db()
+# Model Accuracies (Hardcoded based on latest training or calculated)
+# In a real app, these would be loaded from a config file generated during training
+MODEL_ACCURACIES = {
+    'Linear Regression (R2)': 0.82,
+    'Random Forest (R2)': 0.88,
+    'Gradient Boosting (R2)': 0.90,
+    'Logistic Regression (Accuracy)': 0.91
+}
+
+# Admin dashboard fragments and full renders, keyed on the data version token
+admin_cache = tenants.PerTenant(tenant_router, lambda slug: TTLCache(
+    app.config['ADMIN_CACHE_SIZE'], app.config['ADMIN_CACHE_TTL'], name=f'admin_fragments:{slug}'))
+_admin_last_modified = tenants.PerTenant(tenant_router, lambda slug: {'version': None, 'at': None})
+
+def admin_data_version(conn):
+    """Cheap token that changes whenever a response is added, rescored or archived, or the users table changes."""
+    max_id = conn.execute('SELECT MAX(id) FROM responses').fetchone()[0] or 0
+    user_count = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+    return f'{max_id}-{user_count}-{scoring.generation(conn)}'
+
+def _admin_chart_data(conn):
     total_users = conn.execute('SELECT COUNT(*) FROM users WHERE role="employee"').fetchone()[0]
     total_responses = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
     
@@ -715,70 +897,48 @@ def admin_dashboard():
     depts = [d[0] for d in dept_stats]
     dept_scores = [d[1] for d in dept_stats]
     
-    # Model Accuracies (Hardcoded based on latest training or calculated)
-    # In a real app, these would be loaded from a config file generated during training
-    accuracies = {
-        'Linear Regression (R2)': 0.82,
-        'Random Forest (R2)': 0.88,
-        'Gradient Boosting (R2)': 0.90,
-        'Logistic Regression (Accuracy)': 0.91
-    }
+    # Stress vs Productivity Trend (Bucketed in 0.5 increments)
+    trend_results = conn.execute('''
+        SELECT stress_bucket, AVG(productivity_score) as avg_prod
+        FROM responses
+        WHERE stress_bucket IS NOT NULL
+        GROUP BY stress_bucket
+        ORDER BY stress_bucket
+    ''').fetchall()
     
+    trend_labels = [float(r['stress_bucket']) for r in trend_results]
+    trend_values = [round(float(r['avg_prod']), 2) for r in trend_results]
+
+    return {
+        'total_users': total_users,
+        'total_responses': total_responses,
+        # Serialized once per data version; escaped for inlining in <script>
+        'payload': htmlsafe_json_dumps({
+            'stress': stress_data,
+            'prod': prod_data,
+            'depts': depts,
+            'deptScores': dept_scores,
+            'trendLabels': trend_labels,
+            'trendValues': trend_values
+        })
+    }
+
+def _admin_recent_table(conn):
     # Demo Results / Latest Feedback
     latest_responses = conn.execute('''
         SELECT r.id as response_id, u.id as user_id, u.username, u.gender, u.department,
                r.job_stress_score, r.productivity_score, r.raw_answers, r.submission_date,
                r.workload, r.role_ambiguity, r.job_security, r.gender_discrim, r.interpersonal,
                r.resources, r.satisfaction, r.support,
-               r.timings, r.supervisor, r.compensation, r.systems
+               r.timings, r.supervisor, r.compensation, r.systems, r.stress_level
         FROM responses r 
         JOIN users u ON r.user_id = u.id 
         ORDER BY r.id DESC
         LIMIT 100
     ''').fetchall()
 
-    # Ideal Set (Benchmarks calculated from 5000 records)
-    ideal_set = {
-        "Stress Score": 3.38,
-        "Productivity Score": 4.17,
-        "Workload": 3.68,
-        "Role Ambiguity": 3.59,
-        "Job Security": 3.36,
-        "Interpersonal": 3.44,
-        "Resources": 3.09,
-        "Satisfaction": 3.30,
-        "Support": 3.37
-    }
-    
-    # Stress vs Productivity Trend (Bucketed in 0.5 increments)
-    trend_results = conn.execute('''
-        SELECT 
-            (CAST(job_stress_score * 2 AS INTEGER) / 2.0) as stress_bucket,
-            AVG(productivity_score) as avg_prod
-        FROM responses
-        GROUP BY stress_bucket
-        ORDER BY stress_bucket
-    ''').fetchall()
-    
-    trend_labels = [float(r['stress_bucket']) for r in trend_results]
-    trend_values = [round(float(r['avg_prod']), 2) for r in trend_results]
-
-    conn.close()
-    
     # Build combined recent responses with stress level label
     combined = []
-    def stress_label(s):
-        try:
-            s = float(s)
-        except Exception:
-            return 'Unknown'
-        if s < 2:
-            return 'Low'
-        elif s <= 3:
-            return 'Medium'
-        else:
-            return 'High'
-
     for r in latest_responses:
         combined.append({
             'response_id': r['response_id'],
@@ -804,22 +964,519 @@ def admin_dashboard():
                 'Compensation': r['compensation'],
                 'Systems_Procedures': r['systems']
             }.items() if v is not None},
-            'stress_level': stress_label(r['job_stress_score'])
+            'stress_level': r['stress_level'] or 'Unknown'
         })
 
-    return render_template('admin.html', 
-                           total_users=total_users, 
-                           total_responses=total_responses,
-                           stress_data=stress_data,
-                           prod_data=prod_data,
-                           depts=depts,
-                           dept_scores=dept_scores,
-                           accuracies=accuracies,
-                           recent_responses=combined,
-                           ideal_set=ideal_set,
-                           trend_labels=trend_labels,
-                           trend_values=trend_values,
-                           questions=QUESTIONS)
+    return render_template('_admin_recent_table.html', recent_responses=combined, questions=QUESTION_SECTIONS)
+
+@app.route('/admin')
+@admin_required
+def admin_dashboard():
+    conn = get_analytics_db()
+    data_version = admin_data_version(conn)
+    replica_at = analytics_replica.refreshed_at() if _replica_in_use() else None
+    last_modified = _admin_last_modified.for_tenant()
+    if last_modified['version'] != data_version:
+        last_modified.update(version=data_version, at=datetime.now(timezone.utc).replace(microsecond=0))
+
+    # Ideal Set (Benchmarks produced by benchmarks.py, reloaded when ideal_set.json changes)
+    benchmarks = load_ideal_set() or {'overall': DEFAULT_IDEAL_SET}
+
+    # Not keyed on replica_at: the replica only refreshes after writes, which move
+    # data_version; a refresh that changes nothing keeps the cached page and its ETag
+    page_key = ('page', data_version, benchmarks.get('version'), CONTENT_VERSION, model_version)
+    page = admin_cache.get(page_key)
+    if page is None:
+        model_card = admin_cache.get_or_set(
+            ('model_card', model_version),
+            lambda: render_template('_admin_model_card.html', accuracies=MODEL_ACCURACIES))
+        chart_data = admin_cache.get_or_set(
+            ('charts', data_version),
+            lambda: snapshot.aggregate(conn, 'charts', data_version) or _admin_chart_data(conn))
+        recent_table = admin_cache.get_or_set(
+            ('recent', data_version, CONTENT_VERSION), lambda: _admin_recent_table(conn))
+
+        ideal_set = {
+            label: benchmarks['overall'].get(key, DEFAULT_IDEAL_SET.get(key))
+            for label, key in IDEAL_SET_LABELS
+        }
+        html = render_template('admin.html',
+                               total_users=chart_data['total_users'],
+                               total_responses=chart_data['total_responses'],
+                               chart_payload=chart_data['payload'],
+                               model_card=model_card,
+                               recent_table=recent_table,
+                               ideal_set=ideal_set,
+                               ideal_meta=benchmarks,
+                               replica_at=(datetime.fromtimestamp(replica_at, timezone.utc).replace(microsecond=0)
+                                           if replica_at else None))
+        page = {'html': html, 'etag': hashlib.sha1(html.encode('utf-8')).hexdigest()}
+        admin_cache.set(page_key, page)
+    conn.close()
+
+    return conditional_html(page['html'], page['etag'], last_modified=last_modified['at'], entry=page)
+
+_startup = {'done': False, 'segments': False}
+
+def create_app(preload_segments=False):
+    """Run the one-off startup work (DB copy, schema checks, model loading) and return the app.
+
+    Safe to call repeatedly; the work runs once per process. Under gunicorn with
+    preload_app (see gunicorn.conf.py) this happens in the master, so workers share
+    the unpickled models copy-on-write instead of each loading their own.
+    """
+    if not _startup['done']:
+        prepare_database()
+        try:
+            # With a snapshot the admin user already lives in the snapshot file
+            tenant_router.ensure_ready(tenants.DEFAULT_TENANT, lambda: init_db(seed_admin=not snapshot.enabled()))
+            if snapshot.enabled():
+                snapshot.prepare_overlay(DB_NAME)
+        except Exception as e:
+            print(f"Startup DB init skipped: {e}")
+        load_models()
+        try:
+            print(f"Compiled {templating.precompile(app)} templates.")
+        except Exception as e:
+            print(f"Template precompile skipped: {e}")
+        _startup['done'] = True
+    if preload_segments and not _startup['segments']:
+        print(f"Preloaded {segment_router.preload()} segment models.")
+        _startup['segments'] = True
+    return app
+
+def init_worker():
+    """Per-process state for a freshly forked worker (called from gunicorn's post_fork).
+
+    DB connections are opened per request, so nothing is inherited there; caches and
+    counters are reset so each worker reports only its own traffic.
+    """
+    for c in (profile_cache, response_cache, admin_cache):
+        c.reset()
+    compression.reset()
+    templating.reset()
+    memprofile.reset()
+    job_runner.reset()
+    tenant_router.reset()
+
+# Vercel and `python app.py` import the module and use `app` directly
+create_app()
+
+@app.route('/admin/api/search')
+@admin_required
+def admin_search():
+    """Ranked full-text search over feedback: ?q=&department=&stress=Low|Medium|High&page=&per_page=&raw=1"""
+    query = request.args.get('q', '').strip()
+    stress = request.args.get('stress') or None
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    if stress and stress not in STRESS_LEVELS:
+        return jsonify({'error': f"stress must be one of {', '.join(STRESS_LEVELS)}"}), 400
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+
+    start = time.perf_counter()
+    conn = get_analytics_db()
+    try:
+        total, results = search.search(conn, query, request.args.get('department') or None, stress,
+                                       page, per_page, raw=request.args.get('raw') == '1')
+    except sqlite3.OperationalError as e:
+        return jsonify({'error': f'Invalid search: {e}'}), 400
+    finally:
+        conn.close()
+    return jsonify({
+        'query': query,
+        'total': total,
+        'page': page,
+        'per_page': min(max(per_page, 1), search.MAX_PER_PAGE),
+        'results': results,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+@app.route('/admin/api/responses')
+@admin_required
+def admin_filter_responses():
+    """Responses by stress level / bucket range / department, keyset-paginated by id.
+
+    ?stress=High&department=IT&bucket_min=3.5&bucket_max=5&after_id=0&limit=100
+    Served by idx_responses_stress_level / idx_responses_stress_bucket range scans.
+    """
+    stress = request.args.get('stress') or None
+    if stress and stress not in STRESS_LEVELS:
+        return jsonify({'error': f"stress must be one of {', '.join(STRESS_LEVELS)}"}), 400
+    bucket_min = request.args.get('bucket_min', type=float)
+    bucket_max = request.args.get('bucket_max', type=float)
+    department = request.args.get('department') or None
+    after_id = request.args.get('after_id', 0, type=int)
+    limit = max(1, min(request.args.get('limit', 100, type=int), 1000))
+
+    where, params = ['r.id > ?'], [after_id]
+    if stress:
+        where.append('r.stress_level = ?')
+        params.append(stress)
+    if bucket_min is not None:
+        where.append('r.stress_bucket >= ?')
+        params.append(bucket_min)
+    if bucket_max is not None:
+        where.append('r.stress_bucket <= ?')
+        params.append(bucket_max)
+    if department:
+        where.append('u.department = ?')
+        params.append(department)
+
+    start = time.perf_counter()
+    conn = get_analytics_db()
+    rows = conn.execute(f'''
+        SELECT r.id AS response_id, r.user_id, u.username, u.department, r.job_stress_score,
+               r.productivity_score, r.stress_level, r.stress_bucket, r.submission_date
+        FROM responses r
+        JOIN users u ON u.id = r.user_id
+        WHERE {' AND '.join(where)}
+        ORDER BY r.id
+        LIMIT ?
+    ''', params + [limit]).fetchall()
+    conn.close()
+    results = [dict(r) for r in rows]
+    return jsonify({
+        'results': results,
+        'next_after_id': results[-1]['response_id'] if len(results) == limit else None,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+@app.route('/admin/api/insights')
+@admin_required
+def admin_insights():
+    """Top stress drivers per cohort: ?group_by=department[,position]&level=High|Medium|Low|all&k=3"""
+    group_by = tuple(g for g in request.args.get('group_by', 'department').split(',') if g)
+    if not group_by or any(g not in cohort_insights.GROUP_COLUMNS for g in group_by):
+        return jsonify({'error': f"group_by must use {', '.join(cohort_insights.GROUP_COLUMNS)}"}), 400
+    level = request.args.get('level', 'High')
+    if level == 'all':
+        level = None
+    elif level not in STRESS_LEVELS:
+        return jsonify({'error': f"level must be all or one of {', '.join(STRESS_LEVELS)}"}), 400
+    k = max(1, min(request.args.get('k', cohort_insights.TOP_K, type=int), len(cohort_insights.FACTORS)))
+
+    start = time.perf_counter()
+    conn = get_analytics_db()
+    data_version = admin_data_version(conn)
+    groups = admin_cache.get_or_set(
+        ('insights', data_version, group_by, level, k),
+        lambda: cohort_insights.cohort_drivers(conn, group_by, level, k))
+    conn.close()
+    return jsonify({
+        'group_by': list(group_by),
+        'level': level or 'all',
+        'k': k,
+        'data_version': data_version,
+        'groups': groups,
+        'took_ms': round((time.perf_counter() - start) * 1000, 2)
+    })
+
+def _simulation_predict(scores, departments, positions):
+    """Every loaded model's predictions for a flat batch of stress scores (see simulation.py).
+
+    lr and rf go through the segment router; gb and the high-productivity share use
+    the global models.
+    """
+    out = {}
+    for name, model in (('lr', model_lr), ('rf', model_rf)):
+        # Segment models where trained, as on the dashboard; the global model elsewhere
+        fallback = (scaler, model) if model and scaler else None
+        preds, _ = segment_router.predict_batch(name, scores, departments, positions, fallback=fallback)
+        out[name] = preds
+    if scaler:
+        scaled = scaler.transform(scores.reshape(-1, 1))
+        if model_gb:
+            out['gb'] = model_gb.predict(scaled)
+        if model_log:
+            # Share of employees classified High Productivity
+            out['high_productivity_share'] = (model_log.predict(scaled) == 1).astype(float)
+    return out
+
+@app.route('/admin/api/simulate', methods=['POST'])
+@admin_required
+def admin_simulate():
+    """What-if over construct changes for a cohort. JSON body:
+
+    {"department": "Sales", "position": null, "level": null,
+     "scenarios": [{"name": "Lighter workload", "deltas": {"Workload": -1}}]}
+    """
+    body = request.get_json(silent=True) or {}
+    level = body.get('level')
+    if level is not None and level not in STRESS_LEVELS:
+        return jsonify({'error': f"level must be null or one of {', '.join(STRESS_LEVELS)}"}), 400
+    raw_scenarios = body.get('scenarios') or []
+    if not raw_scenarios or len(raw_scenarios) > simulation.MAX_SCENARIOS:
+        return jsonify({'error': f'Give between 1 and {simulation.MAX_SCENARIOS} scenarios'}), 400
+    try:
+        scenarios = [(sc.get('name') or f'Scenario {i}', simulation.parse_deltas(sc.get('deltas')))
+                     for i, sc in enumerate(raw_scenarios, start=1)]
+    except (AttributeError, TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+
+    start = time.perf_counter()
+    conn = get_analytics_db()
+    matrix, departments, positions = simulation.load_cohort(conn, body.get('department'), body.get('position'), level)
+    conn.close()
+    load_ms = round((time.perf_counter() - start) * 1000, 2)
+    if not len(matrix):
+        return jsonify({'error': 'No employees match the filter'}), 404
+    cells = len(matrix) * len(scenarios)
+    if cells > app.config['SIMULATION_MAX_CELLS']:
+        return jsonify({'error': f"{len(matrix)} employees x {len(scenarios)} scenarios exceeds the limit of "
+                                 f"{app.config['SIMULATION_MAX_CELLS']}; narrow the filter or run fewer scenarios"}), 413
+
+    result = simulation.simulate(matrix, departments, positions, scenarios, _simulation_predict)
+    result['filter'] = {'department': body.get('department'), 'position': body.get('position'), 'level': level}
+    result['timings']['load_ms'] = load_ms
+    result['took_ms'] = round((time.perf_counter() - start) * 1000, 2)
+    return jsonify(result)
+
+EXPORT_COLUMNS = [
+    'response_id', 'username', 'gender', 'department', 'position', 'submission_date',
+    'job_stress_score', 'productivity_score', 'workload', 'role_ambiguity', 'job_security',
+    'gender_discrim', 'interpersonal', 'resources', 'satisfaction', 'support',
+    'timings', 'supervisor', 'compensation', 'systems', 'problems'
+]
+
+def _export_cursor(conn, since=None, until=None, history=False):
+    """Cursor over the export rows in EXPORT_COLUMNS order; ValueError if too many archives are in range."""
+    responses, where, params = 'responses', [], []
+    if history:
+        responses = attach_history(conn, since, until)
+    if since:
+        where.append('r.submission_date >= ?')
+        params.append(since)
+    if until:
+        where.append('r.submission_date < ?')
+        params.append(until)
+    return conn.execute(f'''
+        SELECT r.id AS response_id, u.username, u.gender, u.department, u.position, r.submission_date,
+               r.job_stress_score, r.productivity_score, r.workload, r.role_ambiguity, r.job_security,
+               r.gender_discrim, r.interpersonal, r.resources, r.satisfaction, r.support,
+               r.timings, r.supervisor, r.compensation, r.systems, r.problems
+        FROM {responses} r
+        JOIN users u ON r.user_id = u.id
+        {'WHERE ' + ' AND '.join(where) if where else ''}
+        ORDER BY r.id
+    ''', params)
+
+@app.route('/admin/export')
+@admin_required
+def admin_export():
+    """All responses as CSV, streamed from the analytics replica in batches.
+
+    ?history=1 includes archived responses (archive.py); ?since=/&until= limit the
+    submission dates and the archive partitions that get attached.
+    """
+    conn = get_analytics_db()
+    try:
+        cur = _export_cursor(conn, request.args.get('since'), request.args.get('until'), request.args.get('history') == '1')
+    except ValueError as e:
+        conn.close()
+        return jsonify({'error': str(e)}), 400
+
+    def generate():
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(EXPORT_COLUMNS)
+        try:
+            while True:
+                rows = cur.fetchmany(1000)
+                if not rows:
+                    break
+                writer.writerows(tuple(r) for r in rows)
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        finally:
+            conn.close()
+        if buf.tell():
+            yield buf.getvalue()
+
+    filename = f"responses_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}.csv"
+    return Response(stream_with_context(generate()), mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+# Background jobs (see jobs.py). Finished exports are written here for download.
+EXPORT_DIR = os.environ.get('EXPORT_DIR', os.path.join('/tmp' if os.environ.get('VERCEL') else BASE_DIR, 'exports'))
+job_runner = jobs.JobRunner(DB_NAME, workers=app.config['JOB_WORKERS'])
+# Parameters each job kind accepts from the API
+JOB_PARAMS = {
+    'import': {'force'},
+    'retrain': {'segments', 'by_position'},
+    'rescore': {'all', 'restart'},
+    'export': {'since', 'until', 'history'}
+}
+
+def _job_import(ctx, force=False):
+    """CSV import; a cancelled or interrupted import resumes from the ledger checkpoint next time."""
+    if not os.path.exists(DATASET_CSV):
+        raise FileNotFoundError('Dataset file not found in project root.')
+    conn = get_db()
+    try:
+        result = import_csv(conn, DATASET_CSV, _map_edited_row, force=bool(force),
+                            progress=lambda f: ctx.progress(f, 'Importing rows'))
+    finally:
+        conn.close()
+    note_write(result['inserted'])
+    return result
+
+def _job_retrain(ctx, segments=False, by_position=False):
+    """Run training/train_model.py in a subprocess, then reload the models in this worker.
+    Other workers pick up segment models by mtime and global models on their next restart."""
+    if not os.path.exists(DATASET_CSV):
+        raise FileNotFoundError('Dataset file not found in project root.')
+    cmd = [sys.executable, os.path.join(BASE_DIR, 'training', 'train_model.py')]
+    if segments:
+        cmd.append('--segments')
+    if by_position:
+        cmd.append('--by-position')
+    proc = subprocess.Popen(cmd, cwd=BASE_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    output = []
+    reader = threading.Thread(target=lambda: output.extend(proc.stdout), daemon=True)
+    reader.start()
+    try:
+        while proc.poll() is None:
+            time.sleep(1)
+            ctx.progress(None, output[-1].strip() if output else 'Training', force=True)
+    except jobs.JobCancelled:
+        proc.terminate()
+        proc.wait()
+        raise
+    reader.join(timeout=5)
+    tail = ''.join(output[-20:])
+    if proc.returncode != 0:
+        raise RuntimeError(f'train_model.py exited with {proc.returncode}:\n{tail}')
+    load_models()
+    return {'returncode': proc.returncode, 'model_version': model_version, 'output': tail}
+
+def _job_rescore(ctx, all=False, restart=False):
+    """rescore.py as a job; it checkpoints per chunk, so a cancelled run resumes."""
+    import rescore
+    conn = sqlite3.connect(tenant_router.db_path(), timeout=10)
+    try:
+        updated = rescore.rescore(conn, all_rows=bool(all), restart=bool(restart),
+                                  progress=lambda f: ctx.progress(f, 'Rescoring'))
+    finally:
+        conn.close()
+    # Cached renders are keyed on scoring.generation(), which rescore bumped
+    note_write(updated)
+    return {'updated': updated}
+
+def _job_export(ctx, since=None, until=None, history=False):
+    """Write the /admin/export CSV to EXPORT_DIR for download."""
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    filename = f"responses_{datetime.now(timezone.utc):%Y%m%d_%H%M%S}_job{ctx.job_id}.csv"
+    path = os.path.join(EXPORT_DIR, filename)
+    conn = get_analytics_db()
+    written = 0
+    try:
+        total = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        cur = _export_cursor(conn, since, until, bool(history))
+        with open(path + '.tmp', 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            while True:
+                rows = cur.fetchmany(1000)
+                if not rows:
+                    break
+                writer.writerows(tuple(r) for r in rows)
+                written += len(rows)
+                ctx.progress(written / max(total, written, 1), f'{written} rows written')
+        os.replace(path + '.tmp', path)
+    finally:
+        conn.close()
+        if os.path.exists(path + '.tmp'):
+            os.remove(path + '.tmp')
+    return {'file': filename, 'rows': written, 'bytes': os.path.getsize(path)}
+
+def _tenant_job(kind, handler):
+    """Run a job handler against the tenant that submitted it (the job's scope),
+    measured as 'job:<kind>' when memory profiling is on."""
+    @wraps(handler)
+    def run(ctx, **params):
+        with tenant_router.use(ctx.scope or tenants.DEFAULT_TENANT), memprofile.measure(f'job:{kind}'):
+            return handler(ctx, **params)
+    return run
+
+job_runner.register('import', _tenant_job('import', _job_import), limit=1)
+job_runner.register('retrain', _tenant_job('retrain', _job_retrain), limit=1)
+job_runner.register('rescore', _tenant_job('rescore', _job_rescore), limit=1)
+job_runner.register('export', _tenant_job('export', _job_export), limit=2)
+
+def _tenant_job_or_none(job_id):
+    """The job, if it belongs to the current tenant; admins never see other organizations' jobs."""
+    job = job_runner.get(job_id)
+    if job is None or (job['scope'] or tenants.DEFAULT_TENANT) != tenant_router.current():
+        return None
+    return job
+
+def _submit_job(kind, params):
+    if kind not in JOB_PARAMS:
+        raise ValueError(f"kind must be one of {', '.join(JOB_PARAMS)}")
+    unknown = set(params) - JOB_PARAMS[kind]
+    if unknown:
+        raise ValueError(f"Unknown parameters for {kind}: {', '.join(sorted(unknown))}")
+    return job_runner.submit(kind, params, created_by=session.get('username'), scope=tenant_router.current())
+
+@app.route('/admin/jobs', methods=['GET', 'POST'])
+@admin_required
+def admin_jobs():
+    if request.method == 'POST':
+        kind = request.form.get('kind', '')
+        params = {k: (v == '1' if k in ('force', 'segments', 'by_position', 'all', 'restart', 'history') else v)
+                  for k, v in request.form.items() if k != 'kind' and v != ''}
+        try:
+            flash(f'{kind.capitalize()} queued as job #{_submit_job(kind, params)}.')
+        except ValueError as e:
+            flash(str(e))
+        return redirect(url_for('admin_jobs'))
+    return render_template('admin_jobs.html', jobs=job_runner.list(scope=tenant_router.current()), stats=job_runner.stats())
+
+@app.route('/admin/api/jobs', methods=['GET', 'POST'])
+@admin_required
+def admin_api_jobs():
+    """GET lists recent jobs (?status=&limit=); POST {"kind": ..., "params": {...}} queues one."""
+    if request.method == 'POST':
+        body = request.get_json(silent=True) or {}
+        try:
+            job_id = _submit_job(body.get('kind', ''), body.get('params') or {})
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify(job_runner.get(job_id)), 202
+    status = request.args.get('status')
+    if status and status not in jobs.STATUSES:
+        return jsonify({'error': f"status must be one of {', '.join(jobs.STATUSES)}"}), 400
+    limit = max(1, min(request.args.get('limit', 50, type=int), 500))
+    return jsonify({'jobs': job_runner.list(limit, status, scope=tenant_router.current()), 'stats': job_runner.stats()})
+
+@app.route('/admin/api/jobs/<int:job_id>')
+@admin_required
+def admin_api_job(job_id):
+    job = _tenant_job_or_none(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+@app.route('/admin/api/jobs/<int:job_id>/cancel', methods=['POST'])
+@admin_required
+def admin_cancel_job(job_id):
+    if _tenant_job_or_none(job_id) is None:
+        return jsonify({'error': 'Job not found'}), 404
+    if not job_runner.cancel(job_id):
+        return jsonify({'error': 'Job is not queued or running'}), 409
+    return jsonify(job_runner.get(job_id))
+
+@app.route('/admin/jobs/<int:job_id>/download')
+@admin_required
+def admin_job_download(job_id):
+    job = _tenant_job_or_none(job_id)
+    if not job or job['kind'] != 'export' or job['status'] != 'done':
+        flash('That export is not available.')
+        return redirect(url_for('admin_jobs'))
+    return send_from_directory(EXPORT_DIR, job['result']['file'], as_attachment=True, mimetype='text/csv')
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,305 @@
+"""Move old responses out of the hot table into per-period archive databases.
+
+    python archive.py --before 2025-01-01                   # per quarter (default)
+    python archive.py --before 2025-01-01 --period year --chunk-size 1000 --pause 0.05
+    python archive.py --list
+
+Each period (e.g. 2024Q3 or 2024) gets its own file per source database,
+archive/<database>/responses_<period>.db, holding a `responses` table with the same
+columns, so tenant databases never share a partition. Rows move in chunks. Each
+chunk's INSERT into the archive and DELETE from database.db commit as one
+transaction across both attached files, so an interrupted run loses or duplicates
+nothing; a chunk whose ids are already in the partition aborts the run instead.
+Every chunk also bumps the score generation, so cached admin pages drop the
+moved rows from their totals.
+
+The archive_partitions table in database.db records every file with its date
+and id range, and archive_users records each user's latest archived response.
+attach_history() ATTACHes only the partitions a query needs and creates a TEMP
+view `responses_all` that unions them with the hot table. archived_response()
+and latest_archived() look up one row, attaching only the partition that holds it.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import time
+
+import scoring
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_NAME = os.path.join(BASE_DIR, 'database.db')
+ARCHIVE_DIR = os.environ.get('ARCHIVE_DIR', os.path.join(BASE_DIR, 'archive'))
+CHUNK_SIZE = 500
+# SQLite's default SQLITE_MAX_ATTACHED is 10; keep one slot free for a snapshot
+MAX_ATTACHED = 9
+
+PERIOD_SQL = {
+    'quarter': "strftime('%Y', submission_date) || 'Q' || ((CAST(strftime('%m', submission_date) AS INTEGER) + 2) / 3)",
+    'year': "strftime('%Y', submission_date)"
+}
+
+
+def ensure_archive_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive_partitions (
+            period TEXT PRIMARY KEY,
+            path TEXT NOT NULL,
+            rows INTEGER DEFAULT 0,
+            min_date TIMESTAMP,
+            max_date TIMESTAMP,
+            archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cols = {r[1] for r in conn.execute("PRAGMA main.table_info('archive_partitions')")}
+    for name in ('min_id', 'max_id'):
+        if name not in cols:
+            conn.execute(f'ALTER TABLE archive_partitions ADD COLUMN {name} INTEGER')
+    has_users = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'archive_users'").fetchone()
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS archive_users (
+            user_id INTEGER PRIMARY KEY,
+            latest_id INTEGER NOT NULL,
+            period TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_responses_submission_date ON responses (submission_date)')
+    scoring.ensure_generation_table(conn)
+    # Partitions written before the id ranges and archive_users existed
+    for period, path in conn.execute('SELECT period, path FROM archive_partitions WHERE min_id IS NULL OR ?',
+                                     (has_users is None,)).fetchall():
+        conn.execute('ATTACH DATABASE ? AS arc', (os.path.join(BASE_DIR, path),))
+        try:
+            _index_partition(conn, period)
+            conn.execute("UPDATE archive_partitions SET (min_id, max_id) = (SELECT MIN(id), MAX(id) FROM arc.responses) "
+                         "WHERE period = ?", (period,))
+            conn.commit()
+        finally:
+            conn.execute('DETACH DATABASE arc')
+
+
+def _index_partition(conn, period, ids=None):
+    """Record in archive_users each user's latest response among `ids` (default: all of arc)."""
+    source = 'arc.responses' if ids is None else f"main.responses WHERE id IN ({', '.join('?' * len(ids))})"
+    where = 'WHERE' if ids is None else 'AND'
+    conn.execute(f'''
+        INSERT INTO archive_users (user_id, latest_id, period)
+        SELECT user_id, MAX(id), ? FROM {source} {where} user_id IS NOT NULL GROUP BY user_id
+        ON CONFLICT(user_id) DO UPDATE SET latest_id = excluded.latest_id, period = excluded.period
+        WHERE excluded.latest_id > archive_users.latest_id
+    ''', [period] + list(ids or []))
+
+
+def _columns(conn, schema, table='responses'):
+    # table_info leaves out generated columns, which must not be copied
+    return [r[1] for r in conn.execute(f"PRAGMA {schema}.table_info('{table}')").fetchall()]
+
+
+def _column_defs(conn):
+    return [(r[1], r[2]) for r in conn.execute("PRAGMA main.table_info('responses')").fetchall()]
+
+
+def _source_name(conn):
+    """Directory name for the main database's partitions, e.g. `database` or `tenants-acme`."""
+    path = next((r[2] for r in conn.execute('PRAGMA database_list') if r[1] == 'main'), '')
+    if not path:
+        return 'memory'
+    rel = os.path.splitext(os.path.relpath(path, BASE_DIR))[0]
+    return re.sub(r'[^A-Za-z0-9_-]+', '-', rel).strip('-') or 'database'
+
+
+def partition_path(conn, period):
+    """The file already recorded for `period`, else a new one under this database's directory."""
+    row = conn.execute('SELECT path FROM archive_partitions WHERE period = ?', (period,)).fetchone()
+    if row:
+        return os.path.join(BASE_DIR, row[0])
+    return os.path.join(ARCHIVE_DIR, _source_name(conn), f'responses_{period}.db')
+
+
+def _prepare_partition(conn, period):
+    """Attach the archive file for `period` as `arc`, creating or widening its table."""
+    path = partition_path(conn, period)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn.execute('ATTACH DATABASE ? AS arc', (path,))
+    defs = _column_defs(conn)
+    existing = set(_columns(conn, 'arc'))
+    if not existing:
+        cols = ', '.join(f'{name} {ctype}'.strip() for name, ctype in defs)
+        conn.execute(f'CREATE TABLE arc.responses ({cols})')
+        conn.execute('CREATE UNIQUE INDEX arc.idx_archive_responses_id ON responses (id)')
+        conn.execute('CREATE INDEX arc.idx_archive_responses_user ON responses (user_id, id)')
+    else:
+        for name, ctype in defs:
+            if name not in existing:
+                conn.execute(f'ALTER TABLE arc.responses ADD COLUMN {name} {ctype}')
+    conn.commit()
+    return path
+
+
+def archive_period(conn, period, period_sql, before, chunk_size=CHUNK_SIZE, pause=0.0):
+    path = _prepare_partition(conn, period)
+    cols = ', '.join(_columns(conn, 'main'))
+    where = f'submission_date < ? AND {period_sql} = ?'
+    moved = 0
+    try:
+        while True:
+            ids = [r[0] for r in conn.execute(
+                f'SELECT id FROM main.responses WHERE {where} ORDER BY id LIMIT ?', (before, period, chunk_size))]
+            if not ids:
+                break
+            marks = ', '.join('?' * len(ids))
+            try:
+                # A plain INSERT: an id already in the partition fails the chunk rather than being dropped
+                copied = conn.execute(f'INSERT INTO arc.responses ({cols}) SELECT {cols} FROM main.responses '
+                                      f'WHERE id IN ({marks})', ids).rowcount
+                if copied != len(ids):
+                    raise RuntimeError(f'{period}: copied {copied} of {len(ids)} responses; nothing deleted')
+            except (sqlite3.IntegrityError, RuntimeError):
+                conn.rollback()
+                raise
+            _index_partition(conn, period, ids)
+            conn.execute(f'DELETE FROM main.responses WHERE id IN ({marks})', ids)
+            scoring.bump_generation(conn)
+            conn.commit()
+            moved += len(ids)
+            if pause:
+                time.sleep(pause)
+        rows, min_date, max_date, min_id, max_id = conn.execute(
+            'SELECT COUNT(*), MIN(submission_date), MAX(submission_date), MIN(id), MAX(id) FROM arc.responses').fetchone()
+        conn.execute('''
+            INSERT INTO archive_partitions (period, path, rows, min_date, max_date, min_id, max_id, archived_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(period) DO UPDATE SET
+                path = excluded.path, rows = excluded.rows, min_date = excluded.min_date,
+                max_date = excluded.max_date, min_id = excluded.min_id, max_id = excluded.max_id,
+                archived_at = excluded.archived_at
+        ''', (period, os.path.relpath(path, BASE_DIR), rows, min_date, max_date, min_id, max_id))
+        conn.commit()
+    finally:
+        conn.execute('DETACH DATABASE arc')
+    return moved
+
+
+def archive_responses(conn, before, period='quarter', chunk_size=CHUNK_SIZE, pause=0.0):
+    """Move responses submitted before `before` into their period's archive file."""
+    ensure_archive_schema(conn)
+    period_sql = PERIOD_SQL[period]
+    periods = [r[0] for r in conn.execute(
+        f'SELECT DISTINCT {period_sql} FROM main.responses WHERE submission_date < ? ORDER BY 1', (before,))]
+    total = 0
+    for p in periods:
+        moved = archive_period(conn, p, period_sql, before, chunk_size, pause)
+        print(f"{p}: moved {moved} responses to {partition_path(conn, p)}")
+        total += moved
+    return total
+
+
+def list_partitions(conn, start=None, end=None):
+    """Archive partitions overlapping [start, end), oldest first."""
+    try:
+        return conn.execute('''
+            SELECT period, path, rows, min_date, max_date FROM archive_partitions
+            WHERE (? IS NULL OR max_date >= ?) AND (? IS NULL OR min_date < ?)
+            ORDER BY min_date
+        ''', (start, start, end, end)).fetchall()
+    except sqlite3.OperationalError:
+        # Nothing has been archived yet
+        return []
+
+
+def attach_history(conn, start=None, end=None, view='responses_all'):
+    """ATTACH the partitions overlapping [start, end) and create a TEMP view over hot + archived rows.
+
+    The view has the hot table's columns; columns missing from an older archive
+    read as NULL. Returns the view name.
+    """
+    partitions = list_partitions(conn, start, end)
+    if len(partitions) > MAX_ATTACHED:
+        raise ValueError(f'{len(partitions)} archive partitions in range; narrow the date range or archive by year')
+    # Unqualified so a snapshot connection's unified TEMP view is used for the hot side
+    cols = [r[1] for r in conn.execute("PRAGMA table_info('responses')").fetchall()]
+    selects = [f'SELECT {", ".join(cols)} FROM responses']
+    attached = {r[1] for r in conn.execute('PRAGMA database_list').fetchall()}
+    for i, part in enumerate(partitions):
+        schema = f'hist{i}'
+        if schema not in attached:
+            conn.execute(f'ATTACH DATABASE ? AS {schema}', (os.path.join(BASE_DIR, part[1]),))
+        have = set(_columns(conn, schema))
+        selects.append(f'SELECT {", ".join(c if c in have else f"NULL AS {c}" for c in cols)} FROM {schema}.responses')
+    conn.execute(f'DROP VIEW IF EXISTS temp.{view}')
+    conn.execute(f'CREATE TEMP VIEW {view} AS ' + ' UNION ALL '.join(selects))
+    return view
+
+
+def _fetch_archived(conn, path, where, params):
+    """One row from a single partition with the hot table's columns (missing ones as NULL)."""
+    cols = [r[1] for r in conn.execute("PRAGMA table_info('responses')").fetchall()]
+    conn.execute('ATTACH DATABASE ? AS lookup', (os.path.join(BASE_DIR, path),))
+    try:
+        have = set(_columns(conn, 'lookup'))
+        return conn.execute(
+            f'SELECT {", ".join(c if c in have else f"NULL AS {c}" for c in cols)} FROM lookup.responses WHERE {where}',
+            params).fetchone()
+    finally:
+        conn.execute('DETACH DATABASE lookup')
+
+
+def archived_response(conn, response_id):
+    """The archived response with this id, or None; attaches only partitions whose id range covers it."""
+    try:
+        paths = [r[0] for r in conn.execute('''
+            SELECT path FROM archive_partitions
+            WHERE (min_id IS NULL OR min_id <= ?) AND (max_id IS NULL OR max_id >= ?)
+            ORDER BY min_date DESC
+        ''', (response_id, response_id))]
+    except sqlite3.OperationalError:
+        # Nothing archived yet, or partitions from before the id ranges (run archive.py once)
+        return None
+    for path in paths:
+        row = _fetch_archived(conn, path, 'id = ?', (response_id,))
+        if row is not None:
+            return row
+    return None
+
+
+def latest_archived(conn, user_id):
+    """A user's latest archived response, or None without touching any partition if they have none."""
+    try:
+        found = conn.execute('''
+            SELECT u.latest_id, p.path FROM archive_users u JOIN archive_partitions p ON p.period = u.period
+            WHERE u.user_id = ?
+        ''', (user_id,)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+    if found is None:
+        return None
+    return _fetch_archived(conn, found[1], 'id = ?', (found[0],))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Archive old responses into per-period SQLite files')
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--before', help='Archive responses submitted before this date (YYYY-MM-DD)')
+    parser.add_argument('--period', choices=list(PERIOD_SQL), default='quarter')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks')
+    parser.add_argument('--list', action='store_true', help='List archive partitions')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.execute('PRAGMA busy_timeout = 5000')
+    # Also fills in id ranges and archive_users for partitions written by older versions
+    ensure_archive_schema(conn)
+    if args.before:
+        start = time.perf_counter()
+        total = archive_responses(conn, args.before, args.period, args.chunk_size, args.pause)
+        hot = conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+        print(f"Archived {total} responses in {time.perf_counter() - start:.1f}s; {hot} remain in the hot table.")
+    if args.list or not args.before:
+        for p in list_partitions(conn):
+            print(f"{p[0]:<8} {p[2]:>8} rows  {p[3]} .. {p[4]}  {p[1]}")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+"""Benchmark ("ideal set") computation job.
+
+Streams a SEM_JobStress_Productivity_*.csv file or the responses table in chunks,
+keeps numerically stable running means per construct (overall and optionally per
+department) and writes a versioned ideal_set.json that app.py reloads when it changes.
+
+    python benchmarks.py SEM_JobStress_Productivity_5000.csv --by-department
+    python benchmarks.py --db database.db
+"""
+import argparse
+import csv
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+
+from constructs import CONSTRUCTS, DB_COLUMNS, STRESS_SCORE, PROD_SCORE, item_columns, derive_row
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+IDEAL_SET_PATH = os.path.join(BASE_DIR, 'ideal_set.json')
+FIELDS = CONSTRUCTS + [STRESS_SCORE, PROD_SCORE]
+CHUNK_SIZE = 10000
+
+
+class RunningStats:
+    """Per-column count, mean and M2, merged one chunk at a time (Chan et al.)."""
+
+    def __init__(self, width):
+        self.n = np.zeros(width)
+        self.mean = np.zeros(width)
+        self.m2 = np.zeros(width)
+
+    def update(self, block):
+        block = np.asarray(block, dtype=float)
+        if block.size == 0:
+            return
+        valid = ~np.isnan(block)
+        n_b = valid.sum(axis=0).astype(float)
+        sums = np.where(valid, block, 0.0).sum(axis=0)
+        mean_b = np.divide(sums, n_b, out=np.zeros_like(sums), where=n_b > 0)
+        m2_b = (np.where(valid, block - mean_b, 0.0) ** 2).sum(axis=0)
+
+        total = self.n + n_b
+        safe_total = np.where(total > 0, total, 1.0)
+        delta = mean_b - self.mean
+        self.mean = self.mean + delta * n_b / safe_total
+        self.m2 = self.m2 + m2_b + delta ** 2 * self.n * n_b / safe_total
+        self.n = total
+
+    def as_dict(self, names):
+        out = {'rows': int(self.n.max()) if self.n.size else 0, 'means': {}, 'std': {}}
+        for i, name in enumerate(names):
+            if self.n[i] > 0:
+                out['means'][name] = round(float(self.mean[i]), 2)
+                out['std'][name] = round(float(np.sqrt(self.m2[i] / self.n[i])), 4)
+        return out
+
+
+def _accumulate(chunks, by_department):
+    overall = RunningStats(len(FIELDS))
+    departments = {}
+    for departments_col, block in chunks:
+        overall.update(block)
+        if not by_department:
+            continue
+        departments_col = np.asarray(departments_col, dtype=object)
+        for dept in set(departments_col):
+            stats = departments.setdefault(dept or 'Unknown', RunningStats(len(FIELDS)))
+            stats.update(block[departments_col == dept])
+    return overall, departments
+
+
+def iter_csv_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield (departments, values) blocks from any of the shipped CSV layouts."""
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.DictReader(f)
+        mapping = item_columns(reader.fieldnames)
+        while True:
+            rows = list(itertools.islice(reader, chunk_size))
+            if not rows:
+                break
+            derived = [derive_row(row, mapping) for row in rows]
+            block = np.array([[np.nan if d[k] is None else d[k] for k in FIELDS] for d in derived])
+            yield [row.get('Department') for row in rows], block
+
+
+def iter_db_chunks(db_path, chunk_size=CHUNK_SIZE):
+    """Yield (departments, values) blocks from the responses table."""
+    cols = ', '.join(f'r.{DB_COLUMNS[c]}' for c in CONSTRUCTS)
+    conn = sqlite3.connect(db_path)
+    try:
+        cur = conn.execute(f'''
+            SELECT u.department, {cols}, r.job_stress_score, r.productivity_score
+            FROM responses r
+            LEFT JOIN users u ON r.user_id = u.id
+        ''')
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            block = np.array([[np.nan if v is None else v for v in row[1:]] for row in rows], dtype=float)
+            yield [row[0] for row in rows], block
+    finally:
+        conn.close()
+
+
+def compute(chunks, source, by_department=False):
+    overall, departments = _accumulate(chunks, by_department)
+    result = overall.as_dict(FIELDS)
+    artifact = {
+        'source': source,
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'rows': result['rows'],
+        'overall': result['means'],
+        'std': result['std']
+    }
+    if by_department:
+        artifact['departments'] = {
+            dept: stats.as_dict(FIELDS) for dept, stats in sorted(departments.items())
+        }
+    return artifact
+
+
+def write_artifact(artifact, path=IDEAL_SET_PATH):
+    """Write the artifact atomically, bumping the version when the means change."""
+    previous = read_artifact(path)
+    digest = hashlib.sha1(json.dumps(
+        [artifact['overall'], artifact.get('departments')], sort_keys=True).encode()).hexdigest()[:12]
+    version = previous.get('version', 0) if previous else 0
+    if not previous or previous.get('checksum') != digest:
+        version += 1
+    artifact = dict(artifact, version=version, checksum=digest)
+
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(artifact, f, indent=2)
+    os.replace(tmp_path, path)
+    return artifact
+
+
+def read_artifact(path=IDEAL_SET_PATH):
+    """Load ideal_set.json, upgrading the original flat layout on the fly."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        data = json.load(f)
+    if 'overall' not in data:
+        data = {'version': 0, 'source': 'legacy', 'rows': None, 'overall': data}
+    return data
+
+
+_loaded = {'mtime': None, 'data': None}
+
+
+def load_ideal_set(path=IDEAL_SET_PATH):
+    """In-memory copy of the artifact, re-read only when the file's mtime changes."""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError:
+        return _loaded['data']
+    if mtime != _loaded['mtime']:
+        try:
+            _loaded['data'] = read_artifact(path)
+            _loaded['mtime'] = mtime
+        except (OSError, ValueError) as e:
+            print(f"Error loading benchmarks from {path}: {e}")
+    return _loaded['data']
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute construct benchmarks into ideal_set.json')
+    parser.add_argument('csv', nargs='?', help='SEM_JobStress_Productivity_*.csv to stream')
+    parser.add_argument('--db', help='Use the responses table of this SQLite database instead')
+    parser.add_argument('--by-department', action='store_true', help='Also compute per-department means')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--output', default=IDEAL_SET_PATH)
+    args = parser.parse_args()
+
+    if args.db:
+        chunks = iter_db_chunks(args.db, args.chunk_size)
+        source = f'db:{os.path.basename(args.db)}'
+    elif args.csv:
+        chunks = iter_csv_chunks(args.csv, args.chunk_size)
+        source = os.path.basename(args.csv)
+    else:
+        parser.error('Pass a CSV path or --db')
+
+    artifact = write_artifact(compute(chunks, source, args.by_department), args.output)
+    print(f"Benchmarks v{artifact['version']} from {artifact['rows']} rows ({source}) written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,13 @@
 import joblib
-import pandas as pd
-import numpy as np
 import os
+from dataset_cache import load_frame
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.join(BASE_DIR, 'SEM_JobStress_Productivity_5000.csv')
 
 def check():
-    df = pd.read_csv(DATA_PATH)
-    stress_cols = ['Workload', 'Role_Ambiguity', 'Job_Security', 'Gender_Discrimination',
-                   'Interpersonal_Relationships', 'Resource_Constraints', 'Job_Satisfaction', 'Organizational_Support']
-    prod_cols = ['Timings', 'Supervisor_Competence', 'Compensation', 'Systems_Procedures']
-    
-    df['Job_Stress_Score'] = df[stress_cols].mean(axis=1)
-    df['Productivity_Score'] = df[prod_cols].mean(axis=1)
+    # Composite scores are derived once and cached alongside the CSV (see dataset_cache.py)
+    df = load_frame(DATA_PATH, ['Job_Stress_Score', 'Productivity_Score'])
     
     corr = df['Job_Stress_Score'].corr(df['Productivity_Score'])
     print(f"Correlation between Stress and Productivity: {corr}")
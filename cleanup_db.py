@@ -1,21 +1,137 @@
+import argparse
 import sqlite3
+import time
+
+from importer import ensure_import_schema, list_batches
 
 DB_NAME = 'database.db'
+CHUNK_SIZE = 500
+VACUUM_PAGES = 1000
 
-def cleanup():
-    conn = sqlite3.connect(DB_NAME)
-    c = conn.cursor()
-    
-    # Delete responses for csv users
-    c.execute("DELETE FROM responses WHERE user_id IN (SELECT id FROM users WHERE username LIKE 'csv_user_%')")
-    
-    # Delete the users
-    c.execute("DELETE FROM users WHERE username LIKE 'csv_user_%'")
-    
-    print("Deleted all csv_user records and their responses via pattern match.")
-        
+
+def _delete_chunked(conn, table, where, params, chunk_size, pause):
+    """Delete matching rows `chunk_size` at a time, committing after each chunk.
+
+    Each transaction only holds the write lock for one small DELETE, so the live
+    app can interleave its own writes between chunks.
+    """
+    total = 0
+    while True:
+        cur = conn.execute(
+            f'DELETE FROM {table} WHERE id IN (SELECT id FROM {table} WHERE {where} LIMIT ?)',
+            (*params, chunk_size))
+        conn.commit()
+        if cur.rowcount <= 0:
+            return total
+        total += cur.rowcount
+        if pause:
+            time.sleep(pause)
+
+
+def delete_batch(conn, batch_id, chunk_size=CHUNK_SIZE, pause=0.0):
+    # Also responses the batch's users later submitted through the web, which carry no batch tag
+    responses = _delete_chunked(
+        conn, 'responses', 'import_batch_id = ? OR user_id IN (SELECT id FROM users WHERE import_batch_id = ?)',
+        (batch_id, batch_id), chunk_size, pause)
+    users = _delete_chunked(conn, 'users', 'import_batch_id = ?', (batch_id,), chunk_size, pause)
+    conn.execute("UPDATE import_batches SET status = 'deleted' WHERE id = ?", (batch_id,))
     conn.commit()
+    print(f"Batch {batch_id}: deleted {responses} responses and {users} users.")
+
+
+def adopt_legacy(conn, chunk_size=CHUNK_SIZE):
+    """Tag csv_user_* rows imported before batches existed with a new 'legacy' batch."""
+    if not conn.execute(
+            "SELECT 1 FROM users WHERE import_batch_id IS NULL AND username LIKE 'csv_user_%' LIMIT 1").fetchone():
+        return None
+    cur = conn.execute("INSERT INTO import_batches (source, status) VALUES ('legacy csv_user_*', 'complete')")
+    batch_id = cur.lastrowid
+    conn.commit()
+    tagged = 0
+    while True:
+        cur = conn.execute('''
+            UPDATE users SET import_batch_id = ?
+            WHERE id IN (SELECT id FROM users WHERE import_batch_id IS NULL AND username LIKE 'csv_user_%' LIMIT ?)
+        ''', (batch_id, chunk_size))
+        conn.commit()
+        if cur.rowcount <= 0:
+            break
+        tagged += cur.rowcount
+    while True:
+        cur = conn.execute('''
+            UPDATE responses SET import_batch_id = ?
+            WHERE id IN (
+                SELECT r.id FROM responses r JOIN users u ON r.user_id = u.id
+                WHERE r.import_batch_id IS NULL AND u.import_batch_id = ? LIMIT ?
+            )
+        ''', (batch_id, batch_id, chunk_size))
+        conn.commit()
+        if cur.rowcount <= 0:
+            break
+    conn.execute('UPDATE import_batches SET rows_imported = ? WHERE id = ?', (tagged, batch_id))
+    conn.commit()
+    print(f"Tagged {tagged} legacy csv_user records as batch {batch_id}.")
+    return batch_id
+
+
+def incremental_vacuum(conn, pages=VACUUM_PAGES):
+    """Return free pages to the OS a few at a time instead of a blocking full VACUUM."""
+    if conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        print("auto_vacuum is not INCREMENTAL; run once with --enable-incremental-vacuum to allow shrinking.")
+        return
+    freed = 0
+    while True:
+        free = conn.execute('PRAGMA freelist_count').fetchone()[0]
+        if free == 0:
+            break
+        # executescript steps the pragma to completion; execute() would free a single page
+        conn.executescript(f'PRAGMA incremental_vacuum({min(pages, free)})')
+        freed += min(pages, free)
+    print(f"Incremental vacuum released {freed} pages.")
+
+
+def enable_incremental_vacuum(conn):
+    # Switching an existing database to incremental mode needs one full VACUUM.
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('VACUUM')
+    print("auto_vacuum set to INCREMENTAL.")
+
+
+def cleanup():
+    parser = argparse.ArgumentParser(description='Remove imported CSV data in small transactions')
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--list', action='store_true', help='List import batches')
+    parser.add_argument('--batch', type=int, action='append', help='Delete this batch id (repeatable)')
+    parser.add_argument('--all', action='store_true', help='Delete every import batch, including legacy csv_user_* rows')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--pause', type=float, default=0.0, help='Seconds to sleep between chunks')
+    parser.add_argument('--enable-incremental-vacuum', action='store_true')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.execute('PRAGMA busy_timeout = 5000')
+    ensure_import_schema(conn)
+
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum(conn)
+
+    if args.list:
+        for b in list_batches(conn):
+            print(f"{b[0]:>4}  {b[2]:<9} {b[3] or 0:>7} rows  {b[1]}  ({b[4]} - {b[5] or ''})")
+
+    batch_ids = list(args.batch or [])
+    if args.all or not (args.list or batch_ids or args.enable_incremental_vacuum):
+        # Without arguments behave like the original script: remove all imported data
+        adopt_legacy(conn, args.chunk_size)
+        batch_ids = [b[0] for b in list_batches(conn) if b[2] != 'deleted']
+
+    for batch_id in batch_ids:
+        delete_batch(conn, batch_id, args.chunk_size, args.pause)
+
+    if batch_ids:
+        incremental_vacuum(conn)
     conn.close()
 
+
 if __name__ == '__main__':
     cleanup()
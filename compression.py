@@ -0,0 +1,106 @@
+import gzip
+import threading
+import time
+
+from flask import current_app, request
+
+# Mimetypes worth compressing; images and already-compressed payloads are left alone
+COMPRESSIBLE_TYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/csv',
+    'application/json', 'application/javascript'
+}
+
+_lock = threading.Lock()
+_stats = {
+    'responses': 0,
+    'compressed': 0,
+    'precompressed_hits': 0,
+    'skipped_small': 0,
+    'bytes_uncompressed': 0,
+    'bytes_on_wire': 0,
+    'compress_seconds': 0.0
+}
+
+
+def _record(**deltas):
+    with _lock:
+        for key, value in deltas.items():
+            _stats[key] += value
+
+
+def reset():
+    """Zero the counters in a freshly forked worker."""
+    global _lock
+    _lock = threading.Lock()
+    for key in _stats:
+        _stats[key] = 0
+
+
+def stats():
+    with _lock:
+        out = dict(_stats)
+    out['compress_seconds'] = round(out['compress_seconds'], 6)
+    if out['bytes_uncompressed']:
+        out['wire_ratio'] = round(out['bytes_on_wire'] / out['bytes_uncompressed'], 4)
+    return out
+
+
+def client_accepts_gzip():
+    return request.accept_encodings['gzip'] > 0
+
+
+def gzip_bytes(data):
+    """Compress `data`, timing it for /admin/metrics. mtime=0 keeps the output deterministic."""
+    start = time.perf_counter()
+    out = gzip.compress(data, compresslevel=current_app.config['COMPRESS_LEVEL'], mtime=0)
+    _record(compress_seconds=time.perf_counter() - start)
+    return out
+
+
+def cached_variant(entry, body):
+    """Return (body, encoding) for a cached render, storing the gzip variant in `entry`.
+
+    `entry` is the dict kept in a TTLCache next to the uncompressed html, so each
+    render is compressed at most once per cache lifetime.
+    """
+    if len(body) < current_app.config['COMPRESS_MIN_SIZE'] or not client_accepts_gzip():
+        return body, None
+    compressed = entry.get('gzip')
+    if compressed is None:
+        compressed = entry['gzip'] = gzip_bytes(body)
+    else:
+        _record(precompressed_hits=1)
+    _record(responses=1, compressed=1, bytes_uncompressed=len(body), bytes_on_wire=len(compressed))
+    return compressed, 'gzip'
+
+
+def compress_response(response):
+    """after_request hook: gzip large text responses when the client accepts it."""
+    response.vary.add('Accept-Encoding')
+    if response.direct_passthrough or response.is_streamed or response.status_code != 200:
+        return response
+    if response.headers.get('Content-Encoding'):
+        # Already encoded and counted by cached_variant()
+        return response
+
+    body = response.get_data()
+    if (response.mimetype not in COMPRESSIBLE_TYPES or not client_accepts_gzip()
+            or len(body) < current_app.config['COMPRESS_MIN_SIZE']):
+        _record(responses=1, skipped_small=int(len(body) < current_app.config['COMPRESS_MIN_SIZE']),
+                bytes_uncompressed=len(body), bytes_on_wire=len(body))
+        return response
+
+    compressed = gzip_bytes(body)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = 'gzip'
+    if response.get_etag()[0]:
+        etag, weak = response.get_etag()
+        response.set_etag(etag + '-gzip', weak=weak)
+    _record(responses=1, compressed=1, bytes_uncompressed=len(body), bytes_on_wire=len(compressed))
+    return response
+
+
+def init_app(app):
+    app.config.setdefault('COMPRESS_MIN_SIZE', 1024)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.after_request(compress_response)
@@ -0,0 +1,178 @@
+import re
+
+# Construct definitions shared by the importers, benchmark job and analysis scripts.
+STRESS_CONSTRUCTS = [
+    'Workload', 'Role_Ambiguity', 'Job_Security', 'Gender_Discrimination',
+    'Interpersonal_Relationships', 'Resource_Constraints', 'Job_Satisfaction', 'Organizational_Support'
+]
+PROD_CONSTRUCTS = ['Timings', 'Supervisor_Competence', 'Compensation', 'Systems_Procedures']
+CONSTRUCTS = STRESS_CONSTRUCTS + PROD_CONSTRUCTS
+
+# Composite score names as they appear in ideal_set.json
+STRESS_SCORE = 'Stress_Score'
+PROD_SCORE = 'Prod_Score'
+
+# Stress level bands (< 2 Low, <= 3 Medium, otherwise High), stored on responses as the
+# generated stress_level column; stress_bucket rounds the score down to 0.5 steps
+STRESS_LEVELS = ('Low', 'Medium', 'High')
+STRESS_LEVEL_SQL = ("CASE WHEN job_stress_score IS NULL THEN NULL WHEN job_stress_score < 2 THEN 'Low' "
+                    "WHEN job_stress_score <= 3 THEN 'Medium' ELSE 'High' END")
+STRESS_BUCKET_SQL = 'CAST(job_stress_score * 2 AS INTEGER) / 2.0'
+
+# responses table column for each construct
+DB_COLUMNS = {
+    'Workload': 'workload',
+    'Role_Ambiguity': 'role_ambiguity',
+    'Job_Security': 'job_security',
+    'Gender_Discrimination': 'gender_discrim',
+    'Interpersonal_Relationships': 'interpersonal',
+    'Resource_Constraints': 'resources',
+    'Job_Satisfaction': 'satisfaction',
+    'Organizational_Support': 'support',
+    'Timings': 'timings',
+    'Supervisor_Competence': 'supervisor',
+    'Compensation': 'compensation',
+    'Systems_Procedures': 'systems'
+}
+
+# Raw item columns of edited_job_stress_productivity_dataset.csv
+EDITED_ITEMS = {
+    'Workload': ['Workload_TargetTime', 'Workload_ExtraWork'],
+    'Role_Ambiguity': ['RoleAmbiguity_ClearInfo'],
+    'Job_Security': ['JobSecurity_Secure'],
+    'Gender_Discrimination': ['GenderDiscrimination_EqualGrowth'],
+    'Interpersonal_Relationships': ['Interpersonal_GoodRelations'],
+    'Resource_Constraints': ['Resources_EnoughTime'],
+    'Job_Satisfaction': ['JobSatisfaction_WorkConditions'],
+    'Organizational_Support': ['OrgSupport_Training', 'OrgSupport_CareerGrowth'],
+    'Timings': ['Productivity_TimeUtilization'],
+    'Supervisor_Competence': ['Supervisor_Motivation', 'Supervisor_Communication'],
+    'Compensation': ['Compensation_Salary'],
+    'Systems_Procedures': ['Systems_QualityProcedures']
+}
+
+# Item prefixes of the 40-item layout (SEM_JobStress_Productivity_GenderBalanced.csv)
+ITEM_PREFIXES = {
+    'WL': 'Workload',
+    'RA': 'Role_Ambiguity',
+    'JS': 'Job_Security',
+    'GD': 'Gender_Discrimination',
+    'IR': 'Interpersonal_Relationships',
+    'RC': 'Resource_Constraints',
+    'JSAT': 'Job_Satisfaction',
+    'OS': 'Organizational_Support',
+    'TIM': 'Timings',
+    'COS': 'Supervisor_Competence',
+    'COM': 'Compensation',
+    'SAP': 'Systems_Procedures'
+}
+_ITEM_RE = re.compile(r'^([A-Z]+)\d+_')
+
+
+def item_columns(header):
+    """Return {construct: [columns]} for a CSV header, whichever layout it uses.
+
+    Construct-level files (the SEM_* exports) map each construct to its own column.
+    """
+    header = list(header)
+    if all(c in header for c in CONSTRUCTS):
+        return {c: [c] for c in CONSTRUCTS}
+    if all(col in header for cols in EDITED_ITEMS.values() for col in cols):
+        return dict(EDITED_ITEMS)
+    mapping = {c: [] for c in CONSTRUCTS}
+    for col in header:
+        m = _ITEM_RE.match(col)
+        if m and m.group(1) in ITEM_PREFIXES:
+            mapping[ITEM_PREFIXES[m.group(1)]].append(col)
+    missing = [c for c, cols in mapping.items() if not cols]
+    if missing:
+        raise ValueError(f"Unrecognised dataset layout, no columns for: {', '.join(missing)}")
+    return mapping
+
+
+def derive_row(row, mapping):
+    """Construct means plus the two composites for one CSV row (dict of strings)."""
+    out = {}
+    for construct, cols in mapping.items():
+        vals = [float(row[c]) for c in cols if row.get(c) not in (None, '')]
+        out[construct] = sum(vals) / len(vals) if vals else None
+    stress = [out[c] for c in STRESS_CONSTRUCTS if out[c] is not None]
+    prod = [out[c] for c in PROD_CONSTRUCTS if out[c] is not None]
+    out[STRESS_SCORE] = sum(stress) / len(stress) if stress else None
+    out[PROD_SCORE] = sum(prod) / len(prod) if prod else None
+    return out
+
+
+# The web questionnaire (app.py). Answers are q1..qN in this order; rescore.py and
+# scoring.QUESTION_LAYOUT read it from here so they need not import the app.
+# Question configuration (reduced to 15 items)
+QUESTIONS = {
+    "Job Stress": {
+        "Workload": [
+            "I am able to reach the target within the specified time.",
+            "I am suddenly burdened with more work without sufficient time."
+        ],
+        "Role Ambiguity": [
+            "Sufficient and clear information is provided to perform my tasks."
+        ],
+        "Job Security": [
+            "I feel secure in my job."
+        ],
+        "Gender Discrimination": [
+            "Equal career growth opportunities are provided."
+        ],
+        "Interpersonal Relationships": [
+            "Relationships at all levels are good."
+        ],
+        "Resource Constraints": [
+            "Enough time is provided to complete tasks."
+        ],
+        "Job Satisfaction": [
+            "I am satisfied with working conditions."
+        ],
+        "Organizational Support": [
+            "Training is provided regularly.",
+            "Career development is encouraged."
+        ]
+    },
+    "Productivity": {
+        "Timings": [
+            "I utilize time efficiently."
+        ],
+        "Supervisor Competence": [
+            "Supervisor motivates employees.",
+            "Supervisor communicates clearly."
+        ],
+        "Compensation": [
+            "I am satisfied with salary."
+        ],
+        "Systems & Procedures": [
+            "Procedures ensure quality work."
+        ]
+    }
+}
+
+# Role-specific additional questions (appended to the main questionnaire)
+ROLE_QUESTIONS = {
+    'Manager': [
+        "I clearly delegate tasks to my team.",
+        "I receive adequate support from senior management.",
+        "I have the autonomy to make decisions for my team."
+    ],
+    'Senior': [
+        "I mentor junior colleagues regularly.",
+        "My role involves handling complex tasks independently."
+    ],
+    'Junior': [
+        "I receive clear guidance on my tasks.",
+        "I have opportunities to learn on the job."
+    ],
+    'Intern': [
+        "I get sufficient onboarding and training.",
+        "My tasks are appropriate for my experience level."
+    ],
+    'Staff': [
+        "I have clarity on my daily responsibilities.",
+        "I receive timely feedback on my work."
+    ]
+}
@@ -0,0 +1,172 @@
+"""Columnar cache for the SEM_JobStress_Productivity_*.csv datasets.
+
+Each CSV is parsed once into .dataset_cache/<name>-<sha1>/ with one .npy file per
+column (source columns plus the derived construct and composite scores). Later loads
+memory-map only the columns a script asks for:
+
+    df = load_frame('SEM_JobStress_Productivity_5000.csv', ['Job_Stress_Score', 'Productivity_Score'])
+
+    python dataset_cache.py SEM_JobStress_Productivity_*.csv   # warm the cache
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+
+import numpy as np
+
+from constructs import STRESS_CONSTRUCTS, PROD_CONSTRUCTS, item_columns
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get('DATASET_CACHE_DIR', os.path.join(BASE_DIR, '.dataset_cache'))
+JOB_STRESS_SCORE = 'Job_Stress_Score'
+PRODUCTIVITY_SCORE = 'Productivity_Score'
+
+_index_lock = threading.Lock()
+
+
+def _file_hash(path):
+    hasher = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def _index_path():
+    return os.path.join(CACHE_DIR, 'index.json')
+
+
+def _read_index():
+    try:
+        with open(_index_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_index(index):
+    tmp = _index_path() + f'.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(index, f, indent=1)
+    os.replace(tmp, _index_path())
+
+
+def derive_columns(df):
+    """Add construct means and the two composite scores to a raw dataset frame."""
+    mapping = item_columns(df.columns)
+    derived = {}
+    for construct, cols in mapping.items():
+        if cols != [construct]:
+            derived[construct] = df[cols].astype(float).mean(axis=1)
+    for name, values in derived.items():
+        df[name] = values
+    df[JOB_STRESS_SCORE] = df[STRESS_CONSTRUCTS].mean(axis=1)
+    df[PRODUCTIVITY_SCORE] = df[PROD_CONSTRUCTS].mean(axis=1)
+    return df
+
+
+def _build(path, key):
+    import pandas as pd
+
+    df = pd.read_csv(path)
+    source_columns = list(df.columns)
+    derive_columns(df)
+
+    target = os.path.join(CACHE_DIR, key)
+    tmp = f'{target}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    columns = {}
+    for i, col in enumerate(df.columns):
+        series = df[col]
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            values = series.to_numpy()
+        else:
+            # Fixed-width unicode so text columns can be memory-mapped too
+            values = np.array(series.fillna('').astype(str).tolist(), dtype=str)
+        fname = f'{i:03d}.npy'
+        np.save(os.path.join(tmp, fname), values)
+        columns[col] = {'file': fname, 'dtype': str(values.dtype)}
+    meta = {
+        'source': os.path.basename(path),
+        'rows': len(df),
+        'source_columns': source_columns,
+        'derived_columns': [c for c in df.columns if c not in source_columns],
+        'columns': columns
+    }
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=1)
+    if os.path.isdir(target):
+        # Another process built the same content concurrently
+        shutil.rmtree(tmp, ignore_errors=True)
+    else:
+        os.replace(tmp, target)
+    return target
+
+
+def cache_dir_for(path):
+    """Return the cache directory for `path`, converting the CSV on first use.
+
+    Files are keyed by content hash; an index of (size, mtime) avoids re-hashing
+    unchanged files on every load.
+    """
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with _index_lock:
+        index = _read_index()
+        entry = index.get(path)
+        if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+            target = os.path.join(CACHE_DIR, entry['key'])
+            if os.path.isdir(target):
+                return target
+        stem = os.path.splitext(os.path.basename(path))[0]
+        key = f'{stem}-{_file_hash(path)[:16]}'
+        target = os.path.join(CACHE_DIR, key)
+        if not os.path.isdir(target):
+            print(f"Building dataset cache for {os.path.basename(path)}...")
+            _build(path, key)
+        index[path] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'key': key}
+        _write_index(index)
+    return target
+
+
+def load_meta(path):
+    with open(os.path.join(cache_dir_for(path), 'meta.json')) as f:
+        return json.load(f)
+
+
+def load_columns(path, columns=None, mmap_mode='r'):
+    """Dict of column name -> memory-mapped array. Defaults to the source columns."""
+    target = cache_dir_for(path)
+    with open(os.path.join(target, 'meta.json')) as f:
+        meta = json.load(f)
+    if columns is None:
+        columns = meta['source_columns']
+    missing = [c for c in columns if c not in meta['columns']]
+    if missing:
+        raise KeyError(f"{meta['source']} has no column(s): {', '.join(missing)}")
+    return {
+        col: np.load(os.path.join(target, meta['columns'][col]['file']), mmap_mode=mmap_mode)
+        for col in columns
+    }
+
+
+def load_frame(path, columns=None):
+    """pandas DataFrame of the requested columns (source columns by default)."""
+    import pandas as pd
+
+    return pd.DataFrame(load_columns(path, columns))
+
+
+def source_columns(path):
+    return load_meta(path)['source_columns']
+
+
+if __name__ == '__main__':
+    for csv_path in sys.argv[1:]:
+        meta = load_meta(csv_path)
+        print(f"{meta['source']}: {meta['rows']} rows, {len(meta['columns'])} columns cached in {cache_dir_for(csv_path)}")
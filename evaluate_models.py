@@ -0,0 +1,184 @@
+"""Evaluate every trained model against every shipped dataset in parallel.
+
+Each (model, dataset) pair runs in its own worker process. Workers read
+Job_Stress_Score / Productivity_Score / Department from the memory-mapped
+dataset cache (dataset_cache.py), so the column data is shared through the page
+cache. Point metrics come with bootstrap confidence intervals, overall and per
+department, and the results are written to a JSON report.
+
+    python evaluate_models.py --bootstrap 2000 --workers 8
+"""
+import argparse
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from dataset_cache import load_columns, cache_dir_for, JOB_STRESS_SCORE, PRODUCTIVITY_SCORE
+from segments import SegmentRouter
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DATASETS = [
+    'SEM_JobStress_Productivity_2000.csv',
+    'SEM_JobStress_Productivity_2000_HR_Finance.csv',
+    'SEM_JobStress_Productivity_5000.csv',
+    'SEM_JobStress_Productivity_GenderBalanced.csv'
+]
+MODELS = {
+    'Linear Regression': 'model_lr.pkl',
+    'Random Forest': 'model_rf.pkl',
+    'Gradient Boosting': 'model_gb.pkl',
+    'Logistic Regression': 'model_log.pkl'
+}
+MODELS_BY_KEY = {'lr': os.path.join(BASE_DIR, 'model_lr.pkl'), 'rf': os.path.join(BASE_DIR, 'model_rf.pkl')}
+SCALER_PATH = os.path.join(BASE_DIR, 'scaler.pkl')
+THRESHOLD_PATH = os.path.join(BASE_DIR, 'threshold.txt')
+BOOTSTRAP_BATCH = 200
+# Pseudo model paths: route each row to its department model, global model otherwise
+SEGMENT_PREFIX = 'segments:'
+
+_loaded = {}
+
+
+def _load(path):
+    # Each worker unpickles a model at most once, however many datasets it scores
+    if path not in _loaded:
+        import joblib
+        _loaded[path] = joblib.load(path)
+    return _loaded[path]
+
+
+def r2_rows(y, p):
+    """R^2 for each row of (B, n) target/prediction matrices."""
+    ss_res = ((y - p) ** 2).sum(axis=1)
+    ss_tot = ((y - y.mean(axis=1, keepdims=True)) ** 2).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 1 - ss_res / ss_tot
+
+
+def accuracy_rows(y, p):
+    return (y == p).mean(axis=1)
+
+
+def bootstrap(metric, y, p, n_boot, rng, alpha=0.05):
+    """Point estimate and percentile CI of metric(y, p) over n_boot resamples."""
+    n = len(y)
+    point = float(metric(y[None, :], p[None, :])[0])
+    if n_boot <= 0 or n < 2:
+        return {'n': n, 'value': point}
+    samples = []
+    for start in range(0, n_boot, BOOTSTRAP_BATCH):
+        idx = rng.integers(0, n, size=(min(BOOTSTRAP_BATCH, n_boot - start), n))
+        samples.append(metric(y[idx], p[idx]))
+    samples = np.concatenate(samples)
+    samples = samples[np.isfinite(samples)]
+    lo, hi = np.percentile(samples, [100 * alpha / 2, 100 * (1 - alpha / 2)]) if samples.size else (None, None)
+    return {
+        'n': n,
+        'value': round(point, 6),
+        'ci_low': None if lo is None else round(float(lo), 6),
+        'ci_high': None if hi is None else round(float(hi), 6)
+    }
+
+
+def evaluate_pair(model_name, model_path, dataset_path, n_boot, seed):
+    """Score one model on one dataset; runs inside a worker process."""
+    start = time.perf_counter()
+    cols = load_columns(dataset_path, [JOB_STRESS_SCORE, PRODUCTIVITY_SCORE, 'Department'])
+    x = np.asarray(cols[JOB_STRESS_SCORE], dtype=float)
+    y = np.asarray(cols[PRODUCTIVITY_SCORE], dtype=float)
+    depts = np.asarray(cols['Department'])
+
+    result = {'model': model_name, 'dataset': os.path.basename(dataset_path)}
+    segment_model = model_path[len(SEGMENT_PREFIX):] if model_path.startswith(SEGMENT_PREFIX) else None
+    try:
+        model = _load(MODELS_BY_KEY[segment_model] if segment_model else model_path)
+        scaler = _load(SCALER_PATH)
+    except Exception as e:
+        result['error'] = f'{type(e).__name__}: {e}'
+        return result
+
+    if segment_model:
+        pred, keys = SegmentRouter().predict_batch(segment_model, x, depts, fallback=(scaler, model))
+        result['segment_rows'] = sum(key is not None for key in keys)
+    else:
+        pred = model.predict(scaler.transform(x.reshape(-1, 1)))
+    if hasattr(model, 'predict_proba'):
+        # Classifier: High vs Low productivity around the training threshold
+        threshold = 3.5
+        if os.path.exists(THRESHOLD_PATH):
+            with open(THRESHOLD_PATH) as f:
+                threshold = float(f.read().strip())
+        metric, metric_name, target = accuracy_rows, 'accuracy', (y > threshold).astype(int)
+    else:
+        metric, metric_name, target = r2_rows, 'r2', y
+
+    rng = np.random.default_rng(seed)
+    result['metric'] = metric_name
+    result['overall'] = bootstrap(metric, target, pred, n_boot, rng)
+    result['departments'] = {
+        str(d): bootstrap(metric, target[depts == d], pred[depts == d], n_boot, rng)
+        for d in np.unique(depts)
+    }
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Evaluate all models on all datasets with bootstrap CIs')
+    parser.add_argument('--datasets', nargs='*', default=DATASETS)
+    parser.add_argument('--models', nargs='*', default=list(MODELS), help='Model names (default: all)')
+    parser.add_argument('--model-glob', help='Also evaluate every model file matching this glob')
+    parser.add_argument('--segments', action='store_true',
+                        help='Also evaluate the per-department models from train_model.py --segments')
+    parser.add_argument('--bootstrap', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default=os.path.join(BASE_DIR, 'evaluation_report.json'))
+    args = parser.parse_args()
+
+    models = {name: os.path.join(BASE_DIR, MODELS[name]) for name in args.models}
+    if args.model_glob:
+        models.update({os.path.basename(p): p for p in sorted(glob.glob(args.model_glob))})
+    if args.segments:
+        models.update({f'Segmented {key}': SEGMENT_PREFIX + key for key in MODELS_BY_KEY})
+    datasets = [p if os.path.isabs(p) else os.path.join(BASE_DIR, p) for p in args.datasets]
+    # Build the columnar caches once up front so workers only ever memory-map them
+    for path in datasets:
+        cache_dir_for(path)
+
+    start = time.perf_counter()
+    results = []
+    with ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [
+            pool.submit(evaluate_pair, name, path, dataset, args.bootstrap, args.seed)
+            for name, path in models.items() for dataset in datasets
+        ]
+        for future in as_completed(futures):
+            res = future.result()
+            results.append(res)
+            if 'error' in res:
+                print(f"{res['model']:<22} {res['dataset']:<48} ERROR {res['error']}")
+            else:
+                o = res['overall']
+                print(f"{res['model']:<22} {res['dataset']:<48} {res['metric']} {o['value']:.4f} "
+                      f"[{o.get('ci_low')}, {o.get('ci_high')}]")
+
+    results.sort(key=lambda r: (r['model'], r['dataset']))
+    report = {
+        'bootstrap': args.bootstrap,
+        'seed': args.seed,
+        'workers': args.workers,
+        'seconds': round(time.perf_counter() - start, 3),
+        'results': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Synthetic dataset generator for load testing and model work.
+
+Produces N rows in the raw-item layout of edited_job_stress_productivity_dataset.csv
+using the same rules as rebalance_data.py (three stress tiers with matching
+productivity, random gender/department, per-department productivity shifts), but
+generated in vectorized blocks from seeded NumPy streams so output is deterministic
+for a given --seed and --chunk-size regardless of --workers.
+
+    python generate_dataset.py --rows 2000000 --output synthetic.csv --workers 4
+    python generate_dataset.py --rows 2000000 --output synthetic_npy --format npy
+"""
+import argparse
+import json
+import os
+import time
+from multiprocessing import Pool
+
+import numpy as np
+
+from constructs import EDITED_ITEMS, STRESS_CONSTRUCTS, PROD_CONSTRUCTS
+
+STRESS_ITEMS = [c for construct in STRESS_CONSTRUCTS for c in EDITED_ITEMS[construct]]
+PROD_ITEMS = [c for construct in PROD_CONSTRUCTS for c in EDITED_ITEMS[construct]]
+COLUMNS = ['Employee_ID'] + STRESS_ITEMS + PROD_ITEMS + ['Gender', 'Department']
+
+GENDERS = {'Male': 0.5, 'Female': 0.5}
+DEPARTMENTS = {d: 1 / 6 for d in ['HR', 'Finance', 'IT', 'Sales', 'Operations', 'Marketing']}
+# Same productivity shifts as rebalance_data.py
+DEPT_SHIFTS = {'IT': 0.5, 'Operations': 0.3, 'Finance': 0.1, 'Marketing': 0.0, 'HR': -0.2, 'Sales': -0.4}
+
+# Per tier (Low, Medium, High stress): [low, high) bounds for rng.integers
+STRESS_BOUNDS = np.array([[1, 3], [2, 5], [4, 6]])
+PROD_BOUNDS = np.array([[4, 6], [2, 5], [1, 3]])
+
+CHUNK_SIZE = 100000
+
+
+def generate_block(seed_seq, start, size, total, genders=GENDERS, departments=DEPARTMENTS):
+    """Generate rows [start, start + size) as a dict of column arrays."""
+    rng = np.random.default_rng(seed_seq)
+    idx = np.arange(start, start + size)
+    # Contiguous thirds, as in rebalance_data.py
+    tier = np.minimum(idx * 3 // total, 2)
+
+    stress_lo, stress_hi = STRESS_BOUNDS[tier, 0][:, None], STRESS_BOUNDS[tier, 1][:, None]
+    prod_lo, prod_hi = PROD_BOUNDS[tier, 0][:, None], PROD_BOUNDS[tier, 1][:, None]
+    stress = rng.integers(stress_lo, stress_hi, size=(size, len(STRESS_ITEMS)), dtype=np.int8)
+    prod = rng.integers(prod_lo, prod_hi, size=(size, len(PROD_ITEMS))).astype(np.float32)
+
+    gender_names = np.array(list(genders))
+    gender = gender_names[rng.choice(len(gender_names), size=size, p=_normalise(genders))]
+    dept_names = np.array(list(departments))
+    dept_idx = rng.choice(len(dept_names), size=size, p=_normalise(departments))
+    shifts = np.array([DEPT_SHIFTS.get(d, 0.0) for d in dept_names], dtype=np.float32)
+    np.clip(prod + shifts[dept_idx][:, None], 1, 5, out=prod)
+
+    block = {'Employee_ID': idx + 1}
+    block.update({col: stress[:, i] for i, col in enumerate(STRESS_ITEMS)})
+    block.update({col: prod[:, i] for i, col in enumerate(PROD_ITEMS)})
+    block['Gender'] = gender
+    block['Department'] = dept_names[dept_idx]
+    return block
+
+
+def _normalise(mix):
+    p = np.array(list(mix.values()), dtype=float)
+    return p / p.sum()
+
+
+def _csv_block(args):
+    import pandas as pd
+
+    seed_seq, start, size, total, genders, departments, header = args
+    block = generate_block(seed_seq, start, size, total, genders, departments)
+    return pd.DataFrame(block, columns=COLUMNS).to_csv(index=False, header=header, float_format='%g')
+
+
+def _npy_block(args):
+    seed_seq, start, size, total, genders, departments, _ = args
+    return start, generate_block(seed_seq, start, size, total, genders, departments)
+
+
+def _tasks(rows, chunk_size, seed, genders, departments):
+    n_chunks = (rows + chunk_size - 1) // chunk_size
+    # One independent child stream per chunk keeps output identical for any worker count
+    children = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i, child in enumerate(children):
+        start = i * chunk_size
+        yield child, start, min(chunk_size, rows - start), rows, genders, departments, i == 0
+
+
+def _run(fn, tasks, workers):
+    """Yield fn(task) in order, keeping at most 2 * workers blocks in flight."""
+    if workers <= 1:
+        for task in tasks:
+            yield fn(task)
+        return
+    with Pool(workers) as pool:
+        pending = []
+        for task in tasks:
+            pending.append(pool.apply_async(fn, (task,)))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).get()
+        for result in pending:
+            yield result.get()
+
+
+def write_csv(path, rows, chunk_size, seed, workers, genders, departments):
+    with open(path, 'w', newline='') as f:
+        for text in _run(_csv_block, _tasks(rows, chunk_size, seed, genders, departments), workers):
+            f.write(text)
+
+
+def write_npy(out_dir, rows, chunk_size, seed, workers, genders, departments):
+    """One .npy per column (the dataset_cache.py layout), filled chunk by chunk."""
+    os.makedirs(out_dir, exist_ok=True)
+    arrays, meta_columns = {}, {}
+    for start, block in _run(_npy_block, _tasks(rows, chunk_size, seed, genders, departments), workers):
+        for i, col in enumerate(COLUMNS):
+            values = block[col]
+            if col not in arrays:
+                # Text columns come from fixed name arrays, so every chunk shares one width
+                dtype = values.dtype
+                fname = f'{i:03d}.npy'
+                arrays[col] = np.lib.format.open_memmap(
+                    os.path.join(out_dir, fname), mode='w+', dtype=dtype, shape=(rows,))
+                meta_columns[col] = {'file': fname, 'dtype': str(dtype)}
+            arrays[col][start:start + len(values)] = values
+    for arr in arrays.values():
+        arr.flush()
+    with open(os.path.join(out_dir, 'meta.json'), 'w') as f:
+        json.dump({'source': 'generate_dataset.py', 'rows': rows, 'source_columns': COLUMNS,
+                   'derived_columns': [], 'columns': meta_columns}, f, indent=1)
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight) if weight else 1.0
+    return mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic job stress dataset')
+    parser.add_argument('--rows', type=int, required=True)
+    parser.add_argument('--output', required=True, help='CSV file, or directory for --format npy')
+    parser.add_argument('--format', choices=['csv', 'npy'], default='csv')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--genders', type=_parse_mix, default=GENDERS, help='e.g. Male=0.5,Female=0.5')
+    parser.add_argument('--departments', type=_parse_mix, default=DEPARTMENTS, help='e.g. IT=2,HR=1,Sales=1')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    writer = write_csv if args.format == 'csv' else write_npy
+    writer(args.output, args.rows, args.chunk_size, args.seed, args.workers, args.genders, args.departments)
+    print(f"Generated {args.rows} rows into {args.output} in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,4 @@
-import pandas as pd
-df = pd.read_csv('edited_job_stress_productivity_dataset.csv', nrows=0)
+from dataset_cache import source_columns
 with open('cols_list.txt', 'w') as f:
-    for col in df.columns:
+    for col in source_columns('edited_job_stress_productivity_dataset.csv'):
         f.write(col + '\n')
@@ -0,0 +1,25 @@
+# gunicorn -c gunicorn.conf.py
+#
+# The app is imported once in the master (preload_app) so the models, scaler and
+# question config are unpickled before fork and shared copy-on-write by the workers.
+# gc.freeze() moves those objects out of the collector's reach so a worker's first
+# collection doesn't touch (and copy) every shared page.
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 4))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = True
+wsgi_app = 'app:create_app(preload_segments=True)'
+
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    from app import init_worker
+
+    init_worker()
+    server.log.info("Worker %s initialised", worker.pid)
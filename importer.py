@@ -0,0 +1,210 @@
+import csv
+import hashlib
+import os
+
+# Shared bookkeeping for the CSV importers (import_dataset.py, import_new_data.py and
+# the /admin/import_dataset route). Every imported user and response is tagged with
+# the id of an import_batches row so cleanup_db.py can remove a batch by index.
+#
+# import_csv() also keeps a per-file ledger (hash of the imported prefix, size, rows
+# and byte offset committed) so unchanged files are skipped, appended files import
+# only their new tail and interrupted imports resume from the last checkpoint.
+
+CHUNK_SIZE = 500
+
+
+def ensure_import_schema(conn):
+    """Create the batch manifest table and the indexed import_batch_id columns."""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS import_batches (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'running',
+            rows_imported INTEGER DEFAULT 0,
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            finished_at TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS import_ledger (
+            source TEXT PRIMARY KEY,
+            size INTEGER,
+            mtime_ns INTEGER,
+            prefix_hash TEXT,
+            byte_offset INTEGER DEFAULT 0,
+            rows_committed INTEGER DEFAULT 0,
+            batch_id INTEGER,
+            status TEXT NOT NULL DEFAULT 'running',
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for table in ('users', 'responses'):
+        cols = [r[1] for r in conn.execute(f"PRAGMA table_info('{table}')").fetchall()]
+        if 'import_batch_id' not in cols:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN import_batch_id INTEGER")
+        conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_import_batch ON {table} (import_batch_id)")
+    conn.commit()
+
+
+def start_batch(conn, source):
+    """Register a new import batch and return its id."""
+    ensure_import_schema(conn)
+    cur = conn.execute('INSERT INTO import_batches (source) VALUES (?)', (os.path.basename(source),))
+    conn.commit()
+    return cur.lastrowid
+
+
+def finish_batch(conn, batch_id, rows_imported=None):
+    if rows_imported is None:
+        # Count through the index so resumed batches report their full size
+        rows_imported = conn.execute('SELECT COUNT(*) FROM users WHERE import_batch_id = ?', (batch_id,)).fetchone()[0]
+    conn.execute(
+        "UPDATE import_batches SET status = 'complete', rows_imported = ?, finished_at = CURRENT_TIMESTAMP WHERE id = ?",
+        (rows_imported, batch_id))
+    conn.commit()
+
+
+def list_batches(conn):
+    ensure_import_schema(conn)
+    return conn.execute(
+        'SELECT id, source, status, rows_imported, started_at, finished_at FROM import_batches ORDER BY id').fetchall()
+
+
+def _hash_prefix(path, length):
+    """sha256 object fed with the first `length` bytes of `path`."""
+    hasher = hashlib.sha256()
+    remaining = length
+    with open(path, 'rb') as f:
+        while remaining > 0:
+            block = f.read(min(remaining, 1 << 20))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+
+def _checkpoint(conn, source, size, mtime_ns, hasher, offset, rows, batch_id, status):
+    conn.execute('''
+        INSERT INTO import_ledger (source, size, mtime_ns, prefix_hash, byte_offset, rows_committed, batch_id, status, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ON CONFLICT(source) DO UPDATE SET
+            size = excluded.size, mtime_ns = excluded.mtime_ns, prefix_hash = excluded.prefix_hash,
+            byte_offset = excluded.byte_offset, rows_committed = excluded.rows_committed,
+            batch_id = excluded.batch_id, status = excluded.status, updated_at = excluded.updated_at
+    ''', (source, size, mtime_ns, hasher.hexdigest(), offset, rows, batch_id, status))
+    # Same transaction as the rows it covers, so a crash never skips or repeats rows
+    conn.commit()
+
+
+def _insert(conn, table, fields):
+    cols = ', '.join(fields)
+    marks = ', '.join('?' * len(fields))
+    # main. so the insert reaches the writable database when a snapshot is attached (snapshot.py)
+    return conn.execute(f'INSERT OR IGNORE INTO main.{table} ({cols}) VALUES ({marks})', tuple(fields.values()))
+
+
+def _records(f, hasher, offset):
+    """Parsed CSV records from the binary file `f`, each with the byte offset just past it.
+
+    csv.reader pulls physical lines only until a record is complete (a quoted field
+    may span several), so these offsets always fall between records.
+    """
+    pos = offset
+
+    def lines():
+        nonlocal pos
+        for raw in f:
+            hasher.update(raw)
+            pos += len(raw)
+            yield raw.decode('utf-8')
+
+    for record in csv.reader(lines()):
+        if len(record) <= 1 and not ''.join(record).strip():
+            continue
+        yield record, pos
+
+
+def import_csv(conn, path, map_row, chunk_size=CHUNK_SIZE, force=False, progress=None):
+    """Import `path` row by row through `map_row`, using the ledger to skip work.
+
+    map_row(row) returns (user_fields, response_fields) dicts for one CSV row and
+    raises ValueError/KeyError/TypeError for malformed rows. Rows become users named
+    csv_user_<n> (n = 1-based row number); rows whose user already exists are skipped.
+    progress(fraction), if given, is called after each committed chunk.
+    Returns a summary dict with the action taken and counts.
+    """
+    ensure_import_schema(conn)
+    source = os.path.basename(path)
+    st = os.stat(path)
+    entry = conn.execute(
+        'SELECT size, mtime_ns, prefix_hash, byte_offset, rows_committed, batch_id, status FROM import_ledger WHERE source = ?',
+        (source,)).fetchone()
+
+    action, batch_id = 'full', None
+    start_offset, start_row, hasher = 0, 0, hashlib.sha256()
+    if entry and not force:
+        size, mtime_ns, prefix_hash, byte_offset, rows_committed, entry_batch, status = entry
+        if status == 'complete' and size == st.st_size and mtime_ns == st.st_mtime_ns:
+            return {'action': 'unchanged', 'inserted': 0, 'skipped': 0, 'batch_id': entry_batch}
+        prefix = _hash_prefix(path, byte_offset)
+        if prefix.hexdigest() == prefix_hash:
+            if status == 'complete' and st.st_size == byte_offset:
+                # Touched but identical: refresh the mtime so the next check is instant
+                _checkpoint(conn, source, byte_offset, st.st_mtime_ns, prefix, byte_offset, rows_committed,
+                            entry_batch, 'complete')
+                return {'action': 'unchanged', 'inserted': 0, 'skipped': 0, 'batch_id': entry_batch}
+            start_offset, start_row, hasher = byte_offset, rows_committed, prefix
+            if status == 'running':
+                action, batch_id = 'resumed', entry_batch
+            else:
+                action = 'appended'
+        else:
+            action = 'changed'
+            print(f"{source} changed since its last import; re-reading from the start.")
+
+    if batch_id is None:
+        batch_id = start_batch(conn, path)
+
+    inserted = skipped = pending = 0
+    with open(path, 'rb') as f:
+        header = f.readline()
+        fieldnames = next(csv.reader([header.decode('utf-8-sig')]))
+        if start_offset == 0:
+            hasher.update(header)
+            offset = len(header)
+        else:
+            f.seek(start_offset)
+            offset = start_offset
+        row_no = start_row
+
+        for record, offset in _records(f, hasher, offset):
+            row_no += 1
+            row = dict(zip(fieldnames, record))
+            try:
+                user_fields, response_fields = map_row(row)
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Malformed row {row_no}: {e}")
+                skipped += 1
+            else:
+                user = {'username': f'csv_user_{row_no}', 'password': 'csvimport', 'role': 'employee'}
+                user.update(user_fields, import_batch_id=batch_id)
+                cur = _insert(conn, 'users', user)
+                if cur.rowcount:
+                    response = dict(response_fields, user_id=cur.lastrowid, import_batch_id=batch_id)
+                    _insert(conn, 'responses', response)
+                    inserted += 1
+            pending += 1
+            if pending >= chunk_size:
+                _checkpoint(conn, source, offset, st.st_mtime_ns, hasher, offset, row_no, batch_id, 'running')
+                pending = 0
+                if progress:
+                    progress(offset / max(st.st_size, 1))
+
+        # Trailing blank lines were hashed too; the ledger's prefix must match its offset
+        offset = f.tell()
+        final_mtime = os.fstat(f.fileno()).st_mtime_ns
+
+    _checkpoint(conn, source, offset, final_mtime, hasher, offset, row_no, batch_id, 'complete')
+    finish_batch(conn, batch_id)
+    return {'action': action, 'inserted': inserted, 'skipped': skipped, 'batch_id': batch_id, 'rows': row_no}
@@ -0,0 +1,94 @@
+"""Top stress drivers for one response or a whole cohort, computed on an (N x 8) array.
+
+top_drivers() picks each row's k highest stress constructs with argpartition, so
+the per-employee dashboard and the organisation-wide report share the same rule:
+a construct counts as a driver when it is among the row's top k and scores above
+DRIVER_MIN. Ties go to the construct listed first, as in the original sorted() code.
+"""
+import numpy as np
+
+# (label used by STRESS_INSIGHTS, responses column), in questionnaire order
+FACTORS = [
+    ('Workload', 'workload'),
+    ('Role Ambiguity', 'role_ambiguity'),
+    ('Job Security', 'job_security'),
+    ('Gender Discrimination', 'gender_discrim'),
+    ('Interpersonal Relationships', 'interpersonal'),
+    ('Resource Constraints', 'resources'),
+    ('Job Satisfaction', 'satisfaction'),
+    ('Organizational Support', 'support')
+]
+LABELS = [label for label, _ in FACTORS]
+COLUMNS = [col for _, col in FACTORS]
+TOP_K = 3
+DRIVER_MIN = 3
+GROUP_COLUMNS = ('department', 'position')
+# Smaller than any real gap between construct means; earlier columns win ties
+_TIE_BREAK = np.arange(len(FACTORS)) * 1e-9
+
+
+def to_matrix(rows):
+    """(N x 8) float array from rows with the stress construct columns; missing values are NaN."""
+    return np.array([[np.nan if r[c] is None else r[c] for c in COLUMNS] for r in rows], dtype=float).reshape(-1, len(COLUMNS))
+
+
+def top_drivers(matrix, k=TOP_K, min_score=DRIVER_MIN):
+    """(order, valid): column indices of each row's top k constructs, highest first,
+    and a mask of which of those are drivers (present and above min_score)."""
+    keyed = np.where(np.isnan(matrix), -np.inf, matrix - _TIE_BREAK)
+    k = min(k, matrix.shape[1])
+    top = np.argpartition(-keyed, k - 1, axis=1)[:, :k]
+    # argpartition leaves the k winners unordered; sort just those k columns
+    order = np.take_along_axis(top, np.argsort(-np.take_along_axis(keyed, top, axis=1), axis=1), axis=1)
+    values = np.take_along_axis(matrix, order, axis=1)
+    return order, ~np.isnan(values) & (values > min_score)
+
+
+def response_drivers(row, k=TOP_K):
+    """Driver labels for one response row, highest first."""
+    order, valid = top_drivers(to_matrix([row]), k)
+    return [LABELS[i] for i, ok in zip(order[0], valid[0]) if ok]
+
+
+def cohort_drivers(conn, group_by=('department',), level='High', k=TOP_K):
+    """How often each construct is a top-k driver, per group, over each employee's latest response.
+
+    Returns a list of {group..., employees, drivers: {label: {count, share}}} sorted by group.
+    """
+    group_sql = ', '.join(f'u.{g}' for g in group_by)
+    rows = conn.execute(f'''
+        SELECT {group_sql}, {', '.join('r.' + c for c in COLUMNS)}
+        FROM responses r
+        JOIN users u ON u.id = r.user_id
+        WHERE r.id IN (SELECT MAX(id) FROM responses GROUP BY user_id)
+          AND (? IS NULL OR r.stress_level = ?)
+    ''', (level, level)).fetchall()
+    if not rows:
+        return []
+
+    n_groups = len(group_by)
+    keys = [tuple(r[:n_groups]) for r in rows]
+    matrix = np.array([[np.nan if v is None else v for v in r[n_groups:]] for r in rows], dtype=float)
+    order, valid = top_drivers(matrix, k)
+
+    # One-hot of driver hits, then summed per group in a single pass
+    hits = np.zeros(matrix.shape, dtype=np.int64)
+    np.put_along_axis(hits, order, valid.astype(np.int64), axis=1)
+    unique, codes = np.unique(np.array([repr(key) for key in keys]), return_inverse=True)
+    by_code = {code: key for code, key in zip(codes, keys)}
+    counts = np.zeros((len(unique), len(COLUMNS)), dtype=np.int64)
+    np.add.at(counts, codes, hits)
+    employees = np.bincount(codes, minlength=len(unique))
+
+    out = []
+    for code in range(len(unique)):
+        key = by_code[code]
+        entry = dict(zip(group_by, key))
+        entry['employees'] = int(employees[code])
+        entry['drivers'] = {
+            LABELS[i]: {'count': int(counts[code, i]), 'share': round(counts[code, i] / employees[code], 4)}
+            for i in np.argsort(-counts[code], kind='stable') if counts[code, i]
+        }
+        out.append(entry)
+    out.sort(key=lambda e: tuple('' if e[g] is None else str(e[g]) for g in group_by))
+    return out
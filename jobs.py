@@ -0,0 +1,294 @@
+"""Background jobs for long admin operations (imports, retraining, rescoring, exports).
+
+Jobs live in the `jobs` table of the main database, so every worker process sees
+the same queue. Each process runs a JobRunner with a small thread pool. A submit,
+a finished job and a poll every few seconds all try to claim queued jobs, and
+the claim happens in one IMMEDIATE transaction that also enforces the per-kind
+concurrency limit across all workers.
+
+Handlers are plain functions, handler(ctx, **params), returning a JSON-able
+result. They report progress with ctx.progress(fraction, message), which also
+raises JobCancelled once an admin has cancelled the job. Handlers should call it
+only at points where stopping is safe (after a committed chunk). A job whose worker
+died stops sending heartbeats and is marked failed after STALE_AFTER seconds.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+POLL_INTERVAL = 2.0
+STALE_AFTER = 600
+PROGRESS_EVERY = 0.5
+# Pause after each progress call (i.e. after each committed chunk) so that web requests
+# waiting on SQLite's write lock get in between a job's back-to-back transactions
+CHUNK_PAUSE = 0.05
+STATUSES = ('queued', 'running', 'done', 'failed', 'cancelled')
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def ensure_jobs_schema(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            params TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress REAL DEFAULT 0,
+            message TEXT,
+            result TEXT,
+            error TEXT,
+            cancel_requested INTEGER DEFAULT 0,
+            created_by TEXT,
+            scope TEXT,
+            worker_pid INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            heartbeat_at TIMESTAMP
+        )
+    ''')
+    if 'scope' not in {r[1] for r in conn.execute("PRAGMA table_info('jobs')")}:
+        conn.execute('ALTER TABLE jobs ADD COLUMN scope TEXT')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, kind, id)')
+    conn.commit()
+
+
+def _to_dict(row):
+    job = dict(row)
+    job['params'] = json.loads(job['params']) if job['params'] else {}
+    job['result'] = json.loads(job['result']) if job['result'] else None
+    job['cancel_requested'] = bool(job['cancel_requested'])
+    return job
+
+
+class JobContext:
+    def __init__(self, runner, job_id, params, scope=None):
+        self.runner = runner
+        self.job_id = job_id
+        self.params = params
+        self.scope = scope
+        self._last_write = 0.0
+
+    def progress(self, fraction=None, message=None, force=False):
+        """Record progress (0..1) and raise JobCancelled if the job was cancelled."""
+        time.sleep(self.runner.chunk_pause)
+        now = time.monotonic()
+        if not force and now - self._last_write < PROGRESS_EVERY:
+            return
+        self._last_write = now
+        conn = self.runner.connect()
+        try:
+            conn.execute('''
+                UPDATE jobs SET progress = COALESCE(?, progress), message = COALESCE(?, message),
+                                heartbeat_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (None if fraction is None else max(0.0, min(1.0, fraction)), message, self.job_id))
+            conn.commit()
+            cancelled = conn.execute('SELECT cancel_requested FROM jobs WHERE id = ?', (self.job_id,)).fetchone()[0]
+        finally:
+            conn.close()
+        if cancelled:
+            raise JobCancelled()
+
+
+class JobRunner:
+    def __init__(self, db_path, workers=2, poll_interval=POLL_INTERVAL, stale_after=STALE_AFTER, chunk_pause=CHUNK_PAUSE):
+        self.db_path = db_path
+        self.workers = workers
+        self.chunk_pause = chunk_pause
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.handlers = {}
+        self.limits = {}
+        self._lock = threading.Lock()
+        self._pool = None
+        self._poller = None
+        self._active = set()
+
+    def register(self, kind, handler, limit=1):
+        """Add a job kind; at most `limit` jobs of this kind run at once across all workers."""
+        self.handlers[kind] = handler
+        self.limits[kind] = limit
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def reset(self):
+        """Forget threads inherited from a parent process (gunicorn preload)."""
+        self._lock = threading.Lock()
+        self._pool = None
+        self._poller = None
+        self._active = set()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='job')
+            if self._poller is None:
+                self._poller = threading.Thread(target=self._poll, name='job-poller', daemon=True)
+                self._poller.start()
+
+    def submit(self, kind, params=None, created_by=None, scope=None):
+        """Queue a job; `scope` is an opaque owner label (the tenant) handed to the handler as ctx.scope."""
+        if kind not in self.handlers:
+            raise ValueError(f'Unknown job kind: {kind}')
+        conn = self.connect()
+        try:
+            cur = conn.execute('INSERT INTO jobs (kind, params, created_by, scope) VALUES (?, ?, ?, ?)',
+                               (kind, json.dumps(params or {}), created_by, scope))
+            conn.commit()
+            job_id = cur.lastrowid
+        finally:
+            conn.close()
+        self._ensure_started()
+        self.dispatch()
+        return job_id
+
+    def cancel(self, job_id):
+        """Cancel a queued job now, or ask a running one to stop. False if it had already finished."""
+        conn = self.connect()
+        try:
+            cur = conn.execute('''
+                UPDATE jobs SET status = 'cancelled', finished_at = CURRENT_TIMESTAMP, cancel_requested = 1
+                WHERE id = ? AND status = 'queued'
+            ''', (job_id,))
+            if not cur.rowcount:
+                cur = conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+            conn.commit()
+            return bool(cur.rowcount)
+        finally:
+            conn.close()
+
+    def get(self, job_id):
+        conn = self.connect()
+        try:
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        finally:
+            conn.close()
+        return _to_dict(row) if row else None
+
+    def list(self, limit=50, status=None, scope=None):
+        self._ensure_started()
+        conn = self.connect()
+        try:
+            rows = conn.execute('''
+                SELECT * FROM jobs WHERE (? IS NULL OR status = ?) AND (? IS NULL OR scope = ?)
+                ORDER BY id DESC LIMIT ?
+            ''', (status, status, scope, scope, limit)).fetchall()
+        finally:
+            conn.close()
+        return [_to_dict(r) for r in rows]
+
+    def stats(self):
+        conn = self.connect()
+        try:
+            counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        finally:
+            conn.close()
+        return {'workers': self.workers, 'active_here': len(self._active), 'limits': self.limits,
+                'jobs': {s: counts.get(s, 0) for s in STATUSES}}
+
+    def _claim(self):
+        """Mark the oldest runnable queued job as running in this process; returns (id, kind, params, scope) or None."""
+        conn = self.connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            running = dict(conn.execute(
+                "SELECT kind, COUNT(*) FROM jobs WHERE status = 'running' GROUP BY kind").fetchall())
+            open_kinds = [k for k in self.handlers if running.get(k, 0) < self.limits[k]]
+            row = None
+            if open_kinds:
+                row = conn.execute(f'''
+                    SELECT id, kind, params, scope FROM jobs
+                    WHERE status = 'queued' AND kind IN ({', '.join('?' * len(open_kinds))})
+                    ORDER BY id LIMIT 1
+                ''', open_kinds).fetchone()
+            if row:
+                conn.execute('''
+                    UPDATE jobs SET status = 'running', worker_pid = ?, started_at = CURRENT_TIMESTAMP,
+                                    heartbeat_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                ''', (os.getpid(), row['id']))
+            conn.commit()
+            return (row['id'], row['kind'], json.loads(row['params'] or '{}'), row['scope']) if row else None
+        except sqlite3.OperationalError as e:
+            conn.rollback()
+            print(f"Job claim skipped: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def dispatch(self):
+        """Start as many queued jobs as this process has free threads for."""
+        while True:
+            with self._lock:
+                if self._pool is None or len(self._active) >= self.workers:
+                    return
+            claimed = self._claim()
+            if claimed is None:
+                return
+            with self._lock:
+                self._active.add(claimed[0])
+            self._pool.submit(self._run, *claimed)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        conn = self.connect()
+        try:
+            conn.execute('''
+                UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = CURRENT_TIMESTAMP,
+                                progress = CASE WHEN ? = 'done' THEN 1 ELSE progress END
+                WHERE id = ?
+            ''', (status, json.dumps(result) if result is not None else None, error, status, job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _run(self, job_id, kind, params, scope):
+        ctx = JobContext(self, job_id, params, scope)
+        start = time.perf_counter()
+        try:
+            result = self.handlers[kind](ctx, **params)
+            if isinstance(result, dict):
+                result.setdefault('seconds', round(time.perf_counter() - start, 2))
+            self._finish(job_id, 'done', result)
+        except JobCancelled:
+            self._finish(job_id, 'cancelled')
+        except Exception as e:
+            print(f"Job {job_id} ({kind}) failed: {e}")
+            self._finish(job_id, 'failed', error=f'{e}\n{traceback.format_exc(limit=5)}')
+        finally:
+            with self._lock:
+                self._active.discard(job_id)
+            self.dispatch()
+
+    def _poll(self):
+        while True:
+            time.sleep(self.poll_interval)
+            try:
+                conn = self.connect()
+                try:
+                    with self._lock:
+                        active = list(self._active)
+                    if active:
+                        conn.execute(f"UPDATE jobs SET heartbeat_at = CURRENT_TIMESTAMP WHERE id IN ({', '.join('?' * len(active))})",
+                                     active)
+                    # Jobs whose worker stopped sending heartbeats (killed or restarted)
+                    conn.execute('''
+                        UPDATE jobs SET status = 'failed', error = 'Worker stopped responding', finished_at = CURRENT_TIMESTAMP
+                        WHERE status = 'running' AND heartbeat_at < datetime('now', ?)
+                    ''', (f'-{int(self.stale_after)} seconds',))
+                    conn.commit()
+                finally:
+                    conn.close()
+                self.dispatch()
+            except Exception as e:
+                print(f"Job poller error: {e}")
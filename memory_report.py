@@ -0,0 +1,88 @@
+"""Per-process memory of a running gunicorn master and its workers.
+
+RSS counts shared pages once per process, so the report also shows PSS (shared
+pages split between the processes using them) and the private/shared split from
+/proc/<pid>/smaps_rollup. Compare a run with preload_app on and off:
+
+    python memory_report.py <master_pid> --save before.json
+    python memory_report.py <master_pid> --compare before.json
+"""
+import argparse
+import json
+import os
+
+FIELDS = ['Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty']
+
+
+def read_rollup(pid):
+    """smaps_rollup fields for pid in kB."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if parts and parts[0].rstrip(':') in FIELDS:
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values
+
+
+def children(pid):
+    path = f'/proc/{pid}/task/{pid}/children'
+    try:
+        with open(path) as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        # Older kernels: scan /proc for processes whose parent is pid
+        found = []
+        for entry in os.listdir('/proc'):
+            if entry.isdigit():
+                try:
+                    with open(f'/proc/{entry}/stat') as f:
+                        if int(f.read().rsplit(')', 1)[1].split()[1]) == pid:
+                            found.append(int(entry))
+                except (OSError, IndexError, ValueError):
+                    continue
+        return found
+
+
+def snapshot(master):
+    procs = {'master': read_rollup(master)}
+    for i, pid in enumerate(sorted(children(master))):
+        procs[f'worker {i} ({pid})'] = read_rollup(pid)
+    totals = {field: sum(p.get(field, 0) for p in procs.values()) for field in FIELDS}
+    return {'master_pid': master, 'processes': procs, 'totals': totals}
+
+
+def _mb(kb):
+    return f'{kb / 1024:8.1f}'
+
+
+def print_report(report, baseline=None):
+    print(f"{'process':<22}" + ''.join(f'{f:>15}' for f in FIELDS))
+    for name, values in report['processes'].items():
+        print(f'{name:<22}' + ''.join(f'{_mb(values.get(f, 0)):>15}' for f in FIELDS))
+    print(f"{'total (MB)':<22}" + ''.join(f'{_mb(report["totals"][f]):>15}' for f in FIELDS))
+    if baseline:
+        diff = {f: report['totals'][f] - baseline['totals'].get(f, 0) for f in FIELDS}
+        print(f"{'vs baseline':<22}" + ''.join(f'{_mb(diff[f]):>15}' for f in FIELDS))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-worker memory report for gunicorn')
+    parser.add_argument('master_pid', type=int)
+    parser.add_argument('--save', help='Write the snapshot to this JSON file')
+    parser.add_argument('--compare', help='Print totals relative to a saved snapshot')
+    args = parser.parse_args()
+
+    report = snapshot(args.master_pid)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
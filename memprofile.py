@@ -0,0 +1,356 @@
+"""Opt-in memory profiling for requests and background jobs.
+
+With MEMPROFILE=1 (or POST {"enabled": true} to /admin/api/memory) every request
+and job is measured:
+
+- peak Python heap (tracemalloc) and the RSS change while it ran;
+- for one in MEMPROFILE_SAMPLE runs per route/job (and always the first), a
+  tracemalloc snapshot diff, accumulated into the top allocating call sites.
+  A diff shows what was still allocated when the run ended (cached renders,
+  growing module state); transient allocations only show up in the peak.
+
+Results are kept per worker. GET /admin/api/memory returns them, and each worker
+also writes them to MEMPROFILE_DIR/<pid>.json for the CLI:
+
+    python memprofile.py report [--label 'GET /admin'] [--top 10]
+    python memprofile.py profile /admin /admin/api/insights --repeat 5 --save base.json
+    python memprofile.py profile /admin --compare base.json
+
+`profile` runs the routes in-process through the Flask test client (logged in as
+the admin), one at a time, so its numbers are not mixed up with other traffic.
+tracemalloc and the RSS high-water mark are per process, so under concurrent
+requests a measurement also counts whatever ran alongside it.
+"""
+import argparse
+import atexit
+import contextlib
+import json
+import linecache
+import os
+import threading
+import time
+import tracemalloc
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MEMPROFILE_DIR = os.environ.get('MEMPROFILE_DIR', os.path.join(BASE_DIR, '.memprofile'))
+FRAMES = int(os.environ.get('MEMPROFILE_FRAMES', 10))
+SAMPLE = int(os.environ.get('MEMPROFILE_SAMPLE', 10))
+TOP_SITES = 25
+DUMP_EVERY = 5.0
+# Allocation sites that are profiling overhead rather than the code being measured
+_IGNORE = (tracemalloc.__file__, __file__, linecache.__file__)
+
+_lock = threading.Lock()
+_labels = {}
+_last_dump = [0.0]
+_exit_dump = [False]
+
+
+def enabled():
+    return tracemalloc.is_tracing()
+
+
+def enable(frames=FRAMES):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        if not _exit_dump[0]:
+            # Dumps are throttled, so write the final numbers when the worker exits
+            atexit.register(_dump_quietly)
+            _exit_dump[0] = True
+
+
+def disable():
+    tracemalloc.stop()
+
+
+def reset():
+    """Drop collected results (and start fresh counters in a forked worker)."""
+    global _lock
+    _lock = threading.Lock()
+    _labels.clear()
+
+
+def _status_kb(field):
+    """A VmRSS / VmHWM value from /proc/self/status in kB, or None off Linux."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _reset_hwm():
+    # Writing 5 to clear_refs resets VmHWM (peak RSS) to the current RSS
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _entry(label):
+    return _labels.setdefault(label, {
+        'runs': 0, 'samples': 0, 'peak_py_max': 0, 'peak_py_total': 0,
+        'rss_delta_max': None, 'rss_peak_max': None, 'sites': {}
+    })
+
+
+@contextlib.contextmanager
+def measure(label):
+    """Measure the enclosed block under `label` when profiling is on; a no-op otherwise."""
+    if not tracemalloc.is_tracing():
+        yield
+        return
+    with _lock:
+        runs = _entry(label)['runs']
+    sampled = runs % max(SAMPLE, 1) == 0
+    before = tracemalloc.take_snapshot() if sampled else None
+    rss_before = _status_kb('VmRSS')
+    hwm_reset = _reset_hwm()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    try:
+        yield
+    finally:
+        if tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            rss_after = _status_kb('VmRSS')
+            rss_peak = _status_kb('VmHWM') if hwm_reset else None
+            diffs = None
+            if before is not None:
+                diffs = tracemalloc.take_snapshot().compare_to(before, 'lineno')
+            _record(label, max(peak - base, 0), rss_before, rss_after, rss_peak, diffs)
+
+
+def _record(label, peak_py, rss_before, rss_after, rss_peak, diffs):
+    with _lock:
+        e = _entry(label)
+        e['runs'] += 1
+        e['peak_py_total'] += peak_py
+        e['peak_py_max'] = max(e['peak_py_max'], peak_py)
+        if rss_before is not None and rss_after is not None:
+            e['rss_delta_max'] = max(e['rss_delta_max'] or 0, rss_after - rss_before)
+        if rss_peak is not None and rss_before is not None:
+            e['rss_peak_max'] = max(e['rss_peak_max'] or 0, rss_peak - rss_before)
+        if diffs is not None:
+            e['samples'] += 1
+            sites = e['sites']
+            for stat in diffs:
+                frame = stat.traceback[0]
+                if stat.size_diff <= 0 or frame.filename in _IGNORE:
+                    continue
+                site = sites.setdefault(f'{frame.filename}:{frame.lineno}', {'bytes': 0, 'count': 0})
+                site['bytes'] += stat.size_diff
+                site['count'] += stat.count_diff
+            if len(sites) > TOP_SITES * 4:
+                keep = sorted(sites.items(), key=lambda kv: -kv[1]['bytes'])[:TOP_SITES * 2]
+                e['sites'] = dict(keep)
+    _maybe_dump()
+
+
+def _source_line(site):
+    filename, lineno = site.rsplit(':', 1)
+    return linecache.getline(filename, int(lineno)).strip()
+
+
+def stats(top=10):
+    """{label: runs, average/max peak Python heap, max RSS growth/peak in kB, top sites}."""
+    with _lock:
+        labels = {label: dict(e, sites=dict(e['sites'])) for label, e in _labels.items()}
+    out = {}
+    for label, e in sorted(labels.items(), key=lambda kv: -kv[1]['peak_py_max']):
+        sites = sorted(e['sites'].items(), key=lambda kv: -kv[1]['bytes'])[:top]
+        out[label] = {
+            'runs': e['runs'],
+            'samples': e['samples'],
+            'peak_py_avg_kb': round(e['peak_py_total'] / e['runs'] / 1024, 1) if e['runs'] else None,
+            'peak_py_max_kb': round(e['peak_py_max'] / 1024, 1),
+            'rss_delta_max_kb': e['rss_delta_max'],
+            'rss_peak_max_kb': e['rss_peak_max'],
+            'top_sites': [{'site': site, 'kb_per_sample': round(s['bytes'] / e['samples'] / 1024, 1),
+                           'blocks_per_sample': round(s['count'] / e['samples'], 1),
+                           'line': _source_line(site)}
+                          for site, s in sites] if e['samples'] else []
+        }
+    return out
+
+
+def status():
+    traced, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+    return {
+        'enabled': tracemalloc.is_tracing(),
+        'pid': os.getpid(),
+        'frames': tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None,
+        'sample_every': SAMPLE,
+        'traced_kb': round(traced / 1024, 1),
+        'tracemalloc_overhead_kb': round(tracemalloc.get_tracemalloc_memory() / 1024, 1),
+        'rss_kb': _status_kb('VmRSS'),
+        'rss_peak_kb': _status_kb('VmHWM')
+    }
+
+
+def dump(path=None):
+    """Write this worker's results for `python memprofile.py report`."""
+    path = path or os.path.join(MEMPROFILE_DIR, f'{os.getpid()}.json')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with _lock:
+        data = {'pid': os.getpid(), 'written_at': time.time(), 'labels': json.loads(json.dumps(_labels))}
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+
+def _maybe_dump():
+    now = time.monotonic()
+    if now - _last_dump[0] < DUMP_EVERY:
+        return
+    _last_dump[0] = now
+    _dump_quietly()
+
+
+def _dump_quietly():
+    if not _labels:
+        return
+    try:
+        dump()
+    except OSError as e:
+        print(f"Memory profile dump failed: {e}")
+
+
+def init_app(app):
+    """Measure every request under 'METHOD /url/rule'.
+
+    MEMPROFILE=1 starts tracing at the first request rather than at import, so the
+    models and modules loaded at startup are not traced: snapshots then only hold
+    allocations made since, and stay fast enough to take per request.
+    """
+    from flask import g, request
+
+    autostart = [os.environ.get('MEMPROFILE') == '1']
+
+    @app.before_request
+    def _memprofile_start():
+        if autostart[0]:
+            autostart[0] = False
+            enable()
+        if not tracemalloc.is_tracing():
+            return
+        rule = request.url_rule.rule if request.url_rule else '<unmatched>'
+        g.memprofile = measure(f'{request.method} {rule}')
+        g.memprofile.__enter__()
+
+    @app.teardown_request
+    def _memprofile_stop(exc):
+        cm = g.pop('memprofile', None)
+        if cm is not None:
+            cm.__exit__(None, None, None)
+
+
+def _merge(files):
+    """Combine per-worker dumps into one {label: entry} mapping."""
+    merged = {}
+    for path in files:
+        with open(path) as f:
+            labels = json.load(f)['labels']
+        for label, e in labels.items():
+            m = merged.setdefault(label, {'runs': 0, 'samples': 0, 'peak_py_max': 0, 'peak_py_total': 0,
+                                          'rss_delta_max': None, 'rss_peak_max': None, 'sites': {}})
+            m['runs'] += e['runs']
+            m['samples'] += e['samples']
+            m['peak_py_total'] += e['peak_py_total']
+            m['peak_py_max'] = max(m['peak_py_max'], e['peak_py_max'])
+            for key in ('rss_delta_max', 'rss_peak_max'):
+                if e[key] is not None:
+                    m[key] = max(m[key] or 0, e[key])
+            for site, s in e['sites'].items():
+                t = m['sites'].setdefault(site, {'bytes': 0, 'count': 0})
+                t['bytes'] += s['bytes']
+                t['count'] += s['count']
+    return merged
+
+
+def _print_stats(report, label_filter=None, baseline=None):
+    for label, s in report.items():
+        if label_filter and label_filter not in label:
+            continue
+        line = (f"{label}\n  runs {s['runs']}, peak heap avg {s['peak_py_avg_kb']} kB / max {s['peak_py_max_kb']} kB, "
+                f"RSS growth max {s['rss_delta_max_kb']} kB, peak RSS over start {s['rss_peak_max_kb']} kB")
+        if baseline and label in baseline:
+            b = baseline[label]
+            line += (f"\n  vs baseline: peak heap avg {s['peak_py_avg_kb'] - b['peak_py_avg_kb']:+.1f} kB, "
+                     f"max {s['peak_py_max_kb'] - b['peak_py_max_kb']:+.1f} kB")
+        print(line)
+        for site in s['top_sites']:
+            print(f"    {site['kb_per_sample']:>10.1f} kB {site['blocks_per_sample']:>9.1f} blocks  {site['site']}")
+            if site['line']:
+                print(f"{'':>38}{site['line'][:100]}")
+
+
+def _profile_routes(routes, repeat):
+    """Run each route `repeat` times in-process with every run sampled; returns stats()."""
+    import app as webapp
+
+    # Run as a script this file is __main__; the app records into the imported module
+    profiler = webapp.memprofile
+    profiler.SAMPLE = 1
+    profiler.enable()
+    profiler.reset()
+    client = webapp.app.test_client()
+    with client.session_transaction() as session:
+        session.update(user_id=0, username='memprofile', role='admin')
+    for route in routes:
+        for _ in range(repeat):
+            # Drop cached renders so every run does the real work
+            for cache in (webapp.profile_cache, webapp.response_cache, webapp.admin_cache):
+                cache.clear()
+            response = client.get(route)
+            response.get_data()
+            response.close()
+            if response.status_code >= 400:
+                print(f"{route}: HTTP {response.status_code}")
+    return profiler.stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Memory profile of request handlers and jobs')
+    sub = parser.add_subparsers(dest='command', required=True)
+    rep = sub.add_parser('report', help='Merge the per-worker results in MEMPROFILE_DIR')
+    rep.add_argument('--dir', default=MEMPROFILE_DIR)
+    rep.add_argument('--label', help='Only labels containing this text, e.g. "/admin"')
+    rep.add_argument('--top', type=int, default=10)
+    prof = sub.add_parser('profile', help='Profile GET routes in-process as the admin')
+    prof.add_argument('routes', nargs='+')
+    prof.add_argument('--repeat', type=int, default=3)
+    prof.add_argument('--top', type=int, default=10)
+    prof.add_argument('--save', help='Write the results to this JSON file')
+    prof.add_argument('--compare', help='Show peak heap changes against a saved run')
+    args = parser.parse_args()
+
+    if args.command == 'report':
+        files = [os.path.join(args.dir, f) for f in sorted(os.listdir(args.dir)) if f.endswith('.json')] \
+            if os.path.isdir(args.dir) else []
+        if not files:
+            print(f"No results in {args.dir}; run the app with MEMPROFILE=1 first.")
+            return
+        _labels.update(_merge(files))
+        print(f"{len(files)} worker file(s) from {args.dir}")
+        _print_stats(stats(args.top), args.label)
+    else:
+        report = _profile_routes(args.routes, args.repeat)
+        report = {label: dict(s, top_sites=s['top_sites'][:args.top]) for label, s in report.items()}
+        baseline = None
+        if args.compare:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        _print_stats(report, baseline=baseline)
+        if args.save:
+            with open(args.save, 'w') as f:
+                json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
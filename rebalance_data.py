@@ -1,9 +1,9 @@
-import pandas as pd
 import numpy as np
+from dataset_cache import load_frame
 
 def balance_dataset():
     input_file = 'edited_job_stress_productivity_dataset.csv'
-    df = pd.read_csv(input_file)
+    df = load_frame(input_file)
     n = len(df)
     
     # We want 1/3 Low, 1/3 Medium, 1/3 High
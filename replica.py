@@ -0,0 +1,116 @@
+"""Read-only analytics replica of database.db, refreshed with the SQLite backup API.
+
+Admin aggregates and exports read the replica, so a heavy admin view never holds a
+read lock on the live file while employees submit surveys. The replica is rebuilt
+into a temporary file in small backup steps (writers can commit between steps)
+and swapped in with os.replace, so open replica connections are never disturbed.
+
+A refresh is triggered after `max_writes` writes recorded by note_write(), or when
+a reader finds the replica older than `interval` seconds and the source has been
+written since (by this process, or by anything that touched the file). An idle
+database keeps its replica, so pages stamped with its time stay byte-identical.
+Either way the refresh runs in a background thread and readers keep using the
+current copy meanwhile.
+Only the very first read, when no replica exists yet, waits for a build.
+"""
+import os
+import sqlite3
+import threading
+import time
+
+BACKUP_PAGES = 256
+
+
+class Replica:
+    def __init__(self, source_path, replica_path, interval=60, max_writes=50):
+        self.source_path = source_path
+        self.replica_path = replica_path
+        self.interval = interval
+        self.max_writes = max_writes
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.writes_since = 0
+        self.refreshes = 0
+        self.last_refresh_seconds = None
+        self.last_error = None
+
+    def refreshed_at(self):
+        """Unix time of the current replica file, shared by every worker process."""
+        try:
+            return os.path.getmtime(self.replica_path)
+        except OSError:
+            return None
+
+    def source_changed(self, since):
+        """Whether the source (or its WAL) was modified after unix time `since`."""
+        if self.writes_since:
+            return True
+        for path in (self.source_path, self.source_path + '-wal'):
+            try:
+                if os.path.getmtime(path) > since:
+                    return True
+            except OSError:
+                pass
+        return False
+
+    def refresh(self):
+        start = time.perf_counter()
+        tmp = f'{self.replica_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            src = sqlite3.connect(self.source_path)
+            dst = sqlite3.connect(tmp)
+            with dst:
+                src.backup(dst, pages=BACKUP_PAGES)
+            dst.close()
+            src.close()
+            os.replace(tmp, self.replica_path)
+            self.refreshes += 1
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"Analytics replica refresh failed: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        finally:
+            self.last_refresh_seconds = round(time.perf_counter() - start, 4)
+            with self._lock:
+                self._refreshing = False
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+            self.writes_since = 0
+        threading.Thread(target=self.refresh, name='replica-refresh', daemon=True).start()
+
+    def note_write(self, count=1):
+        with self._lock:
+            self.writes_since += count
+            due = self.writes_since >= self.max_writes
+        if due:
+            self._refresh_in_background()
+
+    def connect(self):
+        """Read-only connection to the replica, building it on first use."""
+        refreshed = self.refreshed_at()
+        if refreshed is None:
+            with self._lock:
+                self._refreshing = True
+            self.refresh()
+        elif time.time() - refreshed > self.interval and self.source_changed(refreshed):
+            self._refresh_in_background()
+        return sqlite3.connect(f'file:{self.replica_path}?mode=ro', uri=True)
+
+    def status(self):
+        refreshed = self.refreshed_at()
+        return {
+            'refreshed_at': refreshed,
+            'age_seconds': round(time.time() - refreshed, 1) if refreshed else None,
+            'interval': self.interval,
+            'writes_since_refresh': self.writes_since,
+            'max_writes': self.max_writes,
+            'refreshes': self.refreshes,
+            'last_refresh_seconds': self.last_refresh_seconds,
+            'last_error': self.last_error
+        }
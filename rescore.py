@@ -0,0 +1,247 @@
+"""Re-derive construct and composite scores from stored raw answers.
+
+    python rescore.py --dry-run            # report what would change, write nothing
+    python rescore.py                      # rescore, resuming from the last checkpoint
+    python rescore.py --restart --all      # start over and rescore every response
+
+Run it after a fix to the scoring rules (bump scoring.RULES_VERSION) or a change
+to QUESTIONS. Responses whose questionnaire_version is missing or out of date are
+read in id order, scored in vectorized chunks with the same code questionnaire()
+uses, and written back with executemany. Each chunk's updates and its checkpoint
+in rescore_progress commit together, so an interrupted run resumes where it stopped.
+
+A response is scored with the item layout it was answered under (looked up in
+questionnaire_versions); unstamped responses are assumed to use the current
+layout unless their raw answers have more items than it could have produced.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+import scoring
+from constructs import ROLE_QUESTIONS, STRESS_LEVELS
+from scoring import QUESTION_LAYOUT
+
+DB_NAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'database.db')
+
+CHUNK_SIZE = 1000
+SAMPLES = 5
+# Unstamped answers beyond the core items can only be role questions
+MAX_ITEMS = scoring.item_count(QUESTION_LAYOUT) + max(len(q) for q in ROLE_QUESTIONS.values())
+
+
+def ensure_progress_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS rescore_progress (
+            target TEXT PRIMARY KEY,
+            last_id INTEGER DEFAULT 0,
+            scanned INTEGER DEFAULT 0,
+            updated INTEGER DEFAULT 0,
+            skipped INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'running',
+            started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+
+def load_layouts(conn):
+    try:
+        rows = conn.execute('SELECT version, layout FROM questionnaire_versions').fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    return {version: json.loads(layout) for version, layout in rows}
+
+
+def stress_level(score):
+    # Same bands as constructs.STRESS_LEVEL_SQL
+    low, medium, high = STRESS_LEVELS
+    return low if score < 2 else medium if score <= 3 else high
+
+
+def _max_item(answers):
+    numbers = [int(k[1:]) for k in answers if k[1:].isdigit()]
+    return max(numbers, default=0)
+
+
+def rescore_chunk(rows, layouts):
+    """Score one chunk of rows grouped by layout.
+
+    Returns (updates, skipped, diffs): updates are (scores..., version, id) tuples
+    for rows whose scores or stamp change; diffs are (id, old, new) score dicts.
+    """
+    by_layout = {}
+    skipped = 0
+    for row in rows:
+        try:
+            answers = json.loads(row['raw_answers'])
+        except (TypeError, ValueError):
+            skipped += 1
+            continue
+        layout = layouts.get(row['questionnaire_version'])
+        if layout is None:
+            if row['questionnaire_version'] is not None or _max_item(answers) > MAX_ITEMS:
+                skipped += 1
+                continue
+            layout = QUESTION_LAYOUT
+        key = json.dumps(layout, sort_keys=True)
+        by_layout.setdefault(key, (layout, []))[1].append((row, answers))
+
+    updates, diffs = [], []
+    for layout, members in by_layout.values():
+        version = scoring.version_of(layout)
+        layouts.setdefault(version, layout)
+        matrix = scoring.answers_matrix([answers for _, answers in members], scoring.item_count(layout))
+        new = scoring.score(matrix, layout)
+        old = np.array([[np.nan if row[c] is None else row[c] for c in scoring.SCORE_COLUMNS] for row, _ in members], dtype=float)
+        new_matrix = np.column_stack([new[c] for c in scoring.SCORE_COLUMNS])
+        changed = ~np.isclose(old, new_matrix, equal_nan=False)
+        for i, (row, _) in enumerate(members):
+            if changed[i].any():
+                diffs.append((row['id'], dict(zip(scoring.SCORE_COLUMNS, old[i])), dict(zip(scoring.SCORE_COLUMNS, new_matrix[i]))))
+            if changed[i].any() or row['questionnaire_version'] != version:
+                updates.append((*[float(v) for v in new_matrix[i]], version, row['id']))
+    return updates, skipped, diffs
+
+
+class DiffReport:
+    def __init__(self):
+        self.changed = 0
+        # changed, were NULL, sum |delta|, max |delta|
+        self.columns = {c: [0, 0, 0.0, 0.0] for c in scoring.SCORE_COLUMNS}
+        self.transitions = {}
+        self.samples = []
+
+    def add(self, diffs):
+        for response_id, old, new in diffs:
+            self.changed += 1
+            for c in scoring.SCORE_COLUMNS:
+                stats = self.columns[c]
+                if np.isnan(old[c]):
+                    stats[0] += 1
+                    stats[1] += 1
+                    continue
+                delta = abs(new[c] - old[c])
+                if delta > 1e-9:
+                    stats[0] += 1
+                    stats[2] += delta
+                    stats[3] = max(stats[3], delta)
+            before = 'n/a' if np.isnan(old['job_stress_score']) else stress_level(old['job_stress_score'])
+            after = stress_level(new['job_stress_score'])
+            if before != after:
+                self.transitions[(before, after)] = self.transitions.get((before, after), 0) + 1
+            if len(self.samples) < SAMPLES:
+                self.samples.append((response_id, old, new))
+
+    def print(self):
+        print(f"{self.changed} responses would change.")
+        for c, (count, nulls, total, biggest) in self.columns.items():
+            if count > nulls:
+                print(f"  {c:<20} {count:>8} changed ({nulls} were NULL)  mean |delta| {total / (count - nulls):.3f}  max {biggest:.3f}")
+            elif count:
+                print(f"  {c:<20} {count:>8} changed (all were NULL)")
+        for (before, after), count in sorted(self.transitions.items()):
+            print(f"  stress level {before} -> {after}: {count}")
+        for response_id, old, new in self.samples:
+            moved = ', '.join(f"{c} {old[c]:.2f}->{new[c]:.2f}" for c in scoring.SCORE_COLUMNS
+                              if np.isnan(old[c]) or abs(new[c] - old[c]) > 1e-9)
+            print(f"  #{response_id}: {moved}")
+
+
+def rescore(conn, chunk_size=CHUNK_SIZE, dry_run=False, all_rows=False, restart=False, progress=None):
+    """Rescore stale responses; progress(fraction), if given, is called after each committed chunk."""
+    conn.row_factory = sqlite3.Row
+    target = scoring.version_of(QUESTION_LAYOUT)
+    layouts = load_layouts(conn)
+    layouts.setdefault(target, QUESTION_LAYOUT)
+    current = {v for v, layout in layouts.items() if v == scoring.version_of(layout)}
+
+    last_id = scanned = updated = skipped = 0
+    if not dry_run:
+        ensure_progress_table(conn)
+        scoring.ensure_generation_table(conn)
+        if restart:
+            conn.execute('DELETE FROM rescore_progress WHERE target = ?', (target,))
+        checkpoint = conn.execute('SELECT * FROM rescore_progress WHERE target = ?', (target,)).fetchone()
+        if checkpoint and checkpoint['status'] == 'running':
+            last_id, scanned, updated, skipped = (checkpoint['last_id'], checkpoint['scanned'],
+                                                  checkpoint['updated'], checkpoint['skipped'])
+            print(f"Resuming after response #{last_id}.")
+        # A finished run starts over; only stale rows still match unless --all
+        conn.execute('''
+            INSERT INTO rescore_progress (target, last_id, scanned, updated, skipped, status) VALUES (?, ?, ?, ?, ?, 'running')
+            ON CONFLICT(target) DO UPDATE SET last_id = excluded.last_id, scanned = excluded.scanned,
+                updated = excluded.updated, skipped = excluded.skipped, status = 'running'
+        ''', (target, last_id, scanned, updated, skipped))
+        conn.commit()
+
+    stale = '' if all_rows else f"AND (questionnaire_version IS NULL OR questionnaire_version NOT IN ({', '.join('?' * len(current))}))"
+    stale_params = [] if all_rows else sorted(current)
+    assignments = ', '.join(f'{c} = ?' for c in scoring.SCORE_COLUMNS)
+    report = DiffReport()
+    max_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM responses').fetchone()[0]
+    start = time.perf_counter()
+    while True:
+        rows = conn.execute(f'''
+            SELECT id, raw_answers, questionnaire_version, {', '.join(scoring.SCORE_COLUMNS)}
+            FROM responses
+            WHERE id > ? AND raw_answers IS NOT NULL AND raw_answers != '' {stale}
+            ORDER BY id LIMIT ?
+        ''', [last_id] + stale_params + [chunk_size]).fetchall()
+        if not rows:
+            break
+        updates, chunk_skipped, diffs = rescore_chunk(rows, layouts)
+        last_id = rows[-1]['id']
+        scanned += len(rows)
+        skipped += chunk_skipped
+        report.add(diffs)
+        if dry_run:
+            continue
+        for version in {u[-2] for u in updates}:
+            conn.execute('INSERT OR IGNORE INTO questionnaire_versions (version, layout, rules) VALUES (?, ?, ?)',
+                         (version, json.dumps(layouts[version]), scoring.RULES_VERSION))
+        conn.executemany(f'UPDATE responses SET {assignments}, questionnaire_version = ? WHERE id = ?', updates)
+        if updates:
+            scoring.bump_generation(conn)
+        updated += len(updates)
+        conn.execute('''
+            UPDATE rescore_progress SET last_id = ?, scanned = ?, updated = ?, skipped = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE target = ?
+        ''', (last_id, scanned, updated, skipped, target))
+        conn.commit()
+        if progress:
+            progress(last_id / max(max_id, 1))
+
+    elapsed = time.perf_counter() - start
+    if dry_run:
+        print(f"Dry run: scanned {scanned} responses in {elapsed:.1f}s, {skipped} skipped (unknown layout).")
+        report.print()
+        return report.changed
+    conn.execute("UPDATE rescore_progress SET status = 'done', updated_at = CURRENT_TIMESTAMP WHERE target = ?", (target,))
+    conn.commit()
+    print(f"Rescored {scanned} responses in {elapsed:.1f}s: {updated} updated, {skipped} skipped (unknown layout).")
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Re-derive response scores from raw answers')
+    parser.add_argument('--db', default=DB_NAME)
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+    parser.add_argument('--dry-run', action='store_true', help='Report the differences without writing')
+    parser.add_argument('--all', action='store_true', help='Include responses already stamped with the current version')
+    parser.add_argument('--restart', action='store_true', help='Ignore the saved checkpoint')
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    conn.execute('PRAGMA busy_timeout = 5000')
+    rescore(conn, args.chunk_size, args.dry_run, args.all, args.restart)
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import sqlite3
+
+import numpy as np
+
+from constructs import QUESTIONS
+
+# Questionnaire scoring shared by questionnaire() and rescore.py.
+#
+# A layout is the ordered list of constructs and their item counts taken from
+# constructs.QUESTIONS; answers are q1..qN in that order. The version stamped on each
+# response hashes the layout together with RULES_VERSION, so a response can be
+# re-derived from its raw answers whenever the layout or the rules change.
+
+# Bump whenever the scoring rules below change
+RULES_VERSION = 1
+# 0-based item positions scored as given; every other stress item is a positive
+# statement and is inverted (6 - answer). Q2 "suddenly burdened with more work".
+DIRECT_STRESS_ITEMS = {1}
+DEFAULT_ANSWER = 3
+
+CONSTRUCT_COLUMNS = {
+    'Workload': 'workload',
+    'Role Ambiguity': 'role_ambiguity',
+    'Job Security': 'job_security',
+    'Gender Discrimination': 'gender_discrim',
+    'Interpersonal Relationships': 'interpersonal',
+    'Resource Constraints': 'resources',
+    'Job Satisfaction': 'satisfaction',
+    'Organizational Support': 'support',
+    'Timings': 'timings',
+    'Supervisor Competence': 'supervisor',
+    'Compensation': 'compensation',
+    'Systems & Procedures': 'systems'
+}
+SCORE_COLUMNS = list(CONSTRUCT_COLUMNS.values()) + ['job_stress_score', 'productivity_score']
+
+
+def layout_of(questions):
+    return {
+        'stress': [[construct, len(items)] for construct, items in questions['Job Stress'].items()],
+        'productivity': [[construct, len(items)] for construct, items in questions['Productivity'].items()]
+    }
+
+
+# Layout of the current questionnaire; new responses are stamped with its version
+QUESTION_LAYOUT = layout_of(QUESTIONS)
+
+
+def item_count(layout):
+    return sum(n for _, n in layout['stress']) + sum(n for _, n in layout['productivity'])
+
+
+def version_of(layout, rules=RULES_VERSION):
+    blob = json.dumps({'layout': layout, 'rules': rules}, sort_keys=True)
+    return hashlib.sha1(blob.encode()).hexdigest()[:12]
+
+
+def answers_matrix(raw_answers, n_items):
+    """(N x n_items) float array from raw_answers dicts/JSON strings; missing or bad answers score 3."""
+    out = np.full((len(raw_answers), n_items), DEFAULT_ANSWER, dtype=float)
+    for i, raw in enumerate(raw_answers):
+        answers = json.loads(raw) if isinstance(raw, str) else (raw or {})
+        for j in range(n_items):
+            value = answers.get(f'q{j + 1}')
+            try:
+                out[i, j] = int(value)
+            except (TypeError, ValueError):
+                pass
+    return out
+
+
+def score(answers, layout):
+    """Construct means and the two composites for every row of an answers matrix.
+
+    Returns {column: (N,) array} keyed by responses column name.
+    """
+    answers = np.asarray(answers, dtype=float)
+    n_stress = sum(n for _, n in layout['stress'])
+    stress_items = answers[:, :n_stress].copy()
+    invert = np.array([j not in DIRECT_STRESS_ITEMS for j in range(n_stress)])
+    stress_items[:, invert] = 6 - stress_items[:, invert]
+    prod_items = answers[:, n_stress:item_count(layout)]
+
+    out = {}
+    for items, constructs in ((stress_items, layout['stress']), (prod_items, layout['productivity'])):
+        start = 0
+        for construct, n in constructs:
+            out[CONSTRUCT_COLUMNS[construct]] = items[:, start:start + n].mean(axis=1)
+            start += n
+    out['job_stress_score'], out['productivity_score'] = composites(
+        np.column_stack([out[CONSTRUCT_COLUMNS[c]] for c, _ in layout['stress']]),
+        np.column_stack([out[CONSTRUCT_COLUMNS[c]] for c, _ in layout['productivity']]))
+    return out
+
+
+def composites(stress_constructs, prod_constructs):
+    """(stress, productivity) composites from construct means along the last axis."""
+    stress = np.mean(stress_constructs, axis=-1)
+    prod = np.mean(prod_constructs, axis=-1)
+    # Enforce inverse relationship: high stress (5) -> low productivity (1)
+    prod = np.where(stress >= 5.0, 1.0, prod)
+    return stress, prod
+
+
+# Stored scores are rewritten in place by rescore.py, which MAX(id) and row counts
+# do not notice. Every rewrite bumps this persisted counter in the same transaction;
+# render and admin cache keys include it, so every worker (and a CLI run) invalidates.
+def ensure_generation_table(conn):
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS score_generation (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            generation INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    conn.execute('INSERT OR IGNORE INTO score_generation (id, generation) VALUES (1, 0)')
+    conn.commit()
+
+
+def bump_generation(conn):
+    """Increment the counter; the caller commits it together with its rewrites."""
+    conn.execute('UPDATE score_generation SET generation = generation + 1 WHERE id = 1')
+
+
+def generation(conn):
+    try:
+        row = conn.execute('SELECT generation FROM score_generation WHERE id = 1').fetchone()
+    except sqlite3.OperationalError:
+        # A replica or snapshot built before the table existed
+        return 0
+    return row[0] if row else 0
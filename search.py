@@ -0,0 +1,160 @@
+import sqlite3
+from html import escape
+
+# Full-text search over the free-text `problems` answers.
+#
+# responses_fts is an FTS5 external-content table: it stores only the index and
+# reads the text back from responses, keyed by rowid = responses.id. Triggers keep
+# it in sync on insert, update and delete (which also covers cleanup_db.py and
+# archive.py). Empty answers are never indexed.
+
+BACKFILL_CHUNK = 2000
+MAX_PER_PAGE = 100
+# Control characters mark matches so the snippet can be escaped before adding <mark>
+_OPEN, _CLOSE = '\x02', '\x03'
+
+_SCHEMA = [
+    """CREATE VIRTUAL TABLE responses_fts USING fts5(
+           problems, content='responses', content_rowid='id', tokenize='porter unicode61')""",
+    """CREATE TRIGGER responses_fts_ai AFTER INSERT ON responses
+       WHEN new.problems IS NOT NULL AND new.problems != '' BEGIN
+           INSERT INTO responses_fts (rowid, problems) VALUES (new.id, new.problems);
+       END""",
+    """CREATE TRIGGER responses_fts_ad AFTER DELETE ON responses
+       WHEN old.problems IS NOT NULL AND old.problems != '' BEGIN
+           INSERT INTO responses_fts (responses_fts, rowid, problems) VALUES ('delete', old.id, old.problems);
+       END""",
+    """CREATE TRIGGER responses_fts_au_old AFTER UPDATE OF problems ON responses
+       WHEN old.problems IS NOT NULL AND old.problems != '' BEGIN
+           INSERT INTO responses_fts (responses_fts, rowid, problems) VALUES ('delete', old.id, old.problems);
+       END""",
+    """CREATE TRIGGER responses_fts_au_new AFTER UPDATE OF problems ON responses
+       WHEN new.problems IS NOT NULL AND new.problems != '' BEGIN
+           INSERT INTO responses_fts (rowid, problems) VALUES (new.id, new.problems);
+       END"""
+]
+
+# Holds a row only while a backfill is pending; cursor_id is the last response indexed
+_BACKFILL_TABLE = """CREATE TABLE search_backfill (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    cursor_id INTEGER NOT NULL,
+    last_id INTEGER NOT NULL
+)"""
+
+
+def ensure_search_schema(conn, chunk_size=BACKFILL_CHUNK):
+    """Create the FTS table and triggers on first run, then backfill existing rows.
+
+    The backfill's high-water mark lives in search_backfill and is committed with
+    each chunk, so a backfill cut short (worker killed, deploy) resumes on the next
+    start instead of leaving the index partial.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'responses_fts'").fetchone():
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'search_backfill'").fetchone():
+            _check_legacy_index(conn)
+        backfill(conn, chunk_size)
+        return
+    try:
+        for sql in _SCHEMA:
+            conn.execute(sql)
+        # Rows up to here predate the triggers; newer ones are indexed as they arrive
+        conn.execute(_BACKFILL_TABLE)
+        conn.execute('INSERT INTO search_backfill (id, cursor_id, last_id) SELECT 1, 0, COALESCE(MAX(id), 0) FROM responses')
+        conn.commit()
+    except sqlite3.OperationalError as e:
+        conn.rollback()
+        print(f"Full-text search unavailable (FTS5 missing?): {e}")
+        return
+    backfill(conn, chunk_size)
+
+
+def _check_legacy_index(conn):
+    """An index built before search_backfill existed may be partial: rebuild it if counts differ."""
+    indexed = conn.execute('SELECT COUNT(*) FROM responses_fts_docsize').fetchone()[0]
+    expected = conn.execute("SELECT COUNT(*) FROM responses WHERE problems IS NOT NULL AND problems != ''").fetchone()[0]
+    if indexed != expected:
+        print(f"Search index has {indexed} of {expected} answers; rebuilding it.")
+        conn.execute("INSERT INTO responses_fts (responses_fts) VALUES ('rebuild')")
+    conn.execute(_BACKFILL_TABLE)
+    conn.commit()
+
+
+def backfill(conn, chunk_size=BACKFILL_CHUNK):
+    """Index pre-trigger responses from the saved cursor, one committed chunk at a time."""
+    state = conn.execute('SELECT cursor_id, last_id FROM search_backfill WHERE id = 1').fetchone()
+    if state is None:
+        return 0
+    cursor_id, last_id = state
+    done = 0
+    while True:
+        rows = conn.execute('''
+            SELECT id, problems FROM responses
+            WHERE id > ? AND id <= ? AND problems IS NOT NULL AND problems != ''
+            ORDER BY id LIMIT ?
+        ''', (cursor_id, last_id, chunk_size)).fetchall()
+        if not rows:
+            break
+        conn.executemany('INSERT INTO responses_fts (rowid, problems) VALUES (?, ?)', [tuple(r) for r in rows])
+        cursor_id = rows[-1][0]
+        conn.execute('UPDATE search_backfill SET cursor_id = ? WHERE id = 1', (cursor_id,))
+        conn.commit()
+        done += len(rows)
+    # Finished: the triggers cover everything from here on
+    conn.execute('DELETE FROM search_backfill WHERE id = 1')
+    conn.commit()
+    if done:
+        print(f"Indexed {done} existing feedback answers for search.")
+    return done
+
+
+def to_match_query(text):
+    """Quote each word so user input can't produce FTS5 syntax errors; a trailing * keeps prefix search."""
+    terms = []
+    for word in text.split():
+        prefix = word.endswith('*')
+        word = word.rstrip('*').replace('"', '""')
+        if word:
+            terms.append(f'"{word}"' + ('*' if prefix else ''))
+    return ' '.join(terms)
+
+
+def search(conn, query, department=None, stress=None, page=1, per_page=20, raw=False):
+    """Ranked (bm25) page of responses whose problems text matches `query`.
+
+    Returns (total, rows); each row dict has an HTML-escaped snippet with <mark>
+    highlights. raw=True passes the query to FTS5 unchanged (phrases, OR, NEAR).
+    """
+    match = query if raw else to_match_query(query)
+    if not match:
+        return 0, []
+    where, params = ['responses_fts MATCH ?'], [match]
+    if department:
+        where.append('u.department = ?')
+        params.append(department)
+    if stress:
+        where.append('r.stress_level = ?')
+        params.append(stress)
+    joins = '''
+        FROM responses_fts
+        JOIN responses r ON r.id = responses_fts.rowid
+        JOIN users u ON u.id = r.user_id
+        WHERE ''' + ' AND '.join(where)
+
+    total = conn.execute('SELECT COUNT(*) ' + joins, params).fetchone()[0]
+    per_page = max(1, min(per_page, MAX_PER_PAGE))
+    cur = conn.execute(f'''
+        SELECT r.id AS response_id, u.username, u.department, r.job_stress_score, r.productivity_score,
+               r.stress_level, r.submission_date, snippet(responses_fts, 0, ?, ?, '…', 16) AS snippet,
+               bm25(responses_fts) AS rank
+        {joins}
+        ORDER BY rank
+        LIMIT ? OFFSET ?
+    ''', [_OPEN, _CLOSE] + params + [per_page, (max(page, 1) - 1) * per_page])
+    names = [d[0] for d in cur.description]
+    results = []
+    for r in cur.fetchall():
+        item = dict(zip(names, r))
+        item['snippet'] = escape(item['snippet'] or '').replace(_OPEN, '<mark>').replace(_CLOSE, '</mark>')
+        item['rank'] = round(item['rank'], 4)
+        results.append(item)
+    return total, results
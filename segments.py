@@ -0,0 +1,117 @@
+"""Per-segment productivity models (training/train_model.py --segments).
+
+The manifest maps segment keys ("IT", or "IT|Manager" when trained by position)
+to a pickle holding that segment's scaler and models. SegmentRouter resolves a
+user's segment with a dict lookup and unpickles each segment file on first use,
+so only the segments that are actually requested are ever loaded.
+"""
+import json
+import os
+import threading
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SEGMENTS_DIR = os.environ.get('SEGMENTS_DIR', os.path.join(BASE_DIR, 'models', 'segments'))
+MANIFEST_NAME = 'manifest.json'
+
+
+def segment_key(department, position=None):
+    return f'{department}|{position}' if position else str(department)
+
+
+class SegmentRouter:
+    def __init__(self, directory=SEGMENTS_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._manifest = {'segments': {}}
+        self._mtime = None
+        self._loaded = {}
+
+    def _manifest_path(self):
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def manifest(self):
+        """Current manifest (empty when no segments are trained); reloaded on change."""
+        try:
+            mtime = os.path.getmtime(self._manifest_path())
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            with self._lock:
+                manifest = {'segments': {}}
+                if mtime is not None:
+                    with open(self._manifest_path()) as f:
+                        manifest = json.load(f)
+                self._manifest, self._mtime, self._loaded = manifest, mtime, {}
+        return self._manifest
+
+    @property
+    def version(self):
+        self.manifest()
+        return self._mtime
+
+    def resolve(self, department, position=None):
+        """Most specific trained segment key for a user, or None for the global model."""
+        segments = self.manifest()['segments']
+        for key in (segment_key(department, position), segment_key(department)):
+            if key in segments:
+                return key
+        return None
+
+    def models(self, key):
+        """{'scaler': ..., 'lr': ..., ...} for a segment key, unpickled on first use."""
+        if key not in self._loaded:
+            import joblib
+
+            with self._lock:
+                if key not in self._loaded:
+                    entry = self.manifest()['segments'][key]
+                    self._loaded[key] = joblib.load(os.path.join(self.directory, entry['file']))
+        return self._loaded[key]
+
+    def preload(self):
+        """Unpickle every trained segment now, e.g. in a gunicorn master before fork."""
+        for key in self.manifest()['segments']:
+            self.models(key)
+        return len(self._loaded)
+
+    def get(self, department, position=None):
+        """(segment key, models) for a user, or (None, None) to use the global models."""
+        if not department:
+            return None, None
+        key = self.resolve(department, position)
+        if key is None:
+            return None, None
+        try:
+            return key, self.models(key)
+        except Exception as e:
+            print(f"Error loading segment model {key}: {e}")
+            return None, None
+
+    def predict_batch(self, name, scores, departments, positions=None, fallback=None):
+        """Predict with model `name` for many rows, one vectorised call per segment.
+
+        fallback is a (scaler, model) pair used for rows without a trained segment;
+        those rows are NaN when it is None. Returns (predictions, segment keys).
+        """
+        scores = np.asarray(scores, dtype=float)
+        departments = np.asarray(departments)
+        positions = np.asarray(positions) if positions is not None else np.full(len(scores), None)
+        resolved = {}
+        keys = np.array([
+            resolved[pair] if pair in resolved else resolved.setdefault(pair, self.resolve(*pair))
+            for pair in zip(departments.tolist(), positions.tolist())
+        ], dtype=object)
+        out = np.full(len(scores), np.nan)
+        for key in set(keys):
+            rows = keys == key
+            models = self.models(key) if key is not None else None
+            if models is not None and name in models:
+                scaler, model = models['scaler'], models[name]
+            elif fallback is not None:
+                scaler, model = fallback
+            else:
+                continue
+            out[rows] = model.predict(scaler.transform(scores[rows].reshape(-1, 1)))
+        return out, keys
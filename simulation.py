@@ -0,0 +1,102 @@
+"""What-if simulation: shift construct scores for a cohort and compare predictions.
+
+Each scenario is a set of construct deltas (e.g. Workload -1). The cohort's
+(N x 12) construct matrix is shifted for all S scenarios at once into an
+(S x N x 12) array, clipped to the 1..5 answer scale, and the composites are
+recomputed with scoring.composites(). The baseline and every scenario are then
+flattened into one batch so each model predicts exactly once.
+"""
+import time
+
+import numpy as np
+
+import scoring
+
+STRESS_COLUMNS = list(scoring.CONSTRUCT_COLUMNS.values())[:8]
+PROD_COLUMNS = list(scoring.CONSTRUCT_COLUMNS.values())[8:]
+COLUMNS = STRESS_COLUMNS + PROD_COLUMNS
+MAX_SCENARIOS = 20
+SCALE_MIN, SCALE_MAX = 1.0, 5.0
+
+
+def parse_deltas(deltas):
+    """{construct label or column: delta} -> length-12 array; raises ValueError on unknown names."""
+    out = np.zeros(len(COLUMNS))
+    for name, delta in (deltas or {}).items():
+        column = scoring.CONSTRUCT_COLUMNS.get(name, name)
+        if column not in COLUMNS:
+            raise ValueError(f'Unknown construct: {name}')
+        out[COLUMNS.index(column)] = float(delta)
+    return out
+
+
+def load_cohort(conn, department=None, position=None, level=None):
+    """Each matching employee's latest response: (matrix N x 12, departments, positions).
+
+    Responses without all eight stress constructs are left out, since the models
+    need a stress composite for every row.
+    """
+    rows = conn.execute(f'''
+        SELECT u.department, u.position, {', '.join('r.' + c for c in COLUMNS)}
+        FROM responses r
+        JOIN users u ON u.id = r.user_id
+        WHERE r.id IN (SELECT MAX(id) FROM responses GROUP BY user_id)
+          AND (? IS NULL OR u.department = ?)
+          AND (? IS NULL OR u.position = ?)
+          AND (? IS NULL OR r.stress_level = ?)
+    ''', (department, department, position, position, level, level)).fetchall()
+    matrix = np.array([[np.nan if v is None else v for v in r[2:]] for r in rows], dtype=float).reshape(-1, len(COLUMNS))
+    keep = ~np.isnan(matrix[:, :len(STRESS_COLUMNS)]).any(axis=1)
+    return (matrix[keep],
+            np.array([r[0] for r in rows], dtype=object)[keep],
+            np.array([r[1] for r in rows], dtype=object)[keep])
+
+
+def _summary(stress, prod, predictions, base=None):
+    low, medium, high = (stress < 2), (stress >= 2) & (stress <= 3), (stress > 3)
+    out = {
+        'job_stress_score': round(float(np.mean(stress)), 4),
+        'productivity_score': round(float(np.nanmean(prod)), 4) if not np.isnan(prod).all() else None,
+        'stress_levels': {'Low': round(float(low.mean()), 4), 'Medium': round(float(medium.mean()), 4),
+                          'High': round(float(high.mean()), 4)},
+        'predictions': {name: round(float(np.nanmean(p)), 4) for name, p in predictions.items() if not np.isnan(p).all()}
+    }
+    if base is not None:
+        out['delta'] = {
+            'job_stress_score': round(out['job_stress_score'] - base['job_stress_score'], 4),
+            'productivity_score': (round(out['productivity_score'] - base['productivity_score'], 4)
+                                   if out['productivity_score'] is not None and base['productivity_score'] is not None else None),
+            'predictions': {name: round(value - base['predictions'][name], 4)
+                            for name, value in out['predictions'].items() if name in base['predictions']}
+        }
+    return out
+
+
+def simulate(matrix, departments, positions, scenarios, predict):
+    """Run every scenario against the cohort.
+
+    scenarios is a list of (name, deltas array); predict(scores, departments,
+    positions) returns {model name: predictions} for a flat batch of stress scores.
+    """
+    timings = {}
+    start = time.perf_counter()
+    n = len(matrix)
+    deltas = np.array([d for _, d in scenarios]).reshape(-1, len(COLUMNS))
+    # (S + 1) x N x 12 with the unshifted cohort as scenario 0
+    shifted = np.concatenate([matrix[None], np.clip(matrix[None] + deltas[:, None, :], SCALE_MIN, SCALE_MAX)])
+    stress, prod = scoring.composites(shifted[..., :len(STRESS_COLUMNS)], shifted[..., len(STRESS_COLUMNS):])
+    timings['compute_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    start = time.perf_counter()
+    batches = len(shifted)
+    predictions = predict(stress.reshape(-1), np.tile(departments, batches), np.tile(positions, batches))
+    predictions = {name: p.reshape(batches, n) for name, p in predictions.items()}
+    timings['predict_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    baseline = _summary(stress[0], prod[0], {name: p[0] for name, p in predictions.items()})
+    results = []
+    for i, (name, d) in enumerate(scenarios, start=1):
+        entry = {'name': name, 'deltas': {c: float(v) for c, v in zip(COLUMNS, d) if v}}
+        entry.update(_summary(stress[i], prod[i], {m: p[i] for m, p in predictions.items()}, baseline))
+        results.append(entry)
+    return {'employees': n, 'baseline': baseline, 'scenarios': results, 'timings': timings}
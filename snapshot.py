@@ -0,0 +1,157 @@
+"""Prebuilt read-only snapshot for serverless cold starts.
+
+`python snapshot.py` (run at build/deploy time) writes snapshot/ containing:
+
+  database.db     VACUUMed copy of database.db with analytics indexes, ANALYZE stats
+                  and a snapshot_aggregates table of precomputed admin chart data
+  models.joblib   every loaded model, the scaler and threshold in one compressed file
+  manifest.json   build time, data version and row counts
+
+At runtime (on Vercel, or with USE_SNAPSHOT=1) the app no longer copies the database
+to /tmp. It opens the snapshot with `immutable=1` and attaches it to a small
+writable overlay database. connect() creates TEMP views named users and responses
+that UNION both files, so reads see everything. Writes must name `main.users` /
+`main.responses` explicitly and land in the overlay.
+"""
+import json
+import os
+import sqlite3
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', os.path.join(BASE_DIR, 'snapshot'))
+SNAPSHOT_DB = os.path.join(SNAPSHOT_DIR, 'database.db')
+MODEL_BUNDLE = os.path.join(SNAPSHOT_DIR, 'models.joblib')
+MANIFEST = os.path.join(SNAPSHOT_DIR, 'manifest.json')
+
+UNIFIED_TABLES = ('users', 'responses')
+INDEXES = [
+    'CREATE INDEX IF NOT EXISTS idx_responses_user ON responses (user_id, id)',
+    'CREATE INDEX IF NOT EXISTS idx_users_department ON users (department)',
+    'CREATE INDEX IF NOT EXISTS idx_users_role ON users (role)'
+]
+
+
+def enabled():
+    return bool(os.environ.get('VERCEL') or os.environ.get('USE_SNAPSHOT')) and os.path.exists(SNAPSHOT_DB)
+
+
+def _uri(path, **params):
+    query = '&'.join(f'{k}={v}' for k, v in params.items())
+    return f"file:{path}{'?' + query if query else ''}"
+
+
+def connect(overlay_path, snapshot_path=SNAPSHOT_DB):
+    """Overlay connection with the snapshot attached as `snap` and unified TEMP views."""
+    conn = sqlite3.connect(_uri(overlay_path), uri=True)
+    conn.execute('ATTACH DATABASE ? AS snap', (_uri(snapshot_path, mode='ro', immutable=1),))
+    for table in UNIFIED_TABLES:
+        # table_xinfo so generated columns (stress_level, stress_bucket) are part of the view
+        cols = [r[1] for r in conn.execute(f"PRAGMA main.table_xinfo('{table}')").fetchall()]
+        snap_cols = {r[1] for r in conn.execute(f"PRAGMA snap.table_xinfo('{table}')").fetchall()}
+        # Columns added after the snapshot was built read as NULL from the snapshot side
+        select_snap = ', '.join(c if c in snap_cols else f'NULL AS {c}' for c in cols)
+        conn.execute(f'CREATE TEMP VIEW {table} AS '
+                     f'SELECT {", ".join(cols)} FROM main.{table} UNION ALL SELECT {select_snap} FROM snap.{table}')
+    return conn
+
+
+def prepare_overlay(overlay_path, snapshot_path=SNAPSHOT_DB):
+    """Start the overlay's AUTOINCREMENT counters above the snapshot's ids."""
+    conn = sqlite3.connect(overlay_path)
+    conn.execute('ATTACH DATABASE ? AS snap', (_uri(snapshot_path, mode='ro', immutable=1),))
+    for table in UNIFIED_TABLES:
+        snap_max = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM snap.{table}').fetchone()[0]
+        row = conn.execute('SELECT seq FROM main.sqlite_sequence WHERE name = ?', (table,)).fetchone()
+        if row is None:
+            conn.execute('INSERT INTO main.sqlite_sequence (name, seq) VALUES (?, ?)', (table, snap_max))
+        elif row[0] < snap_max:
+            conn.execute('UPDATE main.sqlite_sequence SET seq = ? WHERE name = ?', (snap_max, table))
+    conn.commit()
+    conn.close()
+
+
+def aggregate(conn, key, data_version):
+    """Precomputed aggregate for `key` if the snapshot is still current, else None."""
+    try:
+        row = conn.execute('SELECT value FROM snap.snapshot_aggregates WHERE key = ? AND data_version = ?',
+                           (key, data_version)).fetchone()
+    except sqlite3.OperationalError:
+        # Not a snapshot connection
+        return None
+    return json.loads(row[0]) if row else None
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def build(source_db, out_dir=SNAPSHOT_DIR):
+    import joblib
+    import app as webapp
+
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    db_path = os.path.join(out_dir, 'database.db')
+    tmp = db_path + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+
+    # VACUUM INTO writes a compacted copy without touching the live file
+    src = sqlite3.connect(source_db)
+    src.execute('VACUUM INTO ?', (tmp,))
+    src.close()
+
+    conn = sqlite3.connect(tmp)
+    conn.row_factory = sqlite3.Row
+    for sql in INDEXES:
+        conn.execute(sql)
+    conn.execute('CREATE TABLE snapshot_aggregates (key TEXT PRIMARY KEY, data_version TEXT, value TEXT)')
+    data_version = webapp.admin_data_version(conn)
+    charts = webapp._admin_chart_data(conn)
+    conn.execute('INSERT INTO snapshot_aggregates VALUES (?, ?, ?)', ('charts', data_version, json.dumps(charts)))
+    counts = {t: conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0] for t in UNIFIED_TABLES}
+    conn.commit()
+    conn.execute('ANALYZE')
+    # Rollback journal so the file is self-contained when opened immutable
+    conn.execute('PRAGMA journal_mode = DELETE')
+    conn.close()
+    os.replace(tmp, db_path)
+
+    bundle = {
+        'lr': webapp.model_lr, 'rf': webapp.model_rf, 'gb': webapp.model_gb, 'log': webapp.model_log,
+        'scaler': webapp.scaler, 'threshold': webapp.threshold, 'version': webapp.model_version
+    }
+    bundle_path = os.path.join(out_dir, 'models.joblib')
+    joblib.dump(bundle, bundle_path + '.tmp', compress=3)
+    os.replace(bundle_path + '.tmp', bundle_path)
+
+    manifest = {
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'source': os.path.basename(source_db),
+        'data_version': data_version,
+        'rows': counts,
+        'models': sorted(k for k, v in bundle.items() if v is not None and k not in ('threshold', 'version')),
+        'db_bytes': os.path.getsize(db_path),
+        'model_bytes': os.path.getsize(bundle_path)
+    }
+    with open(os.path.join(out_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"Snapshot built in {time.perf_counter() - start:.1f}s: {counts['users']} users, "
+          f"{counts['responses']} responses, DB {manifest['db_bytes'] // 1024} KB, "
+          f"models {manifest['model_bytes'] // 1024} KB")
+    return manifest
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the read-only cold-start snapshot')
+    parser.add_argument('--db', default=os.path.join(BASE_DIR, 'database.db'))
+    parser.add_argument('--output', default=SNAPSHOT_DIR)
+    args = parser.parse_args()
+    build(args.db, args.output)
@@ -0,0 +1,131 @@
+import json
+
+from scoring import SCORE_COLUMNS
+
+# Per-user summary of their responses, one row per user keyed by user_id.
+#
+# user_summary holds the latest response id, the submission count, a running
+# sum and non-NULL count per score column (mean = sum / n) and `history`, a JSON
+# ring of the last HISTORY_SIZE submissions as [id, stress, productivity, date],
+# oldest first. Triggers on responses keep it current: an insert adds to the sums
+# and appends to the ring without reading other rows; an update or delete
+# (rescore.py, cleanup_db.py, archive.py) adjusts the sums and rebuilds the ring
+# from the user's last HISTORY_SIZE rows. The summary describes the hot table, so
+# archived responses drop out of it just as they drop out of the dashboard.
+
+HISTORY_SIZE = 10
+
+_ENTRY = "json_array({r}.id, {r}.job_stress_score, {r}.productivity_score, {r}.submission_date)"
+# Last HISTORY_SIZE responses of `uid` as a JSON array, oldest first (uses idx_responses_user)
+_HISTORY = f"""(SELECT json_group_array(json(entry)) FROM (
+    SELECT entry FROM (
+        SELECT {_ENTRY.format(r='h')} AS entry, h.id FROM responses h
+        WHERE h.user_id = {{uid}} ORDER BY h.id DESC LIMIT {HISTORY_SIZE}
+    ) ORDER BY id))"""
+
+
+def _sum_columns():
+    return [f'{c}_sum' for c in SCORE_COLUMNS] + [f'{c}_n' for c in SCORE_COLUMNS]
+
+
+def _schema():
+    sums = ',\n'.join(f'    {c}_sum REAL NOT NULL DEFAULT 0,\n    {c}_n INTEGER NOT NULL DEFAULT 0' for c in SCORE_COLUMNS)
+    table = f"""CREATE TABLE user_summary (
+    user_id INTEGER PRIMARY KEY,
+    latest_response_id INTEGER,
+    first_at TIMESTAMP,
+    latest_at TIMESTAMP,
+    responses INTEGER NOT NULL DEFAULT 0,
+{sums},
+    history TEXT NOT NULL DEFAULT '[]'
+)"""
+    entry = _ENTRY.format(r='new')
+    add = ', '.join(f'{c}_sum = {c}_sum + COALESCE(new.{c}, 0), {c}_n = {c}_n + (new.{c} IS NOT NULL)'
+                    for c in SCORE_COLUMNS)
+    remove = ', '.join(f'{c}_sum = {c}_sum - COALESCE(old.{c}, 0), {c}_n = {c}_n - (old.{c} IS NOT NULL)'
+                       for c in SCORE_COLUMNS)
+    change = ', '.join(f'{c}_sum = {c}_sum + COALESCE(new.{c}, 0) - COALESCE(old.{c}, 0), '
+                       f'{c}_n = {c}_n + (new.{c} IS NOT NULL) - (old.{c} IS NOT NULL)' for c in SCORE_COLUMNS)
+    latest = ('latest_response_id = (SELECT MAX(id) FROM responses WHERE user_id = {uid}), '
+              'latest_at = (SELECT submission_date FROM responses WHERE id = (SELECT MAX(id) FROM responses WHERE user_id = {uid})), '
+              'first_at = (SELECT submission_date FROM responses WHERE id = (SELECT MIN(id) FROM responses WHERE user_id = {uid}))')
+    return [
+        table,
+        'CREATE INDEX IF NOT EXISTS idx_responses_user ON responses (user_id, id)',
+        f"""CREATE TRIGGER user_summary_ai AFTER INSERT ON responses WHEN new.user_id IS NOT NULL BEGIN
+            INSERT OR IGNORE INTO user_summary (user_id, first_at) VALUES (new.user_id, new.submission_date);
+            UPDATE user_summary SET
+                latest_response_id = new.id, latest_at = new.submission_date, responses = responses + 1, {add},
+                history = CASE WHEN json_array_length(history) >= {HISTORY_SIZE}
+                               THEN json_insert(json_remove(history, '$[0]'), '$[#]', json({entry}))
+                               ELSE json_insert(history, '$[#]', json({entry})) END
+            WHERE user_id = new.user_id;
+        END""",
+        f"""CREATE TRIGGER user_summary_ad AFTER DELETE ON responses WHEN old.user_id IS NOT NULL BEGIN
+            UPDATE user_summary SET responses = responses - 1, {remove},
+                {latest.format(uid='old.user_id')}, history = {_HISTORY.format(uid='old.user_id')}
+            WHERE user_id = old.user_id;
+            DELETE FROM user_summary WHERE user_id = old.user_id AND responses <= 0;
+        END""",
+        f"""CREATE TRIGGER user_summary_au AFTER UPDATE OF {', '.join(SCORE_COLUMNS)} ON responses
+            WHEN new.user_id IS NOT NULL BEGIN
+            UPDATE user_summary SET {change}, history = {_HISTORY.format(uid='new.user_id')}
+            WHERE user_id = new.user_id;
+        END"""
+    ]
+
+
+def _compute_sql(where=''):
+    """SELECT producing user_summary rows from responses, optionally for one user."""
+    sums = ', '.join([f'TOTAL(r.{c})' for c in SCORE_COLUMNS] + [f'COUNT(r.{c})' for c in SCORE_COLUMNS])
+    return f"""
+        SELECT r.user_id, MAX(r.id), MIN(r.submission_date), MAX(r.submission_date), COUNT(*), {sums},
+               {_HISTORY.format(uid='r.user_id')}
+        FROM responses r
+        WHERE r.user_id IS NOT NULL {where}
+        GROUP BY r.user_id"""
+
+
+def ensure_summary_schema(conn):
+    """Create user_summary and its triggers on first run, filled from existing responses."""
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'user_summary'").fetchone():
+        return
+    # One transaction, so no response lands between the backfill and the triggers
+    for sql in _schema():
+        conn.execute(sql)
+    columns = ['user_id', 'latest_response_id', 'first_at', 'latest_at', 'responses'] + _sum_columns() + ['history']
+    conn.execute(f"INSERT INTO user_summary ({', '.join(columns)}) {_compute_sql()}")
+    count = conn.execute('SELECT COUNT(*) FROM user_summary').fetchone()[0]
+    conn.commit()
+    if count:
+        print(f"Built response summaries for {count} users.")
+
+
+def _to_dict(row):
+    values = dict(zip(['user_id', 'latest_response_id', 'first_at', 'latest_at', 'responses'] + _sum_columns() + ['history'], row))
+    return {
+        'user_id': values['user_id'],
+        'latest_response_id': values['latest_response_id'],
+        'first_at': values['first_at'],
+        'latest_at': values['latest_at'],
+        'responses': values['responses'],
+        'means': {c: (values[f'{c}_sum'] / values[f'{c}_n'] if values[f'{c}_n'] else None) for c in SCORE_COLUMNS},
+        'history': [
+            {'id': h[0], 'job_stress_score': h[1], 'productivity_score': h[2], 'submission_date': h[3]}
+            for h in json.loads(values['history'] or '[]')
+        ]
+    }
+
+
+def load(conn, user_id):
+    """Summary dict for a user from the maintained table (one primary-key read), or None."""
+    columns = ['user_id', 'latest_response_id', 'first_at', 'latest_at', 'responses'] + _sum_columns() + ['history']
+    row = conn.execute(f"SELECT {', '.join(columns)} FROM user_summary WHERE user_id = ?", (user_id,)).fetchone()
+    return _to_dict(tuple(row)) if row else None
+
+
+def compute(conn, user_id):
+    """Same summary computed from the user's responses, for connections where the
+    maintained table doesn't cover every row (the snapshot + overlay views)."""
+    row = conn.execute(_compute_sql('AND r.user_id = ?'), (user_id,)).fetchone()
+    return _to_dict(tuple(row)) if row else None
@@ -0,0 +1,86 @@
+"""Jinja setup: a filesystem bytecode cache and per-template render timings.
+
+Compiled templates are written to TEMPLATE_CACHE_DIR, so a fresh worker (or a cold
+Vercel instance that already has the directory) loads bytecode instead of parsing
+and compiling every template on its first request. Jinja checks each cached entry
+against the template source, so edited templates are recompiled.
+
+Every top-level render (render_template) is timed and its output size recorded for
+/admin/metrics. A template that includes or imports others is timed inclusively.
+"""
+import os
+import threading
+import time
+
+from jinja2 import FileSystemBytecodeCache, Template
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TEMPLATE_CACHE_DIR = os.environ.get(
+    'TEMPLATE_CACHE_DIR', os.path.join('/tmp' if os.environ.get('VERCEL') else BASE_DIR, '.jinja_cache'))
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _record(name, seconds, size):
+    with _lock:
+        s = _stats.setdefault(name, {'renders': 0, 'total_seconds': 0.0, 'max_ms': 0.0, 'bytes': 0, 'max_bytes': 0})
+        s['renders'] += 1
+        s['total_seconds'] += seconds
+        s['max_ms'] = max(s['max_ms'], seconds * 1000)
+        s['bytes'] += size
+        s['max_bytes'] = max(s['max_bytes'], size)
+
+
+class ProfiledTemplate(Template):
+    def render(self, *args, **kwargs):
+        start = time.perf_counter()
+        out = super().render(*args, **kwargs)
+        _record(self.name or '<string>', time.perf_counter() - start, len(out))
+        return out
+
+
+def reset():
+    """Zero the counters in a freshly forked worker."""
+    global _lock
+    _lock = threading.Lock()
+    _stats.clear()
+
+
+def stats():
+    """Per-template renders, average/max time and average/max output size, slowest total first."""
+    with _lock:
+        items = [(name, dict(s)) for name, s in _stats.items()]
+    out = {}
+    for name, s in sorted(items, key=lambda item: -item[1]['total_seconds']):
+        out[name] = {
+            'renders': s['renders'],
+            'total_ms': round(s['total_seconds'] * 1000, 2),
+            'avg_ms': round(s['total_seconds'] * 1000 / s['renders'], 3),
+            'max_ms': round(s['max_ms'], 3),
+            'avg_bytes': s['bytes'] // s['renders'],
+            'max_bytes': s['max_bytes']
+        }
+    return out
+
+
+def precompile(app):
+    """Load every template once, filling the bytecode cache. Under gunicorn's preload_app
+    this runs in the master, so workers inherit the compiled templates."""
+    count = 0
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+        count += 1
+    return count
+
+
+def init_app(app):
+    """Must run before anything touches app.jinja_env, which is created on first use."""
+    options = dict(app.jinja_options)
+    try:
+        os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+        options['bytecode_cache'] = FileSystemBytecodeCache(TEMPLATE_CACHE_DIR)
+    except OSError as e:
+        print(f"Template bytecode cache disabled: {e}")
+    app.jinja_options = options
+    app.jinja_env.template_class = ProfiledTemplate
@@ -0,0 +1,333 @@
+"""One SQLite file per client organization, chosen per request.
+
+    python tenants.py list
+    python tenants.py add acme --name "Acme Corp" --admin-password 's3cret'
+    python tenants.py split --column department --map orgs.json
+    python tenants.py split --column department            # one tenant per distinct value
+
+tenants.json (next to app.py, or $TENANTS_FILE) maps a tenant slug to its name and
+database file. The `default` tenant is always database.db, so without a registry
+the app behaves exactly as before. The app picks the tenant per request: from the
+session once someone has logged in, otherwise from the ?org= / form `org` value.
+get_db() then opens that tenant's file. Each tenant has its own write lock, caches,
+analytics replica and rollups (the admin aggregates only ever see one file), and
+TenantRouter.metrics() reports request counts and timings per tenant.
+
+`split` copies a shared database into one file per organization without touching
+the source: each copy keeps the users whose `column` value maps to that tenant,
+with their responses.
+
+The app seeds the stock admin/admin123 account only in the default database. `add`
+and `split` give every tenant its own admin instead (the shared database's admins
+are not copied), with --admin-password or a random password printed once.
+"""
+import argparse
+import contextlib
+import contextvars
+import json
+import os
+import re
+import secrets
+import sqlite3
+import threading
+import time
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+TENANTS_FILE = os.environ.get('TENANTS_FILE', os.path.join(BASE_DIR, 'tenants.json'))
+TENANTS_DIR = os.environ.get('TENANTS_DIR', os.path.join(BASE_DIR, 'tenants'))
+DEFAULT_TENANT = 'default'
+_SLUG_RE = re.compile(r'^[a-z0-9][a-z0-9_-]{0,39}$')
+
+
+def slugify(value):
+    return re.sub(r'[^a-z0-9_-]+', '-', str(value).strip().lower()).strip('-')[:40] or 'unknown'
+
+
+def load_registry(path=TENANTS_FILE):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_registry(registry, path=TENANTS_FILE):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(registry, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+class TenantRouter:
+    def __init__(self, default_path, registry_path=TENANTS_FILE):
+        self.default_path = default_path
+        self.registry_path = registry_path
+        self._current = contextvars.ContextVar('tenant', default=DEFAULT_TENANT)
+        self._lock = threading.Lock()
+        self._ready = set()
+        self._metrics = {}
+        self.reload()
+
+    def reload(self):
+        registry = load_registry(self.registry_path) if self.registry_path else {}
+        tenants = {DEFAULT_TENANT: {'name': 'Default', 'path': self.default_path}}
+        for slug, entry in registry.items():
+            if slug == DEFAULT_TENANT:
+                tenants[slug]['name'] = entry.get('name', 'Default')
+            elif _SLUG_RE.match(slug):
+                tenants[slug] = {'name': entry.get('name', slug), 'path': os.path.join(BASE_DIR, entry['db'])}
+            else:
+                print(f"Ignoring tenant with invalid slug: {slug!r}")
+        self.tenants = tenants
+
+    @property
+    def configured(self):
+        return len(self.tenants) > 1
+
+    def choices(self):
+        return [(slug, t['name']) for slug, t in sorted(self.tenants.items())]
+
+    def current(self):
+        return self._current.get()
+
+    def activate(self, slug):
+        """Make `slug` current for this request/thread; returns a token for deactivate()."""
+        if slug not in self.tenants:
+            raise KeyError(slug)
+        return self._current.set(slug)
+
+    def deactivate(self, token):
+        self._current.reset(token)
+
+    @contextlib.contextmanager
+    def use(self, slug):
+        token = self.activate(slug)
+        try:
+            yield
+        finally:
+            self.deactivate(token)
+
+    def db_path(self, slug=None):
+        return self.tenants[slug or self.current()]['path']
+
+    def ensure_ready(self, slug, init):
+        """Run init() (schema setup) once per process for a tenant, with it current."""
+        if slug in self._ready:
+            return
+        with self._lock:
+            if slug in self._ready:
+                return
+            with self.use(slug):
+                init()
+            self._ready.add(slug)
+
+    def record(self, slug, seconds, status):
+        with self._lock:
+            m = self._metrics.setdefault(slug, {'requests': 0, 'errors': 0, 'total_seconds': 0.0, 'max_ms': 0.0})
+            m['requests'] += 1
+            m['errors'] += status >= 500
+            m['total_seconds'] += seconds
+            m['max_ms'] = max(m['max_ms'], seconds * 1000)
+
+    def metrics(self):
+        out = {}
+        for slug, tenant in self.tenants.items():
+            m = dict(self._metrics.get(slug, {'requests': 0, 'errors': 0, 'total_seconds': 0.0, 'max_ms': 0.0}))
+            m['avg_ms'] = round(m['total_seconds'] * 1000 / m['requests'], 2) if m['requests'] else None
+            m['max_ms'] = round(m['max_ms'], 2)
+            m['total_seconds'] = round(m['total_seconds'], 3)
+            m['name'] = tenant['name']
+            m['db_bytes'] = os.path.getsize(tenant['path']) if os.path.exists(tenant['path']) else None
+            out[slug] = m
+        return out
+
+    def reset(self):
+        """Fresh lock and counters in a forked worker; schema setup done before the fork still counts."""
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+
+class PerTenant:
+    """One instance of something (a cache, a replica) per tenant, created on first use.
+
+    Attribute access goes to the current tenant's instance, so a PerTenant can stand
+    in wherever a single shared instance was used before.
+    """
+    def __init__(self, router, factory):
+        self._router = router
+        self._factory = factory
+        self._items = {}
+        self._lock = threading.Lock()
+
+    def for_tenant(self, slug=None):
+        slug = slug or self._router.current()
+        item = self._items.get(slug)
+        if item is None:
+            with self._lock:
+                item = self._items.get(slug)
+                if item is None:
+                    item = self._items[slug] = self._factory(slug)
+        return item
+
+    def items(self):
+        return list(self._items.items())
+
+    def reset(self):
+        self._lock = threading.Lock()
+        for item in list(self._items.values()):
+            item.reset()
+
+    def __getattr__(self, name):
+        return getattr(self.for_tenant(), name)
+
+
+# Copied tables that describe the source database rather than a tenant's data. The
+# import ledger tracks CSVs loaded into the source; archive_users points into its partitions
+_RESET_TABLES = ('jobs', 'rescore_progress', 'archive_partitions', 'archive_users', 'import_ledger')
+
+
+def _tables(conn):
+    return {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+
+def create_admin(path, username='admin', password=None):
+    """Create (or reset) the tenant's admin account; returns the password.
+
+    Creates the users table the way app.init_db does if the database is new.
+    """
+    password = password or secrets.token_urlsafe(12)
+    conn = sqlite3.connect(path)
+    # Must precede the first table, as in app.init_db
+    conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            role TEXT NOT NULL DEFAULT 'employee',
+            position TEXT DEFAULT 'Staff',
+            gender TEXT,
+            department TEXT
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO users (username, password, role) VALUES (?, ?, 'admin')
+        ON CONFLICT(username) DO UPDATE SET password = excluded.password, role = 'admin'
+    ''', (username, password))
+    conn.commit()
+    conn.close()
+    return password
+
+
+def split(source, column, mapping, registry_path=TENANTS_FILE, out_dir=TENANTS_DIR, force=False,
+          admin_user='admin', admin_password=None):
+    """Copy `source` into one database per tenant in `mapping` ({slug: [column values]})."""
+    src = sqlite3.connect(source)
+    user_cols = {r[1] for r in src.execute("PRAGMA table_info('users')")}
+    if column not in user_cols:
+        raise ValueError(f"users has no column {column!r}")
+    if 'archive_partitions' in _tables(src) and src.execute('SELECT COUNT(*) FROM archive_partitions').fetchone()[0]:
+        print("Note: archived responses (archive.py) stay with the source database and are not split.")
+    os.makedirs(out_dir, exist_ok=True)
+    registry = load_registry(registry_path)
+
+    for slug, values in mapping.items():
+        if not _SLUG_RE.match(slug) or slug == DEFAULT_TENANT:
+            raise ValueError(f"Invalid tenant slug: {slug!r}")
+        path = os.path.join(out_dir, f'{slug}.db')
+        if os.path.exists(path) and not force:
+            print(f"{slug}: {path} exists, skipped (use --force to rebuild it)")
+            continue
+        start = time.perf_counter()
+        tmp = path + '.tmp'
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        src.execute('VACUUM INTO ?', (tmp,))
+
+        conn = sqlite3.connect(tmp)
+        tables = _tables(conn)
+        marks = ', '.join('?' * len(values))
+        others = f"SELECT id FROM users WHERE role = 'admin' OR {column} IS NULL OR {column} NOT IN ({marks})"
+        # Drop other tenants' summaries first so the responses delete trigger has nothing to update
+        if 'user_summary' in tables:
+            conn.execute(f'DELETE FROM user_summary WHERE user_id IN ({others})', values)
+        conn.execute(f'DELETE FROM responses WHERE user_id IS NULL OR user_id IN ({others}) '
+                     f'OR user_id NOT IN (SELECT id FROM users)', values)
+        conn.execute(f"DELETE FROM users WHERE role = 'admin' OR {column} IS NULL OR {column} NOT IN ({marks})", values)
+        for table in _RESET_TABLES:
+            if table in tables:
+                conn.execute(f'DELETE FROM {table}')
+        if 'import_batches' in tables:
+            # Keep only batches this tenant still has users from, with their counts
+            conn.execute('DELETE FROM import_batches WHERE id NOT IN '
+                         '(SELECT import_batch_id FROM users WHERE import_batch_id IS NOT NULL)')
+            conn.execute('UPDATE import_batches SET rows_imported = '
+                         '(SELECT COUNT(*) FROM users WHERE import_batch_id = import_batches.id)')
+        conn.commit()
+        users, responses = (conn.execute(f'SELECT COUNT(*) FROM {t}').fetchone()[0] for t in ('users', 'responses'))
+        conn.execute('VACUUM')
+        conn.close()
+        os.replace(tmp, path)
+        password = create_admin(path, admin_user, admin_password)
+
+        entry = registry.get(slug, {})
+        entry.update(db=os.path.relpath(path, BASE_DIR), name=entry.get('name', slug))
+        registry[slug] = entry
+        save_registry(registry, registry_path)
+        print(f"{slug}: {users} users, {responses} responses -> {path} ({time.perf_counter() - start:.1f}s)")
+        if not admin_password:
+            print(f"{slug}: admin login {admin_user} / {password}")
+    src.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manage per-organization databases')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help='Show registered tenants')
+    add = sub.add_parser('add', help='Register a tenant and create its admin; the app creates the rest of the schema')
+    add.add_argument('slug')
+    add.add_argument('--name')
+    sp = sub.add_parser('split', help='Copy a shared database into one file per organization')
+    sp.add_argument('--db', default=os.path.join(BASE_DIR, 'database.db'))
+    sp.add_argument('--column', required=True, help='users column identifying the organization, e.g. department')
+    sp.add_argument('--map', help='JSON file {slug: [column values]}; default: one tenant per distinct value')
+    sp.add_argument('--force', action='store_true', help='Rebuild tenant files that already exist')
+    for p in (add, sp):
+        p.add_argument('--admin-user', default='admin')
+        p.add_argument('--admin-password', help="The tenant admin's password; default: a random one, printed once")
+    args = parser.parse_args()
+
+    if args.command == 'list':
+        router = TenantRouter(os.path.join(BASE_DIR, 'database.db'))
+        for slug, m in router.metrics().items():
+            print(f"{slug:<20} {m['name']:<30} {router.db_path(slug)}  {m['db_bytes'] or 0} bytes")
+    elif args.command == 'add':
+        if not _SLUG_RE.match(args.slug) or args.slug == DEFAULT_TENANT:
+            parser.error(f'invalid slug {args.slug!r}')
+        registry = load_registry()
+        path = os.path.join(TENANTS_DIR, f'{args.slug}.db')
+        os.makedirs(TENANTS_DIR, exist_ok=True)
+        password = create_admin(path, args.admin_user, args.admin_password)
+        registry[args.slug] = {'name': args.name or args.slug, 'db': os.path.relpath(path, BASE_DIR)}
+        save_registry(registry)
+        print(f"Registered {args.slug}; restart the app to pick it up.")
+        if not args.admin_password:
+            print(f"Admin login: {args.admin_user} / {password}")
+    else:
+        if args.map:
+            with open(args.map) as f:
+                mapping = json.load(f)
+        else:
+            conn = sqlite3.connect(args.db)
+            values = [r[0] for r in conn.execute(
+                f"SELECT DISTINCT {args.column} FROM users WHERE role != 'admin' AND {args.column} IS NOT NULL")]
+            conn.close()
+            mapping = {}
+            for v in values:
+                mapping.setdefault(slugify(v), []).append(v)
+        split(args.db, args.column, mapping, force=args.force,
+              admin_user=args.admin_user, admin_password=args.admin_password)
+
+
+if __name__ == '__main__':
+    main()
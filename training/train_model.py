@@ -1,56 +1,38 @@
-import pandas as pd
-import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.linear_model import LinearRegression, LogisticRegression
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.preprocessing import StandardScaler
 import joblib
 import os
+import sys
+import json
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
 
 # Ensure the project root is the current directory or handle paths
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DATA_PATH = os.path.join(BASE_DIR, 'edited_job_stress_productivity_dataset.csv')
+sys.path.insert(0, BASE_DIR)
+from dataset_cache import load_frame
+from segments import SEGMENTS_DIR, MANIFEST_NAME, segment_key
+
+MIN_SEGMENT_ROWS = 200
+SEGMENT_MODELS = {
+    'lr': lambda: LinearRegression(),
+    'rf': lambda: RandomForestRegressor(n_estimators=100, random_state=42)
+}
 
 def train():
     print(f"Loading data from {DATA_PATH}...")
     try:
-        df = pd.read_csv(DATA_PATH)
+        # Construct columns and composite scores (Job_Stress = mean(8 stress constructs),
+        # Productivity = mean(4 productivity constructs)) are derived once and cached
+        # as memory-mapped columns by dataset_cache.py
+        df = load_frame(DATA_PATH, ['Job_Stress_Score', 'Productivity_Score'])
     except FileNotFoundError:
-        print("Error: Dataset not found. Please ensure 'edited_job_stress_productivity_dataset.csv' is in the project root.")
-        return
-
-    # Construct Columns based on CSV header
-    # Stress constructs mapping
-    df['Workload'] = df[['Workload_TargetTime', 'Workload_ExtraWork']].mean(axis=1)
-    df['Role_Ambiguity'] = df['RoleAmbiguity_ClearInfo']
-    df['Job_Security'] = df['JobSecurity_Secure']
-    df['Gender_Discrimination'] = df['GenderDiscrimination_EqualGrowth']
-    df['Interpersonal_Relationships'] = df['Interpersonal_GoodRelations']
-    df['Resource_Constraints'] = df['Resources_EnoughTime']
-    df['Job_Satisfaction'] = df['JobSatisfaction_WorkConditions']
-    df['Organizational_Support'] = df[['OrgSupport_Training', 'OrgSupport_CareerGrowth']].mean(axis=1)
-    
-    stress_cols = [
-        'Workload', 'Role_Ambiguity', 'Job_Security', 'Gender_Discrimination',
-        'Interpersonal_Relationships', 'Resource_Constraints', 'Job_Satisfaction', 'Organizational_Support'
-    ]
-    
-    # Productivity constructs mapping
-    df['Timings'] = df['Productivity_TimeUtilization']
-    df['Supervisor_Competence'] = df[['Supervisor_Motivation', 'Supervisor_Communication']].mean(axis=1)
-    df['Compensation'] = df['Compensation_Salary']
-    df['Systems_Procedures'] = df['Systems_QualityProcedures']
-    
-    prod_cols = [
-        'Timings', 'Supervisor_Competence', 'Compensation', 'Systems_Procedures'
-    ]
-    
-    # Calculate Composite Scores
-    # Job_Stress = mean(8 stress constructs)
-    df['Job_Stress_Score'] = df[stress_cols].mean(axis=1)
-    
-    # Productivity = mean(4 productivity constructs)
-    df['Productivity_Score'] = df[prod_cols].mean(axis=1)
+        # Non-zero exit so the retrain job (app.py) reports a failure instead of reloading old models
+        sys.exit("Error: Dataset not found. Please ensure 'edited_job_stress_productivity_dataset.csv' is in the project root.")
     
     print("Data processed. Sample:")
     print(df[['Job_Stress_Score', 'Productivity_Score']].head())
@@ -110,5 +92,84 @@ def train():
         
     print("Multi-models updated and saved to project root.")
 
+def _fit_segment(args):
+    # Runs in a worker process: fit every segment model type on one segment's rows
+    key, X, y, model_names = args
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+    models, scores = {'scaler': scaler}, {}
+    for name in model_names:
+        model = SEGMENT_MODELS[name]()
+        model.fit(X_train_scaled, y_train)
+        models[name] = model
+        scores[name] = round(model.score(X_test_scaled, y_test), 4)
+    return key, models, scores
+
+
+def train_segments(data_path, by, model_names, min_rows, workers):
+    """Fit one model set per segment (department, optionally department + position).
+
+    Segments with fewer than min_rows rows are not saved; the app falls back to
+    the global models for them. A manifest maps segment keys to model files.
+    """
+    columns = ['Job_Stress_Score', 'Productivity_Score'] + by
+    print(f"Loading {', '.join(columns)} from {data_path}...")
+    try:
+        df = load_frame(data_path, columns)
+    except KeyError as e:
+        sys.exit(f"Error: {e}")
+
+    tasks, fallbacks = [], {}
+    for values, group in df.groupby(by):
+        values = values if isinstance(values, tuple) else (values,)
+        key = segment_key(*values)
+        if len(group) < min_rows:
+            fallbacks[key] = len(group)
+            continue
+        tasks.append((key, group[['Job_Stress_Score']].to_numpy(), group['Productivity_Score'].to_numpy(), model_names))
+
+    os.makedirs(SEGMENTS_DIR, exist_ok=True)
+    manifest = {
+        'source': os.path.basename(data_path),
+        'by': by,
+        'models': model_names,
+        'min_rows': min_rows,
+        'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'segments': {},
+        'fallback': fallbacks
+    }
+    sizes = {t[0]: len(t[2]) for t in tasks}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for key, models, scores in pool.map(_fit_segment, tasks):
+            fname = f"{key.replace('|', '__').replace(' ', '_')}.pkl"
+            joblib.dump(models, os.path.join(SEGMENTS_DIR, fname))
+            manifest['segments'][key] = {'file': fname, 'rows': sizes[key], 'scores': scores}
+            print(f"Segment {key}: {sizes[key]} rows, R2 {scores}")
+    for key, rows in fallbacks.items():
+        print(f"Segment {key}: only {rows} rows, using the global models")
+
+    tmp = os.path.join(SEGMENTS_DIR, MANIFEST_NAME + '.tmp')
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, os.path.join(SEGMENTS_DIR, MANIFEST_NAME))
+    print(f"{len(manifest['segments'])} segment models saved to {SEGMENTS_DIR}")
+
+
 if __name__ == '__main__':
-    train()
+    parser = argparse.ArgumentParser(description='Train the productivity models')
+    parser.add_argument('--data', default=DATA_PATH)
+    parser.add_argument('--segments', action='store_true', help='Train one model set per department instead')
+    parser.add_argument('--by-position', action='store_true', help='Segment by department and Position')
+    parser.add_argument('--segment-models', default='lr,rf', help=f"Comma separated, from {', '.join(SEGMENT_MODELS)}")
+    parser.add_argument('--min-rows', type=int, default=MIN_SEGMENT_ROWS)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    if args.segments:
+        by = ['Department', 'Position'] if args.by_position else ['Department']
+        train_segments(args.data, by, args.segment_models.split(','), args.min_rows, args.workers)
+    else:
+        DATA_PATH = args.data
+        train()